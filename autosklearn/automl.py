@@ -1,14 +1,15 @@
 # -*- encoding: utf-8 -*-
+import contextlib
 import copy
 import io
 import json
+import numbers
 import platform
 import os
 import sys
 import time
 from typing import Any, Dict, Optional, List, Union
 import unittest.mock
-import warnings
 import tempfile
 
 from ConfigSpace.read_and_write import json as cs_json
@@ -35,7 +36,8 @@ from autosklearn.data.xy_data_manager import XYDataManager
 from autosklearn.data.validation import InputValidator
 from autosklearn.evaluation import ExecuteTaFuncWithQueue, get_cost_of_crash
 from autosklearn.evaluation.abstract_evaluator import _fit_and_suppress_warnings
-from autosklearn.evaluation.train_evaluator import _fit_with_budget
+from autosklearn.evaluation.train_evaluator import _fit_with_budget, compute_splits
+from autosklearn.inference import Predictor, _model_predict, export_inference_bundle
 from autosklearn.metrics import calculate_score
 from autosklearn.util.backend import Backend
 from autosklearn.util.stopwatch import StopWatch
@@ -48,6 +50,7 @@ from autosklearn.util.hash import hash_array_or_matrix
 from autosklearn.metrics import f1_macro, accuracy, r2
 from autosklearn.constants import MULTILABEL_CLASSIFICATION, MULTICLASS_CLASSIFICATION, \
     REGRESSION_TASKS, REGRESSION, BINARY_CLASSIFICATION, MULTIOUTPUT_REGRESSION
+from autosklearn.pipeline.base import BasePipeline
 from autosklearn.pipeline.components.classification import ClassifierChoice
 from autosklearn.pipeline.components.regression import RegressorChoice
 from autosklearn.pipeline.components.feature_preprocessing import FeaturePreprocessorChoice
@@ -58,39 +61,85 @@ from autosklearn.pipeline.components.data_preprocessing.minority_coalescense imp
 from autosklearn.pipeline.components.data_preprocessing.rescaling import RescalingChoice
 
 
-def _model_predict(model, X, batch_size, logger, task):
-    def send_warnings_to_log(
-            message, category, filename, lineno, file=None, line=None):
-        logger.debug('%s:%s: %s:%s' % (filename, lineno, category.__name__, message))
-        return
-    X_ = X.copy()
-    with warnings.catch_warnings():
-        warnings.showwarning = send_warnings_to_log
-        if task in REGRESSION_TASKS:
-            if hasattr(model, 'batch_size'):
-                prediction = model.predict(X_, batch_size=batch_size)
-            else:
-                prediction = model.predict(X_)
-        else:
-            if hasattr(model, 'batch_size'):
-                prediction = model.predict_proba(X_, batch_size=batch_size)
-            else:
-                prediction = model.predict_proba(X_)
+def _model_transform(model, X, copy_input=True):
+    X_ = X.copy() if copy_input else X
+    return model.apply_transformer(X_)
 
-            # Check that all probability values lie between 0 and 1.
-            assert(
-                (prediction >= 0).all() and (prediction <= 1).all()
-            ), "For {}, prediction probability not within [0, 1]!".format(
-                model
-            )
 
-    if len(prediction.shape) < 1 or len(X_.shape) < 1 or \
-            X_.shape[0] < 1 or prediction.shape[0] != X_.shape[0]:
-        logger.warning(
-            "Prediction shape for model %s is %s while X_.shape is %s",
-            model, str(prediction.shape), str(X_.shape)
+def _group_by_transformer(models):
+    """Group the pipelines among ``models`` whose fitted preprocessing steps
+    are identical.
+
+    Returns the groups of positions in ``models`` with more than one member.
+    """
+    groups = {}
+    for i, model in enumerate(models):
+        if isinstance(model, BasePipeline) and len(model.steps) > 1:
+            groups.setdefault(model.get_transformer_key(), []).append(i)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def _iter_chunks(X, chunk_size):
+    """Split the input of ``AutoML.predict_stream`` into chunks."""
+    if isinstance(X, (str, os.PathLike)):
+        X = np.load(X, mmap_mode='r')
+    if isinstance(X, (np.ndarray, pd.DataFrame)) or scipy.sparse.issparse(X):
+        chunks = (
+            X.iloc[start:start + chunk_size] if hasattr(X, 'iloc')
+            else X[start:start + chunk_size]
+            for start in range(0, X.shape[0], chunk_size)
         )
-    return prediction
+    else:
+        chunks = X
+    for chunk in chunks:
+        if isinstance(chunk, np.memmap):
+            # The input validator only accepts the type of the training data
+            chunk = np.asarray(chunk)
+        yield chunk
+
+
+# Inputs smaller than this are copied to the workers, as by joblib's max_nbytes
+_SHARE_INPUT_MIN_BYTES = 1024 * 1024
+
+
+def _should_share_input(X, n_models, n_jobs):
+    """Whether sharing ``X`` between ``n_models`` models evaluated by
+    ``n_jobs`` processes outweighs writing it to a file."""
+    if n_models <= 1 or joblib.effective_n_jobs(n_jobs) <= 1:
+        return False
+    if scipy.sparse.issparse(X):
+        X = X.tocsr()
+        nbytes = X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    else:
+        nbytes = X.nbytes
+    return nbytes >= _SHARE_INPUT_MIN_BYTES
+
+
+def _share_input(X, directory):
+    """Store ``X`` in ``directory`` and memory map it copy on write.
+
+    The pages of the memory map are shared by all processes which predict on
+    it, and joblib passes memory mapped arrays to its workers by file name
+    instead of pickling them. Sparse data is shared as its CSR components.
+    """
+    if scipy.sparse.issparse(X):
+        X = X.tocsr()
+        components = [X.data, X.indices, X.indptr]
+    else:
+        components = [X]
+    arrays = []
+    directory = tempfile.mkdtemp(dir=directory)
+    for i, array in enumerate(components):
+        if array.size == 0:
+            # Empty files cannot be memory mapped
+            arrays.append(array)
+            continue
+        path = os.path.join(directory, '%d.npy' % i)
+        np.save(path, array)
+        arrays.append(np.load(path, mmap_mode='c'))
+    if scipy.sparse.issparse(X):
+        return scipy.sparse.csr_matrix(tuple(arrays), shape=X.shape, copy=False)
+    return arrays[0]
 
 
 class AutoML(BaseEstimator):
@@ -116,6 +165,17 @@ class AutoML(BaseEstimator):
                  n_jobs=None,
                  dask_client: Optional[dask.distributed.Client] = None,
                  precision=32,
+                 memory_mapped_predictions=False,
+                 memory_mapped_datamanager=False,
+                 evaluation_worker_pool=False,
+                 transform_cache_size_mb=None,
+                 incremental_ensemble=False,
+                 ensemble_n_bags=None,
+                 ensemble_n_jobs=1,
+                 ensemble_prune_by_run_loss=False,
+                 memory_aware_dispatch=False,
+                 shared_predict_input=False,
+                 shared_predict_preprocessing=False,
                  disable_evaluator_output=False,
                  get_smac_object_callback=None,
                  smac_scenario_args=None,
@@ -174,13 +234,25 @@ class AutoML(BaseEstimator):
         self._dask_client = dask_client
 
         self.precision = precision
+        self._memory_mapped_predictions = memory_mapped_predictions
+        self._memory_mapped_datamanager = memory_mapped_datamanager
+        self._evaluation_worker_pool = evaluation_worker_pool
+        self._transform_cache_size_mb = transform_cache_size_mb
+        self._incremental_ensemble = incremental_ensemble
+        self._ensemble_n_bags = ensemble_n_bags
+        self._ensemble_n_jobs = ensemble_n_jobs
+        self._ensemble_prune_by_run_loss = ensemble_prune_by_run_loss
+        self._memory_aware_dispatch = memory_aware_dispatch
+        self._shared_predict_input = shared_predict_input
+        self._shared_predict_preprocessing = shared_predict_preprocessing
         self._disable_evaluator_output = disable_evaluator_output
         # Check arguments prior to doing anything!
         if not isinstance(self._disable_evaluator_output, (bool, list)):
             raise ValueError('disable_evaluator_output must be of type bool '
                              'or list.')
         if isinstance(self._disable_evaluator_output, list):
-            allowed_elements = ['model', 'cv_model', 'y_optimization', 'y_test', 'y_valid']
+            allowed_elements = ['model', 'cv_model', 'y_optimization', 'y_test', 'y_valid',
+                                'train_loss']
             for element in self._disable_evaluator_output:
                 if element not in allowed_elements:
                     raise ValueError("List member '%s' for argument "
@@ -484,6 +556,19 @@ class AutoML(BaseEstimator):
         self._logger.debug('  n_jobs: %s', str(self._n_jobs))
         self._logger.debug('  dask_client: %s', str(self._dask_client))
         self._logger.debug('  precision: %s', str(self.precision))
+        self._logger.debug('  memory_mapped_predictions: %s', str(self._memory_mapped_predictions))
+        self._logger.debug('  memory_mapped_datamanager: %s', str(self._memory_mapped_datamanager))
+        self._logger.debug('  evaluation_worker_pool: %s', str(self._evaluation_worker_pool))
+        self._logger.debug('  transform_cache_size_mb: %s', str(self._transform_cache_size_mb))
+        self._logger.debug('  incremental_ensemble: %s', str(self._incremental_ensemble))
+        self._logger.debug('  ensemble_n_bags: %s', str(self._ensemble_n_bags))
+        self._logger.debug('  ensemble_n_jobs: %s', str(self._ensemble_n_jobs))
+        self._logger.debug('  ensemble_prune_by_run_loss: %s',
+                           str(self._ensemble_prune_by_run_loss))
+        self._logger.debug('  memory_aware_dispatch: %s', str(self._memory_aware_dispatch))
+        self._logger.debug('  shared_predict_input: %s', str(self._shared_predict_input))
+        self._logger.debug('  shared_predict_preprocessing: %s',
+                           str(self._shared_predict_preprocessing))
         self._logger.debug('  disable_evaluator_output: %s', str(self._disable_evaluator_output))
         self._logger.debug('  get_smac_objective_callback: %s', str(self._get_smac_object_callback))
         self._logger.debug('  smac_scenario_args: %s', str(self._smac_scenario_args))
@@ -512,12 +597,26 @@ class AutoML(BaseEstimator):
         )
 
         self._backend._make_internals_directory()
+        if self._memory_mapped_predictions:
+            # Store the predictions in the precision the ensemble builder
+            # reads them, so that they can be used without a copy
+            self._backend.prediction_storage_dtype = (
+                np.float16 if int(self.precision) == 16 else np.float32
+            )
+        self._backend.memory_mapped_datamanager = self._memory_mapped_datamanager
+        self._backend.transform_cache_size_mb = self._transform_cache_size_mb
 
         self._task = datamanager.info['task']
         self._label_num = datamanager.info['label_num']
 
         # == Pickle the data manager to speed up loading
         self._backend.save_datamanager(datamanager)
+        # == Split the data once instead of in every evaluation
+        self._backend.save_resampling_splits(compute_splits(
+            datamanager,
+            self._resampling_strategy,
+            copy.deepcopy(self._resampling_strategy_arguments),
+        ))
 
         time_for_load_data = self._stopwatch.wall_elapsed(self._dataset_name)
 
@@ -591,6 +690,14 @@ class AutoML(BaseEstimator):
                 ensemble_memory_limit=self._memory_limit,
                 logger_name=self._logger.name,
                 random_state=self._seed,
+                incremental=self._incremental_ensemble,
+                n_bags=self._ensemble_n_bags,
+                n_jobs=self._ensemble_n_jobs,
+                # Only the holdout loss is the loss of the ensemble predictions
+                prune_by_run_loss=(
+                    self._ensemble_prune_by_run_loss
+                    and self._resampling_strategy in ['holdout', 'holdout-iterative-fit']
+                ),
             )
 
         self._stopwatch.stop_task(ensemble_task_name)
@@ -665,6 +772,8 @@ class AutoML(BaseEstimator):
                 get_smac_object_callback=self._get_smac_object_callback,
                 smac_scenario_args=self._smac_scenario_args,
                 ensemble_callback=proc_ensemble,
+                use_worker_pool=self._evaluation_worker_pool,
+                memory_aware_dispatch=self._memory_aware_dispatch,
             )
 
             try:
@@ -761,6 +870,119 @@ class AutoML(BaseEstimator):
             Parallelize the predictions across the models with n_jobs
             processes.
         """
+        models = self._get_fitted_models()
+        return self._predict(models, X, batch_size, joblib.Parallel(n_jobs=n_jobs))
+
+    def predict_stream(self, X, chunk_size=10000, batch_size=None, n_jobs=1):
+        """Predict chunk by chunk.
+
+        Yields the output of ``predict`` for one chunk of rows at a time,
+        so that only a single chunk of the input and the predictions of the
+        models for it are in memory at once.
+
+        Parameters
+        ----------
+        X: array-like, sparse matrix, DataFrame, str or iterable
+            Input to predict on. Arrays, sparse matrices and DataFrames,
+            including memory mapped arrays, are split into chunks of
+            ``chunk_size`` rows. A string is the path of a ``.npy`` file,
+            which is memory mapped and split into chunks. Any other iterable
+            yields the chunks itself.
+
+        chunk_size: int, defaults to 10000
+            Number of rows per chunk.
+
+        batch_size: int or None, defaults to None
+            See ``predict``.
+
+        n_jobs: int, defaults to 1
+            See ``predict``. The worker processes are reused for all chunks.
+        """
+        if (
+            not isinstance(chunk_size, numbers.Integral)
+            or isinstance(chunk_size, bool)
+            or chunk_size <= 0
+        ):
+            raise ValueError("Argument 'chunk_size' must be a positive int, "
+                             "but is %s" % str(chunk_size))
+        models = self._get_fitted_models()
+        return self._predict_stream(models, X, chunk_size, batch_size, n_jobs)
+
+    def _predict_stream(self, models, X, chunk_size, batch_size, n_jobs):
+        with joblib.Parallel(n_jobs=n_jobs) as parallel:
+            for chunk in _iter_chunks(X, chunk_size):
+                yield self._predict(models, chunk, batch_size, parallel)
+
+    def _predict(self, models, X, batch_size, parallel):
+        # Make sure that input is valid
+        X = self.InputValidator.validate_features(X)
+
+        # Parallelize predictions across models with n_jobs processes.
+        # Each process computes predictions in chunks of batch_size rows.
+        with contextlib.ExitStack() as stack:
+            selected_models = [models[identifier] for identifier
+                               in self.ensemble_.get_selected_model_identifiers()]
+            copy_input = True
+            if self._shared_predict_input:
+                tmpdir = stack.enter_context(tempfile.TemporaryDirectory())
+                if _should_share_input(X, len(selected_models), parallel.n_jobs):
+                    X = _share_input(X, tmpdir)
+                    copy_input = False
+            inputs = [X] * len(selected_models)
+            # Whether the models need to copy their input
+            copy_inputs = [copy_input] * len(selected_models)
+
+            if self._shared_predict_preprocessing:
+                # Transform the data once for all pipelines with the same
+                # fitted preprocessing steps and only predict with their
+                # final estimators
+                groups = _group_by_transformer(selected_models)
+                transformed = parallel(
+                    joblib.delayed(_model_transform)(
+                        selected_models[group[0]], X, copy_input,
+                    )
+                    for group in groups
+                )
+                for group, Xt in zip(groups, transformed):
+                    copy_Xt = True
+                    if (
+                        self._shared_predict_input
+                        and _should_share_input(Xt, len(group), parallel.n_jobs)
+                    ):
+                        Xt = _share_input(Xt, tmpdir)
+                        copy_Xt = False
+                    for i in group:
+                        inputs[i] = Xt
+                        copy_inputs[i] = copy_Xt
+                        selected_models[i] = selected_models[i].without_transformer()
+
+            all_predictions = parallel(
+                joblib.delayed(_model_predict)(
+                    model, X_, batch_size, self._logger, self._task, copy_X,
+                )
+                for model, X_, copy_X in zip(selected_models, inputs, copy_inputs)
+            )
+
+        if len(all_predictions) == 0:
+            raise ValueError('Something went wrong generating the predictions. '
+                             'The ensemble should consist of the following '
+                             'models: %s, the following models were loaded: '
+                             '%s' % (str(list(self.ensemble_indices_.keys())),
+                                     str(list(self.models_.keys()))))
+
+        predictions = self.ensemble_.predict(all_predictions)
+
+        if self._task not in REGRESSION_TASKS:
+            # Make sure average prediction probabilities
+            # are within a valid range
+            # Individual models are checked in _model_predict
+            predictions = np.clip(predictions, 0.0, 1.0)
+
+        return predictions
+
+    def _get_fitted_models(self):
+        """Return the dictionary of models to predict with, loading them
+        first if necessary."""
         if (
             self._resampling_strategy not in (
                 'holdout', 'holdout-iterative-fit', 'cv', 'cv-iterative-fit')
@@ -780,11 +1002,6 @@ class AutoML(BaseEstimator):
             raise ValueError("Predict and predict_proba can only be called "
                              "if 'ensemble_size != 0'")
 
-        # Make sure that input is valid
-        X = self.InputValidator.validate_features(X)
-
-        # Parallelize predictions across models with n_jobs processes.
-        # Each process computes predictions in chunks of batch_size rows.
         try:
             for i, tmp_model in enumerate(self.models_.values()):
                 if isinstance(tmp_model, (DummyRegressor, DummyClassifier)):
@@ -803,30 +1020,23 @@ class AutoML(BaseEstimator):
                 models = self.cv_models_
             except sklearn.exceptions.NotFittedError:
                 raise ValueError('Found no fitted models!')
-
-        all_predictions = joblib.Parallel(n_jobs=n_jobs)(
-            joblib.delayed(_model_predict)(
-                models[identifier], X, batch_size, self._logger, self._task
-            )
-            for identifier in self.ensemble_.get_selected_model_identifiers()
+        return models
+
+    def export_inference_bundle(self, directory):
+        """Write the fitted ensemble to ``directory`` as an inference bundle,
+        see ``autosklearn.inference``."""
+        models = self._get_fitted_models()
+        export_inference_bundle(
+            directory, self.ensemble_.get_models_with_weights(models),
+            self.InputValidator, self._task,
         )
 
-        if len(all_predictions) == 0:
-            raise ValueError('Something went wrong generating the predictions. '
-                             'The ensemble should consist of the following '
-                             'models: %s, the following models were loaded: '
-                             '%s' % (str(list(self.ensemble_indices_.keys())),
-                                     str(list(self.models_.keys()))))
-
-        predictions = self.ensemble_.predict(all_predictions)
-
-        if self._task not in REGRESSION_TASKS:
-            # Make sure average prediction probabilities
-            # are within a valid range
-            # Individual models are checked in _model_predict
-            predictions = np.clip(predictions, 0.0, 1.0)
-
-        return predictions
+    def get_predictor(self):
+        """Return a ``Predictor`` of the fitted ensemble for low-latency
+        predictions, see ``autosklearn.inference.Predictor``."""
+        models = self._get_fitted_models()
+        return Predictor(self.ensemble_.get_models_with_weights(models),
+                         self.InputValidator, self._task)
 
     def fit_ensemble(self, y, task=None, precision=32,
                      dataset_name=None, ensemble_nbest=None,
@@ -867,6 +1077,8 @@ class AutoML(BaseEstimator):
             ensemble_memory_limit=self._memory_limit,
             random_state=self._seed,
             logger_name=self._logger.name,
+            n_bags=self._ensemble_n_bags,
+            n_jobs=self._ensemble_n_jobs,
         )
         manager.build_ensemble(self._dask_client)
         future = manager.futures.pop()
@@ -1016,6 +1228,7 @@ class AutoML(BaseEstimator):
         params = []
         status = []
         budgets = []
+        phase_timings = []
         for run_key in self.runhistory_.data:
             run_value = self.runhistory_.data[run_key]
             config_id = run_key.config_id
@@ -1046,6 +1259,11 @@ class AutoML(BaseEstimator):
             mean_test_score.append(self._metric._optimum - (self._metric._sign * run_value.cost))
             mean_fit_time.append(run_value.time)
             budgets.append(run_key.budget)
+            additional_info = run_value.additional_info
+            phase_timings.append(
+                additional_info.get('phase_timings', {})
+                if isinstance(additional_info, dict) else {}
+            )
 
             for hp_name in hp_names:
                 if hp_name in param_dict:
@@ -1066,6 +1284,16 @@ class AutoML(BaseEstimator):
         results['status'] = status
         results['budgets'] = budgets
 
+        # Time spent in the phases of each evaluation, see
+        # AbstractEvaluator.phase_timer
+        phases = sorted(set(phase for timings in phase_timings for phase in timings))
+        for phase in phases:
+            for kind in ('wall', 'cpu'):
+                results['phase_%s_time_%s' % (kind, phase)] = np.array([
+                    timings.get(phase, {}).get('%s_time' % kind, np.NaN)
+                    for timings in phase_timings
+                ], dtype=float)
+
         for hp_name in hp_names:
             masked_array = ma.MaskedArray(parameter_dictionaries[hp_name],
                                           masks[hp_name])
@@ -1105,6 +1333,16 @@ class AutoML(BaseEstimator):
         num_memout = sum([s == 'Memout' for s in cv_results['status']])
         sio.write('  Number of target algorithms that exceeded the memory '
                   'limit: %d\n' % num_memout)
+        phases = [key[len('phase_wall_time_'):] for key in cv_results
+                  if key.startswith('phase_wall_time_')]
+        if phases:
+            sio.write('  Time spent in the phases of all target algorithm runs '
+                      '(wall/CPU seconds):\n')
+            for phase in phases:
+                wall_time = np.nansum(cv_results['phase_wall_time_%s' % phase])
+                cpu_times = cv_results['phase_cpu_time_%s' % phase]
+                cpu_time = '-' if np.all(np.isnan(cpu_times)) else '%.2f' % np.nansum(cpu_times)
+                sio.write('    %s: %.2f/%s\n' % (phase, wall_time, cpu_time))
         return sio.getvalue()
 
     def get_models_with_weights(self):
@@ -1220,7 +1458,9 @@ class AutoMLClassifier(AutoML):
     def predict(self, X, batch_size=None, n_jobs=1):
         predicted_probabilities = super().predict(X, batch_size=batch_size,
                                                   n_jobs=n_jobs)
+        return self._decode_probabilities(predicted_probabilities)
 
+    def _decode_probabilities(self, predicted_probabilities):
         if self.InputValidator.is_single_column_target() == 1:
             predicted_indexes = np.argmax(predicted_probabilities, axis=1)
         else:
@@ -1231,6 +1471,18 @@ class AutoMLClassifier(AutoML):
     def predict_proba(self, X, batch_size=None, n_jobs=1):
         return super().predict(X, batch_size=batch_size, n_jobs=n_jobs)
 
+    def predict_stream(self, X, chunk_size=10000, batch_size=None, n_jobs=1):
+        return (
+            self._decode_probabilities(predicted_probabilities)
+            for predicted_probabilities in self.predict_proba_stream(
+                X, chunk_size=chunk_size, batch_size=batch_size, n_jobs=n_jobs,
+            )
+        )
+
+    def predict_proba_stream(self, X, chunk_size=10000, batch_size=None, n_jobs=1):
+        return super().predict_stream(X, chunk_size=chunk_size, batch_size=batch_size,
+                                      n_jobs=n_jobs)
+
 
 class AutoMLRegressor(AutoML):
     def __init__(self, *args, **kwargs):
@@ -3,13 +3,14 @@ import math
 import numbers
 import glob
 import gzip
+import heapq
 import os
 import pickle
 import re
 import shutil
 import time
 import traceback
-from typing import List, Optional, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 import zlib
 
 import dask.distributed
@@ -21,10 +22,11 @@ from sklearn.utils.validation import check_random_state
 from smac.callbacks import IncorporateRunResultCallback
 from smac.optimizer.smbo import SMBO
 from smac.runhistory.runhistory import RunInfo, RunValue
+from smac.tae import StatusType
 
 from autosklearn.util.backend import Backend
 from autosklearn.constants import BINARY_CLASSIFICATION
-from autosklearn.metrics import calculate_score, Scorer
+from autosklearn.metrics import calculate_score, get_score_kernel, Scorer
 from autosklearn.ensembles.ensemble_selection import EnsembleSelection
 from autosklearn.ensembles.abstract_ensemble import AbstractEnsemble
 from autosklearn.util.logging_ import get_logger, setup_logger
@@ -55,6 +57,10 @@ class EnsembleBuilderManager(IncorporateRunResultCallback):
         ensemble_memory_limit: Optional[int],
         random_state: int,
         logger_name: str,
+        incremental: bool = False,
+        n_bags: Optional[int] = None,
+        n_jobs: int = 1,
+        prune_by_run_loss: bool = False,
     ):
         """ SMAC callback to handle ensemble building
 
@@ -102,6 +108,22 @@ class EnsembleBuilderManager(IncorporateRunResultCallback):
             read at most n new prediction files in each iteration
         logger_name: str
             Name of the logger where we are gonna write information
+        incremental: bool
+            If True, the ensemble is updated in this process right after each
+            run by a single ensemble builder which lives across iterations,
+            instead of building it from scratch in a dask job. The update runs
+            synchronously in the callback of SMAC, and the memory limit only
+            bounds the loaded predictions of the ensemble candidates, see
+            EnsembleBuilder.limit_candidate_memory.
+        n_bags: Optional[int]
+            if given, use bagged ensemble selection with this many bags
+        n_jobs: int
+            number of threads to build the bags with
+        prune_by_run_loss: bool
+            Whether the loss of a run as reported to SMAC is the loss of its
+            predictions on the ensemble data set, which is only the case for
+            holdout. Then predictions which cannot be among the ensemble_nbest
+            best according to this loss are not read.
 
     Returns
     -------
@@ -125,6 +147,18 @@ class EnsembleBuilderManager(IncorporateRunResultCallback):
         self.ensemble_memory_limit = ensemble_memory_limit
         self.random_state = random_state
         self.logger_name = logger_name
+        self.incremental = incremental
+        self.n_bags = n_bags
+        self.n_jobs = n_jobs
+        self.prune_by_run_loss = prune_by_run_loss
+
+        # The ensemble builder of the incremental mode
+        self.ensemble_builder = None  # type: Optional[EnsembleBuilder]
+
+        # Loss of the successful runs as reported to SMAC, which allows the
+        # ensemble builder to skip predictions which cannot be among the best
+        # {(seed, num_run, budget): loss}
+        self.run_losses = {}  # type: Dict[Tuple[int, int, float], float]
 
         # Store something similar to SMAC's runhistory
         self.history = []
@@ -145,6 +179,11 @@ class EnsembleBuilderManager(IncorporateRunResultCallback):
         result: RunValue,
         time_left: float,
     ):
+        if self.prune_by_run_loss and result.status == StatusType.SUCCESS \
+                and result.additional_info and 'num_run' in result.additional_info:
+            self.run_losses[
+                (self.seed, result.additional_info['num_run'], float(run_info.budget))
+            ] = result.cost
         self.build_ensemble(smbo.tae_runner.client)
 
     def build_ensemble(self, dask_client: dask.distributed.Client) -> None:
@@ -175,6 +214,10 @@ class EnsembleBuilderManager(IncorporateRunResultCallback):
             )
             return
 
+        if self.incremental:
+            self.update_ensemble(time_left=self.time_left_for_ensembles - elapsed_time)
+            return
+
         if len(self.futures) != 0:
             if self.futures[0].done():
                 result = self.futures.pop().result()
@@ -220,6 +263,9 @@ class EnsembleBuilderManager(IncorporateRunResultCallback):
                     end_at=self.start_time + self.time_left_for_ensembles,
                     iteration=self.iteration,
                     return_predictions=False,
+                    n_bags=self.n_bags,
+                    n_jobs=self.n_jobs,
+                    run_losses=self.run_losses,
                     priority=100,
                 ))
 
@@ -240,6 +286,46 @@ class EnsembleBuilderManager(IncorporateRunResultCallback):
                 logger.critical(exception_traceback)
                 logger.critical(error_message)
 
+    def update_ensemble(self, time_left: float) -> None:
+        """Merge the newly stored predictions into the ensemble of the last iteration."""
+        if self.ensemble_builder is None:
+            self.ensemble_builder = EnsembleBuilder(
+                backend=self.backend,
+                dataset_name=self.dataset_name,
+                task_type=self.task,
+                metric=self.metric,
+                ensemble_size=self.ensemble_size,
+                ensemble_nbest=self.ensemble_nbest,
+                max_models_on_disc=self.max_models_on_disc,
+                seed=self.seed,
+                precision=self.precision,
+                memory_limit=self.ensemble_memory_limit,
+                read_at_most=self.read_at_most,
+                random_state=self.seed,
+                logger_name=self.logger_name,
+                incremental=True,
+                n_bags=self.n_bags,
+                n_jobs=self.n_jobs,
+                run_losses=self.run_losses,
+            )
+
+        try:
+            ensemble_history, _, _, _, _ = self.ensemble_builder.main(
+                time_left=time_left,
+                iteration=self.iteration,
+                return_predictions=False,
+            )
+            # Only report the performance of new ensembles
+            self.ensemble_builder.ensemble_history = []
+            self.history.extend(ensemble_history)
+            self.iteration += 1
+        except Exception as e:
+            exception_traceback = traceback.format_exc()
+            error_message = repr(e)
+            logger = self.ensemble_builder.logger
+            logger.critical(exception_traceback)
+            logger.critical(error_message)
+
 
 def fit_and_return_ensemble(
     backend: Backend,
@@ -258,6 +344,9 @@ def fit_and_return_ensemble(
     end_at: float,
     iteration: int,
     return_predictions: bool,
+    n_bags: Optional[int] = None,
+    n_jobs: int = 1,
+    run_losses: Optional[Dict[Tuple[int, int, float], float]] = None,
 ) -> Tuple[
         List[Tuple[int, float, float, float]],
         int,
@@ -312,6 +401,13 @@ def fit_and_return_ensemble(
             because we do not know when dask schedules the job.
         iteration: int
             The current iteration
+        n_bags: Optional[int]
+            if given, use bagged ensemble selection with this many bags
+        n_jobs: int
+            number of threads to build the bags with
+        run_losses: Optional[Dict[Tuple[int, int, float], float]]
+            loss of the runs on the ensemble data set as reported to SMAC,
+            indexed by (seed, num_run, budget)
 
     Returns
     -------
@@ -334,6 +430,9 @@ def fit_and_return_ensemble(
         read_at_most=read_at_most,
         random_state=random_state,
         logger_name=logger_name,
+        n_bags=n_bags,
+        n_jobs=n_jobs,
+        run_losses=run_losses,
     ).run(
         end_at=end_at,
         iteration=iteration,
@@ -359,6 +458,10 @@ class EnsembleBuilder(object):
             read_at_most: int = 5,
             random_state: Optional[Union[int, np.random.RandomState]] = None,
             logger_name: str = 'ensemble_builder',
+            incremental: bool = False,
+            n_bags: Optional[int] = None,
+            n_jobs: int = 1,
+            run_losses: Optional[Dict[Tuple[int, int, float], float]] = None,
     ):
         """
             Constructor
@@ -406,6 +509,22 @@ class EnsembleBuilder(object):
                 read at most n new prediction files in each iteration
             logger_name: str
                 Name of the logger where we are gonna write information
+            incremental: bool
+                Whether the builder is kept alive across iterations. Then the
+                newly scored predictions are merged into the candidates of the
+                previous iteration, and the ensemble selection is warm started
+                from the previous ensemble. The state of the builder is not
+                stored on disc in this case, and the memory limit bounds the
+                loaded predictions of the candidates instead of the process.
+            n_bags: Optional[int]
+                if given, use bagged ensemble selection with this many bags
+            n_jobs: int
+                number of threads to build the bags with
+            run_losses: Optional[Dict[Tuple[int, int, float], float]]
+                loss of the runs on the ensemble data set as reported to SMAC,
+                indexed by (seed, num_run, budget). Predictions of runs whose
+                loss shows that they are not among the ensemble_nbest best are
+                not read.
         """
 
         super(EnsembleBuilder, self).__init__()
@@ -444,6 +563,10 @@ class EnsembleBuilder(object):
         self.memory_limit = memory_limit
         self.read_at_most = read_at_most
         self.random_state = check_random_state(random_state)
+        self.incremental = incremental
+        self.n_bags = n_bags
+        self.n_jobs = n_jobs
+        self.run_losses = run_losses
 
         # Setup the logger
         self.logger_name = logger_name
@@ -459,6 +582,8 @@ class EnsembleBuilder(object):
 
         self.last_hash = None  # hash of ensemble training data
         self.y_true_ensemble = None
+        # y_true_ensemble encoded for the kernel of the metric, if any
+        self.encoded_y_true_ensemble = None
         self.SAVE2DISC = True
 
         # already read prediction files
@@ -521,6 +646,41 @@ class EnsembleBuilder(object):
                     )
                 )
 
+        # Prediction files on the ensemble data set as read from the prediction
+        # index of the backend, and the offset up to which the index was read
+        # {"file name": (seed, num_run, budget, mtime, size)}
+        self.prediction_index = {}
+        self.prediction_index_offset = 0
+        self.prediction_index_file = os.path.join(
+            self.backend.internals_directory,
+            'ensemble_prediction_index.pkl'
+        )
+        if os.path.exists(self.prediction_index_file):
+            try:
+                with (open(self.prediction_index_file, "rb")) as memory:
+                    self.prediction_index, self.prediction_index_offset = pickle.load(memory)
+            except Exception as e:
+                self.logger.warning(
+                    "Could not load the prediction index of previous iterations of "
+                    "ensemble_builder. Exception={} {}".format(
+                        e,
+                        traceback.format_exc(),
+                    )
+                )
+
+        # Scores of prediction files shared by all ensemble builders, a file is
+        # only scored again if its size or modification time changed
+        # {(metric name, seed, num_run, budget, size, mtime): (score, disc_space_cost_mb)}
+        self.score_cache = self.backend.load_score_cache()
+
+        # keys of self.read_scores (re)scored by the last call of score_ensemble_preds
+        self.new_preds = []
+        # Incremental mode only: the candidates and the ensemble of the last
+        # iteration, and the predictions of dummy models
+        self.candidate_keys = None
+        self.dummy_keys = set()
+        self.ensemble = None
+
         # hidden feature which can be activated via an environment variable. This keeps all
         # models and predictions which have ever been a candidate. This is necessary to post-hoc
         # compute the whole ensemble building trajectory.
@@ -658,7 +818,10 @@ class EnsembleBuilder(object):
 
         # Only the models with the n_best predictions are candidates
         # to be in the ensemble
-        candidate_models = self.get_n_best_preds()
+        if self.incremental:
+            candidate_models = self.update_candidate_preds()
+        else:
+            candidate_models = self.get_n_best_preds()
         if not candidate_models:  # no candidates yet
             if return_predictions:
                 return self.ensemble_history, self.ensemble_nbest, train_pred, valid_pred, test_pred
@@ -669,6 +832,8 @@ class EnsembleBuilder(object):
         # reduces selected models if file reading failed
         n_sel_valid, n_sel_test = self. \
             get_valid_test_preds(selected_keys=candidate_models)
+        if self.incremental:
+            candidate_models = self.limit_candidate_memory(candidate_models)
 
         # If valid/test predictions loaded, then reduce candidate models to this set
         if len(n_sel_test) != 0 and len(n_sel_valid) != 0 \
@@ -718,8 +883,9 @@ class EnsembleBuilder(object):
             self._delete_excess_models(selected_keys=candidate_models)
 
         # Save the read scores status for the next iteration
-        with open(self.ensemble_score_file, "wb") as memory:
-            pickle.dump(self.read_scores, memory)
+        if not self.incremental:
+            with open(self.ensemble_score_file, "wb") as memory:
+                pickle.dump(self.read_scores, memory)
 
         if ensemble is not None:
             train_pred = self.predict(set_="train",
@@ -750,8 +916,9 @@ class EnsembleBuilder(object):
 
         # The loaded predictions and the hash can only be saved after the ensemble has been
         # built, because the hash is computed during the construction of the ensemble
-        with open(self.ensemble_memory_file, "wb") as memory:
-            pickle.dump((self.read_preds, self.last_hash), memory)
+        if not self.incremental:
+            with open(self.ensemble_memory_file, "wb") as memory:
+                pickle.dump((self.read_preds, self.last_hash), memory)
 
         if return_predictions:
             return self.ensemble_history, self.ensemble_nbest, train_pred, valid_pred, test_pred
@@ -798,35 +965,26 @@ class EnsembleBuilder(object):
                 )
                 return False
 
-        pred_path = os.path.join(
-            glob.escape(self.backend.get_runs_directory()),
-            '%d_*_*' % self.seed,
-            'predictions_ensemble_%s_*_*.npy*' % self.seed,
-        )
-        y_ens_files = glob.glob(pred_path)
-        y_ens_files = [y_ens_file for y_ens_file in y_ens_files
-                       if y_ens_file.endswith('.npy') or y_ens_file.endswith('.npy.gz')]
-        self.y_ens_files = y_ens_files
+        # The targets never change, encode them once for all prediction files
+        score_kernel = get_score_kernel(self.metric, self.task_type)
+        if score_kernel is not None and self.encoded_y_true_ensemble is None:
+            self.encoded_y_true_ensemble = score_kernel.encode_labels(self.y_true_ensemble)
+
+        to_read = self._get_ensemble_prediction_files()
+        self.y_ens_files = [y_ens_fn for y_ens_fn, *_ in to_read]
         # no validation predictions so far -- no files
         if len(self.y_ens_files) == 0:
-            self.logger.debug("Found no prediction files on ensemble data set:"
-                              " %s" % pred_path)
+            self.logger.debug("Found no prediction files on ensemble data set")
             return False
 
-        # First sort files chronologically
-        to_read = []
-        for y_ens_fn in self.y_ens_files:
-            match = self.model_fn_re.search(y_ens_fn)
-            _seed = int(match.group(1))
-            _num_run = int(match.group(2))
-            _budget = float(match.group(3))
-
-            to_read.append([y_ens_fn, match, _seed, _num_run, _budget])
+        pruned_preds = self._prune_by_run_loss(to_read)
 
         n_read_files = 0
+        self.new_preds = []
         # Now read file wrt to num_run
-        for y_ens_fn, match, _seed, _num_run, _budget in \
-                sorted(to_read, key=lambda x: x[3]):
+        new_cache_entries = []
+        for y_ens_fn, _seed, _num_run, _budget, mtime, size in \
+                sorted(to_read, key=lambda x: x[2]):
             if self.read_at_most and n_read_files >= self.read_at_most:
                 # limit the number of files that will be read
                 # to limit memory consumption
@@ -860,18 +1018,47 @@ class EnsembleBuilder(object):
                     Y_TEST: None,
                 }
 
-            if self.read_scores[y_ens_fn]["mtime_ens"] == os.path.getmtime(y_ens_fn):
+            if self.read_scores[y_ens_fn]["loaded"] == 3:
+                # deleted from disc
+                continue
+
+            if y_ens_fn in pruned_preds:
+                # Not read, the file is considered again in the next iteration
+                self.read_scores[y_ens_fn]["ens_score"] = pruned_preds[y_ens_fn]
+                continue
+
+            if mtime is None:
+                stat = os.stat(y_ens_fn)
+                mtime, size = stat.st_mtime, stat.st_size
+            if self.read_scores[y_ens_fn]["mtime_ens"] == mtime:
                 # same time stamp; nothing changed;
                 continue
 
+            # scored before, possibly by another ensemble builder process
+            cache_key = (self.metric.name, _seed, _num_run, _budget, size, mtime)
+            if cache_key in self.score_cache:
+                score, disc_space_cost_mb = self.score_cache[cache_key]
+                self.read_scores[y_ens_fn]["ens_score"] = score
+                self.read_scores[y_ens_fn]["mtime_ens"] = mtime
+                self.read_scores[y_ens_fn]["loaded"] = 2
+                self.read_scores[y_ens_fn]["disc_space_cost_mb"] = disc_space_cost_mb
+                self.new_preds.append(y_ens_fn)
+                continue
+
             # actually read the predictions and score them
             try:
                 y_ensemble = self._read_np_fn(y_ens_fn)
-                score = calculate_score(solution=self.y_true_ensemble,
-                                        prediction=y_ensemble,
-                                        task_type=self.task_type,
-                                        metric=self.metric,
-                                        all_scoring_functions=False)
+                score = None
+                if score_kernel is not None and self.encoded_y_true_ensemble is not None:
+                    score = score_kernel.score(self.encoded_y_true_ensemble, y_ensemble)
+                if score is None:
+                    score = calculate_score(solution=self.y_true_ensemble,
+                                            prediction=y_ensemble,
+                                            task_type=self.task_type,
+                                            metric=self.metric,
+                                            all_scoring_functions=False)
+                else:
+                    score = self.metric._sign * score
 
                 if np.isfinite(self.read_scores[y_ens_fn]["ens_score"]):
                     self.logger.debug(
@@ -881,18 +1068,23 @@ class EnsembleBuilder(object):
                         self.read_scores[y_ens_fn]["ens_score"],
                         score,
                         self.read_scores[y_ens_fn]["mtime_ens"],
-                        os.path.getmtime(y_ens_fn),
+                        mtime,
                     )
 
                 self.read_scores[y_ens_fn]["ens_score"] = score
 
                 # It is not needed to create the object here
                 # To save memory, we just score the object.
-                self.read_scores[y_ens_fn]["mtime_ens"] = os.path.getmtime(y_ens_fn)
+                self.read_scores[y_ens_fn]["mtime_ens"] = mtime
                 self.read_scores[y_ens_fn]["loaded"] = 2
                 self.read_scores[y_ens_fn]["disc_space_cost_mb"] = self.get_disk_consumption(
                     y_ens_fn
                 )
+                self.score_cache[cache_key] = (
+                    score, self.read_scores[y_ens_fn]["disc_space_cost_mb"]
+                )
+                new_cache_entries.append((cache_key, self.score_cache[cache_key]))
+                self.new_preds.append(y_ens_fn)
 
                 n_read_files += 1
 
@@ -904,14 +1096,111 @@ class EnsembleBuilder(object):
                 )
                 self.read_scores[y_ens_fn]["ens_score"] = -np.inf
 
+        self.backend.append_to_score_cache(new_cache_entries)
+
         self.logger.debug(
-            'Done reading %d new prediction files. Loaded %d predictions in '
-            'total.',
+            'Done reading %d new prediction files, skipped %d by their loss. '
+            'Loaded %d predictions in total.',
             n_read_files,
+            len(pruned_preds),
             np.sum([pred["loaded"] > 0 for pred in self.read_scores.values()])
         )
         return True
 
+    def _prune_by_run_loss(self, to_read) -> Dict[str, float]:
+        """
+            Find the prediction files which cannot be among the ensemble_nbest
+            best according to the loss SMAC reported for their run. With
+            holdout, the run is evaluated on the ensemble data set, so its score
+            is optimum - loss. The losses of other resampling strategies, e.g.
+            the mean fold loss of cv, are not recorded by the manager.
+
+            The files which are pruned are never read; their ens_score in
+            read_scores is this estimate. It is computed from the float64
+            predictions of the run, whereas the scores of the files which are
+            read are computed from the stored predictions in the precision of
+            prediction_storage_dtype, e.g. float16 or float32. get_n_best_preds
+            ranks both kinds of scores against each other, so close scores can
+            be ordered differently than if all files had been read.
+
+            Parameters
+            ----------
+            to_read: list
+                the prediction files as returned by
+                _get_ensemble_prediction_files
+
+            Returns
+            -------
+            dict
+                maps the files which do not need to be read to their score
+        """
+        if not self.run_losses:
+            return {}
+
+        known_scores = []
+        estimated_scores = {}
+        for y_ens_fn, _seed, _num_run, _budget, *_ in to_read:
+            read_score = self.read_scores.get(y_ens_fn)
+            if read_score is not None and read_score["mtime_ens"] != 0:
+                known_scores.append(read_score["ens_score"])
+                continue
+            loss = self.run_losses.get((_seed, _num_run, _budget))
+            # The dummy prediction is always read, it defines the baseline
+            if loss is not None and _num_run != 1:
+                estimated_scores[y_ens_fn] = self.metric._optimum - loss
+
+        if isinstance(self.ensemble_nbest, numbers.Integral):
+            keep_nbest = self.ensemble_nbest
+        else:
+            keep_nbest = max(1, int(len(to_read) * self.ensemble_nbest))
+        scores = known_scores + list(estimated_scores.values())
+        if len(scores) <= keep_nbest:
+            return {}
+
+        cutoff = heapq.nlargest(keep_nbest, scores)[-1]
+        return {
+            y_ens_fn: score for y_ens_fn, score in estimated_scores.items() if score < cutoff
+        }
+
+    def _get_ensemble_prediction_files(self):
+        """
+            list the predictions on the ensemble building data set as
+            (path, seed, num_run, budget, mtime, size) tuples; mtime and size
+            are None if they are not known without accessing the file
+        """
+        index = self.backend.read_prediction_index(self.prediction_index_offset)
+        if index is not None:
+            # Only read the runs which were stored since the last iteration
+            entries, self.prediction_index_offset = index
+            for y_ens_fn, _seed, _num_run, _budget, mtime, size in entries:
+                if _seed == self.seed:
+                    self.prediction_index[y_ens_fn] = (_seed, _num_run, _budget, mtime, size)
+            if entries:
+                with open(self.prediction_index_file, "wb") as memory:
+                    pickle.dump((self.prediction_index, self.prediction_index_offset), memory)
+            return [
+                [y_ens_fn, *entry] for y_ens_fn, entry in self.prediction_index.items()
+            ]
+
+        # Predictions stored without an index, scan the runs directory
+        pred_path = os.path.join(
+            glob.escape(self.backend.get_runs_directory()),
+            '%d_*_*' % self.seed,
+            'predictions_ensemble_%s_*_*.npy*' % self.seed,
+        )
+        y_ens_files = glob.glob(pred_path)
+        y_ens_files = [y_ens_file for y_ens_file in y_ens_files
+                       if y_ens_file.endswith('.npy') or y_ens_file.endswith('.npy.gz')]
+        to_read = []
+        for y_ens_fn in y_ens_files:
+            match = self.model_fn_re.search(y_ens_fn)
+            _seed = int(match.group(1))
+            _num_run = int(match.group(2))
+            _budget = float(match.group(3))
+
+            to_read.append([y_ens_fn, _seed, _num_run, _budget, None, None])
+        return to_read
+
     def get_n_best_preds(self):
         """
             get best n predictions (i.e., keys of self.read_scores)
@@ -969,45 +1258,7 @@ class EnsembleBuilder(object):
             self.logger.debug("Library Pruning: using for ensemble only "
                               " %d (out of %d) models" % (keep_nbest, len(sorted_keys)))
 
-        # If max_models_on_disc is None, do nothing
-        # One can only read at most max_models_on_disc models
-        if self.max_models_on_disc is not None:
-            if not isinstance(self.max_models_on_disc, numbers.Integral):
-                consumption = [
-                    [
-                        v["ens_score"],
-                        v["disc_space_cost_mb"],
-                    ] for v in self.read_scores.values() if v["disc_space_cost_mb"] is not None
-                ]
-                max_consumption = max(c[1] for c in consumption)
-
-                # We are pessimistic with the consumption limit indicated by
-                # max_models_on_disc by 1 model. Such model is assumed to spend
-                # max_consumption megabytes
-                if (sum(c[1] for c in consumption) + max_consumption) > self.max_models_on_disc:
-
-                    # just leave the best -- higher is better!
-                    # This list is in descending order, to preserve the best models
-                    sorted_cum_consumption = np.cumsum([
-                        c[1] for c in list(reversed(sorted(consumption)))
-                    ]) + max_consumption
-                    max_models = np.argmax(sorted_cum_consumption > self.max_models_on_disc)
-
-                    # Make sure that at least 1 model survives
-                    self.max_resident_models = max(1, max_models)
-                    self.logger.warning(
-                        "Limiting num of models via float max_models_on_disc={}"
-                        " as accumulated={} worst={} num_models={}".format(
-                            self.max_models_on_disc,
-                            (sum(c[1] for c in consumption) + max_consumption),
-                            max_consumption,
-                            self.max_resident_models
-                        )
-                    )
-                else:
-                    self.max_resident_models = None
-            else:
-                self.max_resident_models = self.max_models_on_disc
+        self._update_max_resident_models()
 
         if self.max_resident_models is not None and keep_nbest > self.max_resident_models:
             self.logger.debug(
@@ -1073,6 +1324,177 @@ class EnsembleBuilder(object):
         # return best scored keys of self.read_scores
         return sorted_keys[:ensemble_n_best]
 
+    def update_candidate_preds(self):
+        """
+            Incremental counterpart of get_n_best_preds: merges the predictions
+            scored in the last call of score_ensemble_preds into the candidates
+            of the previous iteration. Only these are ranked, the best n are
+            kept in a bounded heap.
+
+            Side effects:
+                ->Only the candidates are loaded
+                ->Any model that is not a candidate is candidate to deletion
+                  if max models in disc is exceeded.
+        """
+        if self.candidate_keys is None:
+            # First iteration, possibly with scores of a previous builder
+            pool = set(self.read_scores)
+        else:
+            pool = set(self.candidate_keys).union(self.new_preds)
+
+        # note: dummy model must have run_id=1 (there is no run_id=0)
+        self.dummy_keys.update(k for k in pool if self.read_scores[k]["num_run"] == 1)
+        dummy_score = max(
+            [self.read_scores[k]["ens_score"] for k in self.dummy_keys],
+            default=-np.inf,
+        )
+
+        if not isinstance(self.ensemble_nbest, numbers.Integral):
+            keep_nbest = max(1, int(len(self.read_scores) * self.ensemble_nbest))
+        else:
+            keep_nbest = self.ensemble_nbest
+        self._update_max_resident_models()
+        if self.max_resident_models is not None:
+            keep_nbest = min(keep_nbest, self.max_resident_models)
+
+        # Same order as _get_list_of_sorted_preds, i.e. by score and then by num_run
+        candidates = heapq.nlargest(
+            keep_nbest,
+            [
+                (self.read_scores[k]["ens_score"], self.read_scores[k]["num_run"], k)
+                for k in pool
+                if self.read_scores[k]["num_run"] > 1
+                and self.read_scores[k]["loaded"] != 3
+                and self.read_scores[k]["ens_score"] > dummy_score
+            ],
+        )
+        candidate_keys = [k for _, _, k in candidates]
+        if not candidate_keys:
+            # no model left; try to use dummy score (num_run==1)
+            candidate_keys = sorted(
+                k for k in self.dummy_keys if self.read_scores[k]["seed"] == self.seed
+            )
+        self.logger.debug("Library Pruning: using for ensemble only %d models",
+                          len(candidate_keys))
+
+        # remove loaded predictions for models which are no candidates (anymore)
+        for k in pool.difference(candidate_keys):
+            if k in self.read_preds:
+                self.read_preds[k][Y_ENSEMBLE] = None
+                self.read_preds[k][Y_VALID] = None
+                self.read_preds[k][Y_TEST] = None
+            if self.read_scores[k]['loaded'] == 1:
+                self.read_scores[k]['loaded'] = 2
+
+        for k in candidate_keys:
+            if (
+                (
+                    k not in self.read_preds or
+                    self.read_preds[k][Y_ENSEMBLE] is None
+                )
+                and self.read_scores[k]['loaded'] != 3
+            ):
+                self.read_preds[k][Y_ENSEMBLE] = self._read_np_fn(k)
+                self.read_scores[k]['loaded'] = 1
+
+        self.candidate_keys = candidate_keys
+        return candidate_keys
+
+    def limit_candidate_memory(self, candidate_keys: List[str]) -> List[str]:
+        """
+            Incremental mode only: the builder lives in the main process, so
+            the memory limit cannot be enforced by pynisher. Instead, the
+            loaded predictions of the candidates are kept below the memory
+            limit by dropping the worst candidates and reducing
+            ensemble_nbest, as it is done after a memory exception.
+
+            Parameters
+            ---------
+            candidate_keys: list
+                candidates as returned by update_candidate_preds, i.e. best first
+
+            Return
+            ------
+            candidate_keys:
+                the candidates whose predictions fit into the memory limit
+        """
+        if self.memory_limit is None:
+            return candidate_keys
+
+        def get_memory_mb(k):
+            return sum(
+                pred.nbytes for pred in self.read_preds[k].values() if pred is not None
+            ) / 1024 / 1024
+
+        memory_mb = np.cumsum([get_memory_mb(k) for k in candidate_keys])
+        n_keep = max(1, int(np.sum(memory_mb <= self.memory_limit)))
+        if n_keep == len(candidate_keys):
+            return candidate_keys
+
+        if isinstance(self.ensemble_nbest, numbers.Integral):
+            self.ensemble_nbest = max(1, min(n_keep, int(self.ensemble_nbest / 2)))
+        else:
+            self.ensemble_nbest = self.ensemble_nbest / 2
+        self.logger.warning(
+            "The predictions of %d candidates need %f MB, which exceeds the memory limit of "
+            "%s MB -- keep %d candidates and continue with less ensemble_nbest: %s",
+            len(candidate_keys), memory_mb[-1], self.memory_limit, n_keep, self.ensemble_nbest,
+        )
+
+        for k in candidate_keys[n_keep:]:
+            self.read_preds[k][Y_ENSEMBLE] = None
+            self.read_preds[k][Y_VALID] = None
+            self.read_preds[k][Y_TEST] = None
+            if self.read_scores[k]['loaded'] == 1:
+                self.read_scores[k]['loaded'] = 2
+        self.candidate_keys = candidate_keys[:n_keep]
+        return self.candidate_keys
+
+    def _update_max_resident_models(self):
+        """
+            Translates max_models_on_disc to the maximum number of models
+            to keep on disc, which is stored in self.max_resident_models
+        """
+        # If max_models_on_disc is None, do nothing
+        # One can only read at most max_models_on_disc models
+        if self.max_models_on_disc is not None:
+            if not isinstance(self.max_models_on_disc, numbers.Integral):
+                consumption = [
+                    [
+                        v["ens_score"],
+                        v["disc_space_cost_mb"],
+                    ] for v in self.read_scores.values() if v["disc_space_cost_mb"] is not None
+                ]
+                max_consumption = max(c[1] for c in consumption)
+
+                # We are pessimistic with the consumption limit indicated by
+                # max_models_on_disc by 1 model. Such model is assumed to spend
+                # max_consumption megabytes
+                if (sum(c[1] for c in consumption) + max_consumption) > self.max_models_on_disc:
+
+                    # just leave the best -- higher is better!
+                    # This list is in descending order, to preserve the best models
+                    sorted_cum_consumption = np.cumsum([
+                        c[1] for c in list(reversed(sorted(consumption)))
+                    ]) + max_consumption
+                    max_models = np.argmax(sorted_cum_consumption > self.max_models_on_disc)
+
+                    # Make sure that at least 1 model survives
+                    self.max_resident_models = max(1, max_models)
+                    self.logger.warning(
+                        "Limiting num of models via float max_models_on_disc={}"
+                        " as accumulated={} worst={} num_models={}".format(
+                            self.max_models_on_disc,
+                            (sum(c[1] for c in consumption) + max_consumption),
+                            max_consumption,
+                            self.max_resident_models
+                        )
+                    )
+                else:
+                    self.max_resident_models = None
+            else:
+                self.max_resident_models = self.max_models_on_disc
+
     def get_valid_test_preds(self, selected_keys: List[str]) -> Tuple[List[str], List[str]]:
         """
         get valid and test predictions from disc
@@ -1213,12 +1635,19 @@ class EnsembleBuilder(object):
             return None
         self.last_hash = current_hash
 
-        ensemble = EnsembleSelection(
-            ensemble_size=self.ensemble_size,
-            task_type=self.task_type,
-            metric=self.metric,
-            random_state=self.random_state,
-        )
+        if self.incremental and self.ensemble is not None:
+            ensemble = self.ensemble
+        else:
+            ensemble = EnsembleSelection(
+                ensemble_size=self.ensemble_size,
+                task_type=self.task_type,
+                metric=self.metric,
+                random_state=self.random_state,
+                bagging=self.n_bags is not None,
+                n_bags=self.n_bags if self.n_bags is not None else 20,
+                n_jobs=self.n_jobs,
+                warm_start=self.incremental and self.n_bags is None,
+            )
 
         try:
             self.logger.debug(
@@ -1238,6 +1667,8 @@ class EnsembleBuilder(object):
                 self.validation_performance_,
                 ensemble.get_validation_performance(),
             )
+            if self.incremental:
+                self.ensemble = ensemble
 
         except ValueError:
             self.logger.error('Caught ValueError: %s', traceback.format_exc())
@@ -1424,7 +1855,11 @@ class EnsembleBuilder(object):
         for pred_path in self.y_ens_files:
 
             # Do not delete candidates
-            if pred_path in candidates:
+            if pred_path in candidates or pred_path in selected_keys:
+                continue
+
+            # Already deleted in a previous iteration
+            if self.read_scores.get(pred_path, {}).get("loaded") == 3:
                 continue
 
             if pred_path in self._has_been_candidate:
@@ -1465,18 +1900,27 @@ class EnsembleBuilder(object):
             precision = self.precision
 
         if path.endswith("gz"):
-            open_method = gzip.open
+            with gzip.open(path, 'rb') as fp:
+                predictions = np.load(fp, allow_pickle=True)
         elif path.endswith("npy"):
-            open_method = open
+            # Predictions stored as raw arrays are memory mapped and paged in
+            # by the operating system, pickled predictions are read as a whole.
+            # The mapping is copy-on-write because some metrics, e.g. for
+            # multilabel classification, modify the predictions in place.
+            try:
+                predictions = np.load(path, mmap_mode='c', allow_pickle=True)
+            except OSError:
+                # The mapping counts towards the address space, which is
+                # limited by pynisher, so fall back to reading the file
+                predictions = np.load(path, allow_pickle=True)
         else:
             raise ValueError("Unknown filetype %s" % path)
-        with open_method(path, 'rb') as fp:
-            if precision == 16:
-                predictions = np.load(fp, allow_pickle=True).astype(dtype=np.float16)
-            elif precision == 32:
-                predictions = np.load(fp, allow_pickle=True).astype(dtype=np.float32)
-            elif precision == 64:
-                predictions = np.load(fp, allow_pickle=True).astype(dtype=np.float64)
-            else:
-                predictions = np.load(fp, allow_pickle=True)
-            return predictions
+
+        # Only copy the predictions if they are not stored in the requested precision
+        if precision == 16:
+            predictions = predictions.astype(dtype=np.float16, copy=False)
+        elif precision == 32:
+            predictions = predictions.astype(dtype=np.float32, copy=False)
+        elif precision == 64:
+            predictions = predictions.astype(dtype=np.float64, copy=False)
+        return predictions
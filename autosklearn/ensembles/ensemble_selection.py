@@ -1,15 +1,24 @@
-import random
 from collections import Counter
-from typing import Any, Dict, List, Tuple, Union, cast
+from typing import Any, Dict, List, Optional, Tuple, Union, cast
+
+import joblib
 
 import numpy as np
 
-from autosklearn.constants import TASK_TYPES
+from smac.utils.constants import MAXINT
+
+from autosklearn.constants import REGRESSION, TASK_TYPES
 from autosklearn.ensembles.abstract_ensemble import AbstractEnsemble
-from autosklearn.metrics import Scorer, calculate_score
+from autosklearn.metrics import Scorer, calculate_score, get_score_kernel
+from autosklearn.metrics.kernels import EncodedLabels, ScoreKernel
 from autosklearn.pipeline.base import BasePipeline
 
 
+# Upper bound on the memory used by one chunk of candidate ensembles when
+# scoring all candidates of an ensemble selection round at once
+BATCH_MEMORY_LIMIT_MB = 256
+
+
 class EnsembleSelection(AbstractEnsemble):
     def __init__(
         self,
@@ -19,13 +28,41 @@ class EnsembleSelection(AbstractEnsemble):
         random_state: np.random.RandomState,
         bagging: bool = False,
         mode: str = 'fast',
+        warm_start: bool = False,
+        n_bags: int = 20,
+        n_jobs: Optional[int] = 1,
     ) -> None:
+        """
+        Parameters
+        ----------
+        bagging : bool, optional (False)
+            Average the ensembles selected on ``n_bags`` random halves of the
+            models. Only supported in ``'fast'`` mode.
+
+        n_bags : int, optional (20)
+            Number of bags if ``bagging`` is True.
+
+        n_jobs : int, optional (1)
+            Number of threads which build the bags in parallel. ``-1`` uses
+            all processors.
+
+        warm_start : bool, optional (False)
+            When set to True, ``fit`` starts from the members selected by the
+            previous call to ``fit`` which are still among the given models,
+            instead of from an empty ensemble. Once the ensemble is full, each
+            round replaces the longest-serving member by the best model, which
+            may be that member again, so the ensemble never gets worse on the
+            ensemble data set. Only supported in ``'fast'`` mode.
+        """
         self.ensemble_size = ensemble_size
         self.task_type = task_type
         self.metric = metric
         self.bagging = bagging
         self.mode = mode
         self.random_state = random_state
+        self.warm_start = warm_start
+        self.n_bags = n_bags
+        self.n_jobs = n_jobs
 
     def __getstate__(self) -> Dict[str, Any]:
         # Cannot serialize a metric if
@@ -35,8 +72,10 @@ class EnsembleSelection(AbstractEnsemble):
         # one in __main__. we don't use the metric
         # in the EnsembleSelection so this should
         # be fine
-        self.metric = None  # type: ignore
-        return self.__dict__
+        # Do not modify the ensemble itself, it might be fitted again
+        state = self.__dict__.copy()
+        state['metric'] = None
+        return state
 
     def fit(
         self,
@@ -57,12 +96,42 @@ class EnsembleSelection(AbstractEnsemble):
                              ))
         if self.mode not in ('fast', 'slow'):
             raise ValueError('Unknown mode %s' % self.mode)
+        if self.bagging and self.mode != 'fast':
+            raise ValueError('Bagging is only supported in fast mode')
+        if self.bagging and self.n_bags < 1:
+            raise ValueError('Number of bags cannot be less than one!')
+        if self.warm_start and (self.mode != 'fast' or self.bagging):
+            raise ValueError('Warm starting is only supported in fast mode without bagging')
+
+        initial_order = []  # type: List[int]
+        if self.warm_start and hasattr(self, 'indices_'):
+            # Map the previous members to the position of their predictions
+            positions = {identifier: i for i, identifier in enumerate(identifiers)}
+            previous = getattr(self, 'identifiers_')  # type: List[Tuple[int, int, float]]
+            initial_order = [
+                positions[previous[index]] for index in self.indices_
+                if previous[index] in positions
+            ]
 
         if self.bagging:
             self._bagging(predictions, labels)
         else:
-            self._fit(predictions, labels)
+            self._fit(predictions, labels, initial_order)
         self._calculate_weights()
+        if self.bagging:
+            # The scores of the bags refer to different subsets of the models
+            calculated_score = cast(
+                float,
+                calculate_score(
+                    solution=labels,
+                    prediction=self.predict(predictions),
+                    task_type=self.task_type,
+                    metric=self.metric,
+                    all_scoring_functions=False
+                )
+            )
+            self.trajectory_ = [self.metric._optimum - calculated_score]
+            self.train_score_ = self.trajectory_[-1]
         self.identifiers_ = identifiers
         return self
 
@@ -70,9 +139,10 @@ class EnsembleSelection(AbstractEnsemble):
         self,
         predictions: List[np.ndarray],
         labels: np.ndarray,
+        initial_order: Optional[List[int]] = None,
     ) -> AbstractEnsemble:
         if self.mode == 'fast':
-            self._fast(predictions, labels)
+            self._fast(predictions, labels, initial_order)
         else:
             self._slow(predictions, labels)
         return self
@@ -81,16 +151,100 @@ class EnsembleSelection(AbstractEnsemble):
         self,
         predictions: List[np.ndarray],
         labels: np.ndarray,
+        initial_order: Optional[List[int]] = None,
     ) -> None:
         """Fast version of Rich Caruana's ensemble selection method."""
         self.num_input_models_ = len(predictions)
 
-        ensemble = []  # type: List[np.ndarray]
-        trajectory = []
-        order = []
+        kernel, encoded_labels, stacked_predictions = self._prepare_batched_scoring(
+            predictions, labels,
+        )
+        order, trajectory = self._fast_selection(
+            predictions=predictions,
+            labels=labels,
+            candidates=None,
+            kernel=kernel,
+            encoded_labels=encoded_labels,
+            stacked_predictions=stacked_predictions,
+            random_state=self.random_state,
+            initial_order=initial_order,
+        )
+
+        self.indices_ = order
+        self.trajectory_ = trajectory
+        self.train_score_ = trajectory[-1]
 
+    def _prepare_batched_scoring(
+        self,
+        predictions: List[np.ndarray],
+        labels: np.ndarray,
+    ) -> Tuple[Optional[ScoreKernel], Optional[EncodedLabels], Optional[np.ndarray]]:
+        """Stack the predictions for the vectorized scoring of all candidates.
+
+        Returns ``(None, None, None)`` if the candidates have to be scored one
+        after another with the generic metric.
+        """
+        # The labels are encoded once for the whole fit. Predictions
+        # containing NaNs or infinite values need to be sanitized for
+        # regression and therefore use the generic metric.
+        kernel = get_score_kernel(self.metric, self.task_type)
+        if kernel is None:
+            return None, None, None
+        encoded_labels = kernel.encode_labels(labels)
+        if encoded_labels is None:
+            return None, None, None
+        stacked_predictions = np.stack(predictions)
+        if self.task_type == REGRESSION:
+            stacked_predictions = stacked_predictions.reshape(
+                (len(predictions), -1)
+            )
+        if not kernel.supports(encoded_labels, stacked_predictions) \
+                or not np.all(np.isfinite(stacked_predictions)):
+            return None, None, None
+        return kernel, encoded_labels, stacked_predictions
+
+    def _fast_selection(
+        self,
+        predictions: List[np.ndarray],
+        labels: np.ndarray,
+        candidates: Optional[np.ndarray],
+        kernel: Optional[ScoreKernel],
+        encoded_labels: Optional[EncodedLabels],
+        stacked_predictions: Optional[np.ndarray],
+        random_state: np.random.RandomState,
+        initial_order: Optional[List[int]] = None,
+    ) -> Tuple[List[int], List[float]]:
+        """Greedily select the ensemble members among the candidate models.
+
+        ``candidates`` holds the indices of the models to select from, or is
+        ``None`` to select from all models. The predictions are only read,
+        which allows running several selections on them at the same time.
+
+        Returns the selected models in the order they were added, and the
+        score of the ensemble after each round.
+        """
+        if candidates is None:
+            candidate_predictions = predictions
+        else:
+            candidate_predictions = [predictions[index] for index in candidates]
+
+        trajectory = []
         ensemble_size = self.ensemble_size
+        order = list(initial_order[-ensemble_size:]) if initial_order else []  # type: List[int]
 
+        # Running sum of the predictions of all models selected so far. It is
+        # updated in place whenever a model is added to the ensemble, which
+        # avoids re-summing the whole ensemble in every round.
+        ensemble_prediction_sum = np.zeros(
+            predictions[0].shape,
+            dtype=np.float64,
+        )
+        for index in order:
+            np.add(
+                ensemble_prediction_sum,
+                predictions[index],
+                out=ensemble_prediction_sum,
+            )
         weighted_ensemble_prediction = np.zeros(
             predictions[0].shape,
             dtype=np.float64,
@@ -99,24 +253,26 @@ class EnsembleSelection(AbstractEnsemble):
             weighted_ensemble_prediction.shape,
             dtype=np.float64,
         )
+
         for i in range(ensemble_size):
             scores = np.zeros(
-                (len(predictions)),
+                (len(candidate_predictions)),
                 dtype=np.float64,
             )
-            s = len(ensemble)
+            if len(order) >= ensemble_size:
+                # Warm started with a full ensemble, the longest-serving
+                # member competes with all models for its place
+                np.subtract(
+                    ensemble_prediction_sum,
+                    predictions[order.pop(0)],
+                    out=ensemble_prediction_sum,
+                )
+            s = len(order)
             if s == 0:
                 weighted_ensemble_prediction.fill(0.0)
             else:
-                weighted_ensemble_prediction.fill(0.0)
-                for pred in ensemble:
-                    np.add(
-                        weighted_ensemble_prediction,
-                        pred,
-                        out=weighted_ensemble_prediction,
-                    )
                 np.multiply(
-                    weighted_ensemble_prediction,
+                    ensemble_prediction_sum,
                     1/s,
                     out=weighted_ensemble_prediction,
                 )
@@ -126,49 +282,119 @@ class EnsembleSelection(AbstractEnsemble):
                     out=weighted_ensemble_prediction,
                 )
 
-            # Memory-efficient averaging!
-            for j, pred in enumerate(predictions):
-                # TODO: this could potentially be vectorized! - let's profile
-                # the script first!
-                fant_ensemble_prediction.fill(0.0)
-                np.add(
-                    fant_ensemble_prediction,
-                    weighted_ensemble_prediction,
-                    out=fant_ensemble_prediction
-                )
-                np.add(
-                    fant_ensemble_prediction,
-                    (1. / float(s + 1)) * pred,
-                    out=fant_ensemble_prediction
+            if kernel is not None:
+                self._score_candidates_batched(
+                    stacked_predictions=cast(np.ndarray, stacked_predictions),
+                    candidates=candidates,
+                    encoded_labels=cast(EncodedLabels, encoded_labels),
+                    weighted_ensemble_prediction=weighted_ensemble_prediction,
+                    ensemble_size=s,
+                    kernel=kernel,
+                    scores=scores,
                 )
-
-                # Calculate score is versatile and can return a dict of score
-                # when all_scoring_functions=False, we know it will be a float
-                calculated_score = cast(
-                    float,
-                    calculate_score(
-                        solution=labels,
-                        prediction=fant_ensemble_prediction,
-                        task_type=self.task_type,
-                        metric=self.metric,
-                        all_scoring_functions=False
-                    )
+            else:
+                self._score_candidates(
+                    predictions=candidate_predictions,
+                    labels=labels,
+                    weighted_ensemble_prediction=weighted_ensemble_prediction,
+                    fant_ensemble_prediction=fant_ensemble_prediction,
+                    ensemble_size=s,
+                    scores=scores,
                 )
-                scores[j] = self.metric._optimum - calculated_score
 
             all_best = np.argwhere(scores == np.nanmin(scores)).flatten()
-            best = self.random_state.choice(all_best)
-            ensemble.append(predictions[best])
-            trajectory.append(scores[best])
+            best_candidate = random_state.choice(all_best)
+            best = best_candidate if candidates is None else int(candidates[best_candidate])
+            np.add(
+                ensemble_prediction_sum,
+                predictions[best],
+                out=ensemble_prediction_sum,
+            )
+            trajectory.append(scores[best_candidate])
             order.append(best)
 
             # Handle special case
-            if len(predictions) == 1:
+            if len(candidate_predictions) == 1:
                 break
 
-        self.indices_ = order
-        self.trajectory_ = trajectory
-        self.train_score_ = trajectory[-1]
+        return order, trajectory
+
+    def _score_candidates(
+        self,
+        predictions: List[np.ndarray],
+        labels: np.ndarray,
+        weighted_ensemble_prediction: np.ndarray,
+        fant_ensemble_prediction: np.ndarray,
+        ensemble_size: int,
+        scores: np.ndarray,
+    ) -> None:
+        """Score each candidate ensemble separately with the generic metric."""
+        # Memory-efficient averaging!
+        for j, pred in enumerate(predictions):
+            fant_ensemble_prediction.fill(0.0)
+            np.add(
+                fant_ensemble_prediction,
+                weighted_ensemble_prediction,
+                out=fant_ensemble_prediction
+            )
+            np.add(
+                fant_ensemble_prediction,
+                (1. / float(ensemble_size + 1)) * pred,
+                out=fant_ensemble_prediction
+            )
+
+            # Calculate score is versatile and can return a dict of score
+            # when all_scoring_functions=False, we know it will be a float
+            calculated_score = cast(
+                float,
+                calculate_score(
+                    solution=labels,
+                    prediction=fant_ensemble_prediction,
+                    task_type=self.task_type,
+                    metric=self.metric,
+                    all_scoring_functions=False
+                )
+            )
+            scores[j] = self.metric._optimum - calculated_score
+
+    def _score_candidates_batched(
+        self,
+        stacked_predictions: np.ndarray,
+        candidates: Optional[np.ndarray],
+        encoded_labels: EncodedLabels,
+        weighted_ensemble_prediction: np.ndarray,
+        ensemble_size: int,
+        kernel: ScoreKernel,
+        scores: np.ndarray,
+    ) -> None:
+        """Score all candidate ensembles of a round with vectorized operations.
+
+        The candidate ensembles are built in chunks to bound the memory
+        consumption by ``BATCH_MEMORY_LIMIT_MB``. The result is identical to
+        ``_score_candidates``. If ``candidates`` is given, only the models at
+        these indices of ``stacked_predictions`` are scored.
+        """
+        n_models = stacked_predictions.shape[0] if candidates is None else len(candidates)
+        bytes_per_model = weighted_ensemble_prediction.size * 8
+        chunk_size = max(1, int(BATCH_MEMORY_LIMIT_MB * 1024 * 1024 // bytes_per_model))
+        weighted_ensemble_prediction = weighted_ensemble_prediction.reshape(
+            (1, ) + stacked_predictions.shape[1:]
+        )
+        for start in range(0, n_models, chunk_size):
+            stop = min(start + chunk_size, n_models)
+            if candidates is None:
+                chunk = stacked_predictions[start: stop]
+            else:
+                chunk = stacked_predictions[candidates[start: stop]]
+            blends = np.add(
+                weighted_ensemble_prediction,
+                (1. / float(ensemble_size + 1)) * chunk,
+            )
+            scores[start: stop] = (
+                self.metric._optimum
+                - self.metric._sign * kernel(encoded_labels, blends)
+            )
+            del blends, chunk
 
     def _slow(
         self,
@@ -231,8 +457,9 @@ class EnsembleSelection(AbstractEnsemble):
             (self.num_input_models_,),
             dtype=np.float64,
         )
+        n_bags = self.n_bags if self.bagging else 1
         for ensemble_member in ensemble_members:
-            weight = float(ensemble_member[1]) / self.ensemble_size
+            weight = float(ensemble_member[1]) / (self.ensemble_size * n_bags)
             weights[ensemble_member[0]] = weight
 
         if np.sum(weights) < 1:
@@ -245,25 +472,39 @@ class EnsembleSelection(AbstractEnsemble):
         predictions: List[np.ndarray],
         labels: np.ndarray,
         fraction: float = 0.5,
-        n_bags: int = 20,
-    ) -> np.ndarray:
-        """Rich Caruana's ensemble selection method with bagging."""
-        raise ValueError('Bagging might not work with class-based interface!')
-        n_models = predictions.shape[0]
-        bag_size = int(n_models * fraction)
-
-        order_of_each_bag = []
-        for j in range(n_bags):
-            # Bagging a set of models
-            indices = sorted(random.sample(range(0, n_models), bag_size))
-            bag = predictions[indices, :, :]
-            order, _ = self._fit(bag, labels)
-            order_of_each_bag.append(order)
-
-        return np.array(
-            order_of_each_bag,
-            dtype=np.int64,
+    ) -> None:
+        """Rich Caruana's ensemble selection method with bagging.
+
+        Every bag selects an ensemble among a random subset of the models. The
+        bags run in a pool of ``n_jobs`` threads which all read the same
+        predictions; numpy releases the GIL for the expensive operations.
+        """
+        self.num_input_models_ = n_models = len(predictions)
+        bag_size = max(1, int(n_models * fraction))
+
+        kernel, encoded_labels, stacked_predictions = self._prepare_batched_scoring(
+            predictions, labels,
+        )
+        # Draw all random numbers up-front so that the result does not depend
+        # on the order in which the bags are processed
+        bags = [
+            np.sort(self.random_state.choice(n_models, bag_size, replace=False))
+            for _ in range(self.n_bags)
+        ]
+        seeds = self.random_state.randint(MAXINT, size=self.n_bags)
+        orders_and_trajectories = joblib.Parallel(n_jobs=self.n_jobs, prefer='threads')(
+            joblib.delayed(self._fast_selection)(
+                predictions=predictions,
+                labels=labels,
+                candidates=bag,
+                kernel=kernel,
+                encoded_labels=encoded_labels,
+                stacked_predictions=stacked_predictions,
+                random_state=np.random.RandomState(seed),
+            )
+            for bag, seed in zip(bags, seeds)
         )
+        self.indices_ = [index for order, _ in orders_and_trajectories for index in order]
 
     def predict(self, predictions: Union[np.ndarray, List[np.ndarray]]) -> np.ndarray:
 
@@ -43,6 +43,17 @@ class AutoSklearnEstimator(BaseEstimator):
         metadata_directory=None,
         metric=None,
         load_models: bool = True,
+        memory_mapped_predictions: bool = False,
+        memory_mapped_datamanager: bool = False,
+        evaluation_worker_pool: bool = False,
+        transform_cache_size_mb: Optional[float] = None,
+        incremental_ensemble: bool = False,
+        ensemble_n_bags: Optional[int] = None,
+        ensemble_n_jobs: int = 1,
+        ensemble_prune_by_run_loss: bool = False,
+        memory_aware_dispatch: bool = False,
+        shared_predict_input: bool = False,
+        shared_predict_preprocessing: bool = False,
     ):
         """
         Parameters
@@ -148,6 +159,30 @@ class AutoSklearnEstimator(BaseEstimator):
                 If no defaults are available, an exception is raised.
                 Refer to the 'n_splits' argument as 'folds'.
 
+            For a full cross-validation ('cv' or a cross-validator object),
+            ``fold_n_jobs`` sets how many folds are fitted in parallel within
+            the evaluation of a single configuration (default 1). The folds
+            are fitted in threads which share the ``memory_limit`` of the
+            evaluation.
+
+            A full cross-validation can also race against the best
+            configuration found so far: with ``racing_confidence`` (e.g.
+            0.95), the evaluation stops after ``racing_min_folds`` (default 2)
+            or more folds once the one-sided confidence interval of the mean
+            fold loss lies above the best loss of all completely evaluated
+            configurations. The average loss of the evaluated folds is
+            reported and the model is not used for the ensemble.
+
+            Iterative fits (``holdout-iterative-fit``, ``cv-iterative-fit``
+            and ``partial-cv-iterative-fit``) can be stopped early based on
+            their learning curve with ``early_stopping``: ``'median'`` stops
+            a fit whose best loss so far is worse than the median of the
+            running average losses of earlier fits after as many steps,
+            ``'extrapolation'`` stops a fit whose extrapolated final loss
+            does not beat the best final loss of earlier fits. Custom
+            policies subclass
+            ``autosklearn.evaluation.early_stopping.AbstractEarlyStopping``.
+
         tmp_folder : string, optional (None)
             folder to store configuration output and log files, if ``None``
             automatically use ``/tmp/autosklearn_tmp_$pid_$random_number``
@@ -189,6 +224,13 @@ class AutoSklearnEstimator(BaseEstimator):
               optimization/validation set, which would later on be used to build
               an ensemble.
             * ``'model'`` : do not save any model files
+            * ``'cv_model'`` : do not save the models fitted on the folds of a
+              cross-validation
+            * ``'y_valid'``, ``'y_test'`` : do not save the predictions for the
+              validation and test set. They are then only computed if the
+              targets of the set are known, to report its loss.
+            * ``'train_loss'`` : do not predict the training data to compute
+              the train loss of each evaluated configuration
 
         smac_scenario_args : dict, optional (None)
             Additional arguments inserted into the scenario of SMAC. See the
@@ -221,6 +263,97 @@ class AutoSklearnEstimator(BaseEstimator):
         load_models : bool, optional (True)
             Whether to load the models after fitting Auto-sklearn.
 
+        memory_mapped_predictions : bool, optional (False)
+            Store the predictions of the evaluated models as uncompressed
+            ``.npy`` files instead of pickling them. The ensemble builder then
+            memory maps them instead of reading a copy into memory, which
+            reduces the memory consumption when running several ensemble
+            builders on one machine.
+
+        memory_mapped_datamanager : bool, optional (False)
+            Store the arrays of the dataset as uncompressed ``.npy`` files
+            instead of pickling them together with the datamanager. Every
+            evaluation then memory maps them instead of unpickling a private
+            copy of the dataset, which makes starting an evaluation cheaper and
+            lets parallel workers share the memory of the dataset.
+
+        evaluation_worker_pool : bool, optional (False)
+            Evaluate the configurations in long-lived worker processes instead
+            of starting a new process for every configuration. The workers
+            keep the imported modules and the dataset in memory, which makes
+            evaluations on small datasets much cheaper. The limits
+            ``per_run_time_limit`` and ``memory_limit`` are still enforced,
+            a worker which exceeds them is replaced by a new one.
+
+        transform_cache_size_mb : float, optional (None)
+            Cache the fitted data and feature preprocessing steps of the
+            evaluated pipelines on disk, using at most this many MB. A pipeline
+            whose preprocessing steps have the same hyperparameters as a
+            previously evaluated one on the same training data reuses them
+            instead of fitting them again. When the cache is full, the least
+            recently used entries are deleted. The cache is disabled if None.
+
+        incremental_ensemble : bool, optional (False)
+            Update the ensemble right after each evaluated model instead of
+            periodically building it from scratch. The predictions of the new
+            model are scored once and merged into the best ``ensemble_nbest``
+            models, and the ensemble selection continues from the previous
+            ensemble. The update runs synchronously in the main process
+            between the evaluations, so large updates delay the optimization.
+            The ``memory_limit`` cannot be enforced on the main process; it
+            bounds the loaded predictions of the ensemble candidates instead,
+            dropping the worst candidates and reducing ``ensemble_nbest`` if
+            they exceed it.
+
+        ensemble_n_bags : int, optional (None)
+            If given, use bagged ensemble selection: the ensemble is the
+            average of the ensembles selected on ``ensemble_n_bags`` random
+            halves of the ``ensemble_nbest`` models. This is more robust
+            against overfitting the ensemble data set.
+
+        ensemble_n_jobs : int, optional (1)
+            Number of threads used to build the bags in parallel. ``-1`` uses
+            all processors.
+
+        ensemble_prune_by_run_loss : bool, optional (False)
+            Do not read the predictions of models which cannot be among the
+            ``ensemble_nbest`` best according to the loss reported for their
+            run. The files which are not read are ranked by this loss, which is
+            computed from the predictions before they are stored with the
+            precision of the predictions on disc, so it can differ slightly
+            from the loss of the stored predictions. Only used with the
+            ``holdout`` and ``holdout-iterative-fit`` resampling strategies,
+            for which the reported loss is the loss on the data the ensemble
+            is built on.
+
+        memory_aware_dispatch : bool, optional (False)
+            Predict the peak memory usage of a configuration from the size of
+            the data and the observed peak memory usage of evaluated
+            configurations with the same estimator and feature preprocessor,
+            and skip it as a memout if the prediction exceeds ``memory_limit``
+            by more than half. Configurations whose components were not
+            observed yet are always evaluated. With a ``subsample`` budget, a
+            configuration is only skipped on the budgets it would not fit
+            into.
+
+        shared_predict_input : bool, optional (False)
+            Write the input of ``predict`` and ``predict_proba`` once to a
+            temporary file and memory map it copy on write, instead of copying
+            it for every model of the ensemble. With ``n_jobs > 1``, the
+            worker processes map the same file instead of receiving a copy of
+            the input each. Sparse input is shared as its CSR components. The
+            input is only shared if the ensemble has more than one model, it is
+            evaluated by more than one process and it has at least 1 MB.
+
+        shared_predict_preprocessing : bool, optional (False)
+            In ``predict`` and ``predict_proba``, group the models of the
+            ensemble by their fitted data and feature preprocessing steps.
+            The input is transformed once per group and the transformed data
+            is passed to the final estimators of all models in the group.
+            Preprocessing steps are only grouped if they are identical after
+            fitting. The transformed data of a group is not split into
+            batches of ``batch_size``.
+
         Attributes
         ----------
 
@@ -262,6 +395,17 @@ class AutoSklearnEstimator(BaseEstimator):
         self.metadata_directory = metadata_directory
         self._metric = metric
         self._load_models = load_models
+        self.memory_mapped_predictions = memory_mapped_predictions
+        self.memory_mapped_datamanager = memory_mapped_datamanager
+        self.evaluation_worker_pool = evaluation_worker_pool
+        self.transform_cache_size_mb = transform_cache_size_mb
+        self.incremental_ensemble = incremental_ensemble
+        self.ensemble_n_bags = ensemble_n_bags
+        self.ensemble_n_jobs = ensemble_n_jobs
+        self.ensemble_prune_by_run_loss = ensemble_prune_by_run_loss
+        self.memory_aware_dispatch = memory_aware_dispatch
+        self.shared_predict_input = shared_predict_input
+        self.shared_predict_preprocessing = shared_predict_preprocessing
 
         self.automl_ = None  # type: Optional[AutoML]
         # n_jobs after conversion to a number (b/c default is None)
@@ -316,7 +460,18 @@ class AutoSklearnEstimator(BaseEstimator):
             smac_scenario_args=smac_scenario_args,
             logging_config=self.logging_config,
             metadata_directory=self.metadata_directory,
-            metric=self._metric
+            metric=self._metric,
+            memory_mapped_predictions=self.memory_mapped_predictions,
+            memory_mapped_datamanager=self.memory_mapped_datamanager,
+            evaluation_worker_pool=self.evaluation_worker_pool,
+            transform_cache_size_mb=self.transform_cache_size_mb,
+            incremental_ensemble=self.incremental_ensemble,
+            ensemble_n_bags=self.ensemble_n_bags,
+            ensemble_n_jobs=self.ensemble_n_jobs,
+            ensemble_prune_by_run_loss=self.ensemble_prune_by_run_loss,
+            memory_aware_dispatch=self.memory_aware_dispatch,
+            shared_predict_input=self.shared_predict_input,
+            shared_predict_preprocessing=self.shared_predict_preprocessing,
         )
 
         return automl
@@ -448,6 +603,39 @@ class AutoSklearnEstimator(BaseEstimator):
         return self.automl_.predict_proba(
              X, batch_size=batch_size, n_jobs=n_jobs)
 
+    def predict_stream(self, X, chunk_size=10000, batch_size=None, n_jobs=1):
+        """Predict chunk by chunk, for inputs which do not fit into memory.
+
+        Each chunk is passed through all models of the ensemble and their
+        predictions are averaged before the next chunk is read, so that
+        only one chunk and its predictions are in memory at a time.
+
+        Parameters
+        ----------
+        X : array-like, sparse matrix, DataFrame, str or iterable
+            Arrays, sparse matrices and DataFrames, including memory mapped
+            arrays, are split into chunks of ``chunk_size`` rows. A string
+            is the path of a ``.npy`` file, which is memory mapped and split
+            into chunks. Any other iterable, such as a generator reading
+            batches of rows from a file, yields the chunks itself.
+
+        chunk_size : int, optional (10000)
+            Number of rows per chunk.
+
+        batch_size : int, optional (None)
+            See ``predict``.
+
+        n_jobs : int, optional (1)
+            See ``predict``. The worker processes are reused for all chunks.
+
+        Returns
+        -------
+        iterator of arrays
+            The predictions of ``predict`` for each chunk.
+        """
+        return self.automl_.predict_stream(
+            X, chunk_size=chunk_size, batch_size=batch_size, n_jobs=n_jobs)
+
     def score(self, X, y):
         return self.automl_.score(X, y)
 
@@ -471,6 +659,39 @@ class AutoSklearnEstimator(BaseEstimator):
         """
         return self.automl_.get_models_with_weights()
 
+    def export_inference_bundle(self, directory):
+        """Write the final ensemble to ``directory`` as an inference bundle.
+
+        The bundle only contains what predicting needs: the fitted pipelines
+        of the ensemble members, their weights, the encoders of the input and
+        a manifest. Load it with
+        ``autosklearn.inference.load_inference_bundle``, which returns an
+        object with ``predict`` and ``predict_proba`` methods and memory
+        maps the arrays of the pipelines.
+
+        Parameters
+        ----------
+        directory : str
+            Directory to create the bundle in, must not exist yet.
+        """
+        self.automl_.export_inference_bundle(directory)
+
+    def get_predictor(self):
+        """Return a predictor of the final ensemble for low-latency
+        predictions on single rows or small batches.
+
+        The predictor checks that the models are fitted and looks up how to
+        encode the input and decode the predictions once, instead of on every
+        call of ``predict``. It evaluates the models of the ensemble one after
+        another in the calling process, and has ``predict`` and
+        ``predict_proba`` methods without ``batch_size`` and ``n_jobs``.
+
+        Returns
+        -------
+        autosklearn.inference.Predictor
+        """
+        return self.automl_.get_predictor()
+
     @property
     def cv_results_(self):
         return self.automl_.cv_results_
@@ -494,6 +715,9 @@ class AutoSklearnEstimator(BaseEstimator):
         - number of crashed target algorithm runs
         - number of target algorithm runs that exceeded the memory limit
         - number of target algorithm runs that exceeded the time limit
+        - wall and CPU time spent in the phases of all target algorithm runs,
+          e.g. fitting the preprocessing steps and the estimator, predicting
+          and storing the predictions
 
         Returns
         -------
@@ -644,6 +868,19 @@ class AutoSklearnClassifier(AutoSklearnEstimator):
 
         return pred_proba
 
+    def predict_proba_stream(self, X, chunk_size=10000, batch_size=None, n_jobs=1):
+        """Predict probabilities of classes chunk by chunk.
+
+        See ``predict_stream`` for the parameters.
+
+        Returns
+        -------
+        iterator of arrays
+            The class probabilities of each chunk.
+        """
+        return self.automl_.predict_proba_stream(
+            X, chunk_size=chunk_size, batch_size=batch_size, n_jobs=n_jobs)
+
     def _get_automl_class(self):
         return AutoMLClassifier
 
@@ -9,6 +9,7 @@ import traceback
 from typing import Dict, List, Optional, Tuple, Union
 
 from ConfigSpace import Configuration
+import dask.distributed
 import numpy as np
 import pynisher
 from smac.runhistory.runhistory import RunInfo, RunValue
@@ -22,6 +23,13 @@ from autosklearn.metrics import Scorer
 import autosklearn.evaluation.train_evaluator
 import autosklearn.evaluation.test_evaluator
 import autosklearn.evaluation.util
+from autosklearn.evaluation.memory_estimation import MemoryEstimator, get_components
+from autosklearn.evaluation.worker_pool import (
+    LocalQueue,
+    create_worker_pool_id,
+    get_worker_pool,
+    shutdown_worker_pool,
+)
 import autosklearn.util.logging_
 
 
@@ -91,6 +99,24 @@ def _encode_exit_status(exit_status):
         return str(exit_status)
 
 
+def _add_process_phase_timings(additional_run_info, start_time, end_time):
+    """Add the phases around the evaluator to the phase timings it reported.
+
+    ``process_spawn`` lasts from starting the evaluation until the evaluator
+    was created, ``queue_handoff`` from the evaluator reporting its result
+    until the evaluation returned, including the end of the process. Both are
+    only measured in wall time.
+    """
+    timestamps = additional_run_info.pop('phase_timestamps', None)
+    phase_timings = additional_run_info.get('phase_timings')
+    if timestamps is None or phase_timings is None:
+        return
+    phase_timings['process_spawn'] = {'wall_time': timestamps['start'] - start_time,
+                                      'calls': 1}
+    phase_timings['queue_handoff'] = {'wall_time': end_time - timestamps['result'],
+                                      'calls': 1}
+
+
 # TODO potentially log all inputs to this class to pickle them in order to do
 # easier debugging of potential crashes
 class ExecuteTaFuncWithQueue(AbstractTAFunc):
@@ -101,7 +127,8 @@ class ExecuteTaFuncWithQueue(AbstractTAFunc):
                  run_obj='quality', par_factor=1, all_scoring_functions=False,
                  output_y_hat_optimization=True, include=None, exclude=None,
                  memory_limit=None, disable_file_output=False, init_params=None,
-                 budget_type=None, ta=False, **resampling_strategy_args):
+                 budget_type=None, ta=False, use_worker_pool=False,
+                 memory_aware_dispatch=False, **resampling_strategy_args):
 
         if resampling_strategy == 'holdout':
             eval_function = autosklearn.evaluation.train_evaluator.eval_holdout
@@ -166,6 +193,10 @@ class ExecuteTaFuncWithQueue(AbstractTAFunc):
             memory_limit = int(math.ceil(memory_limit))
         self.memory_limit = memory_limit
 
+        # Evaluate the configurations in long-lived worker processes instead
+        # of starting a new pynisher process for every configuration
+        self.worker_pool_id = create_worker_pool_id() if use_worker_pool else None
+
         dm = self.backend.load_datamanager()
         if 'X_valid' in dm.data and 'Y_valid' in dm.data:
             self._get_validation_loss = True
@@ -176,6 +207,13 @@ class ExecuteTaFuncWithQueue(AbstractTAFunc):
         else:
             self._get_test_loss = False
 
+        # Skip configurations which are predicted to exceed the memory limit
+        # instead of starting them only to have them killed
+        if memory_aware_dispatch:
+            self.memory_estimator = MemoryEstimator.from_datamanager(dm)
+        else:
+            self.memory_estimator = None
+
     def run_wrapper(
         self,
         run_info: RunInfo,
@@ -232,8 +270,81 @@ class ExecuteTaFuncWithQueue(AbstractTAFunc):
         ):
             run_info = run_info._replace(cutoff=int(np.ceil(run_info.cutoff)))
 
+        predicted_memory = self._predict_memory_usage(run_info.config, run_info.budget)
+        if (
+            predicted_memory is not None
+            and self.memory_estimator.exceeds(predicted_memory, self.memory_limit)
+        ):
+            self.logger.debug(
+                'Skipping configuration %s, its memory usage is predicted to be %f MB, '
+                'more than the memory limit of %d MB.',
+                run_info.config, predicted_memory, self.memory_limit,
+            )
+            return run_info, RunValue(
+                status=StatusType.MEMOUT,
+                cost=self.worst_possible_result,
+                time=0.0,
+                additional_info={
+                    'error': 'Memout (predicted to use more than %d MB).' % self.memory_limit,
+                    'predicted_memory_mb': predicted_memory,
+                },
+                starttime=time.time(),
+                endtime=time.time(),
+            )
+
         return super().run_wrapper(run_info=run_info)
 
+    def _predict_memory_usage(
+        self,
+        config: Union[int, Configuration],
+        budget: float,
+    ) -> Optional[float]:
+        """Predicted peak memory usage of evaluating ``config`` in MB, or
+        ``None`` if memory aware dispatch is off or no run with the same
+        components was observed yet."""
+        if (
+            self.memory_estimator is None
+            or self.memory_limit is None
+            or isinstance(config, int)
+        ):
+            return None
+        components = get_components(config)
+        observations = self.backend.load_memory_observations()
+        # The priors are rough, so run the configuration to observe it
+        if not self.memory_estimator.is_observed(components, observations):
+            return None
+        return self.memory_estimator.predict(
+            components,
+            self.memory_estimator.get_data_mb(budget, self.budget_type),
+            observations,
+        )
+
+    def _log_memory_usage(
+        self,
+        config: Union[int, Configuration],
+        budget: float,
+        status: StatusType,
+        additional_run_info: Dict,
+    ) -> None:
+        if (
+            self.memory_estimator is None
+            or self.memory_limit is None
+            or isinstance(config, int)
+        ):
+            return
+        if status == StatusType.MEMOUT:
+            # Only a lower bound of the actual peak memory usage
+            peak_mb = self.memory_limit
+        elif 'peak_memory_mb' in additional_run_info:
+            peak_mb = additional_run_info['peak_memory_mb']
+        else:
+            return
+        self.backend.append_to_memory_log(
+            get_components(config),
+            self.memory_estimator.get_data_mb(budget, self.budget_type),
+            peak_mb,
+        )
+
     def run(
         self,
         config: Configuration,
@@ -244,7 +355,10 @@ class ExecuteTaFuncWithQueue(AbstractTAFunc):
         instance_specific: Optional[str] = None,
     ) -> Tuple[StatusType, float, float, Dict[str, Union[int, float, str, Dict, List, Tuple]]]:
 
-        queue = multiprocessing.Queue()
+        if self.worker_pool_id is not None:
+            queue = LocalQueue()
+        else:
+            queue = multiprocessing.Queue()
 
         if not (instance_specific is None or instance_specific == '0'):
             raise ValueError(instance_specific)
@@ -286,9 +400,16 @@ class ExecuteTaFuncWithQueue(AbstractTAFunc):
             obj_kwargs['resampling_strategy'] = self.resampling_strategy
             obj_kwargs['resampling_strategy_args'] = self.resampling_strategy_args
 
+        start_time = time.time()
         try:
-            obj = pynisher.enforce_limits(**arguments)(self.ta)
-            obj(**obj_kwargs)
+            if self.worker_pool_id is not None:
+                del obj_kwargs['queue']
+                worker_pool = get_worker_pool(self.worker_pool_id, self.memory_limit)
+                obj = worker_pool.run(self.ta, obj_kwargs, cutoff, queue)
+            else:
+                obj = pynisher.enforce_limits(**arguments)(self.ta)
+                obj(**obj_kwargs)
+            end_time = time.time()
         except Exception as e:
             exception_traceback = traceback.format_exc()
             error_message = repr(e)
@@ -427,12 +548,17 @@ class ExecuteTaFuncWithQueue(AbstractTAFunc):
                     additional_run_info[
                         'learning_curve_runtime'] = learning_curve_runtime
 
+        if info is not None:
+            _add_process_phase_timings(additional_run_info, start_time, end_time)
+
         if isinstance(config, int):
             origin = 'DUMMY'
         else:
             origin = getattr(config, 'origin', 'UNKNOWN')
         additional_run_info['configuration_origin'] = origin
 
+        self._log_memory_usage(config, budget, status, additional_run_info)
+
         runtime = float(obj.wall_clock_time)
 
         autosklearn.evaluation.util.empty_queue(queue)
@@ -441,3 +567,21 @@ class ExecuteTaFuncWithQueue(AbstractTAFunc):
             status, cost, runtime, additional_run_info,
         )
         return status, cost, runtime, additional_run_info
+
+    def shutdown_worker_pool(
+        self,
+        dask_client: Optional[dask.distributed.Client] = None,
+    ) -> None:
+        """Stop the worker processes, if any, of this process and of the
+        workers of ``dask_client``, in which the runs are evaluated if given."""
+        if self.worker_pool_id is None:
+            return
+        shutdown_worker_pool(self.worker_pool_id)
+        if dask_client is not None:
+            try:
+                dask_client.run(shutdown_worker_pool, self.worker_pool_id)
+            except Exception as e:
+                self.logger.warning(
+                    'Could not stop the evaluation worker processes of the dask workers: %s',
+                    repr(e),
+                )
@@ -17,8 +17,10 @@ from autosklearn.constants import (
 from autosklearn.pipeline.implementations.util import (
     convert_multioutput_multiclass_to_multilabel
 )
+from autosklearn.evaluation.memory_estimation import get_peak_memory_mb, reset_peak_memory
 from autosklearn.metrics import calculate_score, CLASSIFICATION_METRICS, REGRESSION_METRICS
 from autosklearn.util.logging_ import get_logger
+from autosklearn.util.stopwatch import PhaseTimer
 
 from ConfigSpace import Configuration
 
@@ -122,12 +124,16 @@ class AbstractEvaluator(object):
                  budget_type=None):
 
         self.starttime = time.time()
+        reset_peak_memory()
+        # Wall and CPU time spent in the phases of the evaluation
+        self.phase_timer = PhaseTimer()
 
         self.configuration = configuration
         self.backend = backend
         self.queue = queue
 
-        self.datamanager = self.backend.load_datamanager()
+        with self.phase_timer.time('load_datamanager'):
+            self.datamanager = self.backend.load_datamanager()
         self.include = include
         self.exclude = exclude
 
@@ -219,6 +225,9 @@ class AbstractEvaluator(object):
                                      include=self.include,
                                      exclude=self.exclude,
                                      init_params=self._init_params)
+            # Share the fitted preprocessing steps with other evaluations
+            model.transform_cache = self.backend.get_transform_cache()
+            model.phase_timer = self.phase_timer
         return model
 
     def _loss(self, y_true, y_hat, all_scoring_functions=None):
@@ -232,7 +241,13 @@ class AbstractEvaluator(object):
                 optimum - (metric.sign * actual_score)
                 For accuracy for example: optimum(1) - (+1 * actual score)
                 For logloss for example: optimum(0) - (-1 * actual score)
+
+        Returns ``None`` if there are no predictions, e.g. because the
+        train loss is disabled.
         """
+        if y_hat is None:
+            return None
+
         all_scoring_functions = (
             self.all_scoring_functions
             if all_scoring_functions is None
@@ -275,9 +290,10 @@ class AbstractEvaluator(object):
         self.duration = time.time() - self.starttime
 
         if file_output:
-            loss_, additional_run_info_ = self.file_output(
-                opt_pred, valid_pred, test_pred,
-            )
+            with self.phase_timer.time('file_output'):
+                loss_, additional_run_info_ = self.file_output(
+                    opt_pred, valid_pred, test_pred,
+                )
         else:
             loss_ = None
             additional_run_info_ = {}
@@ -308,6 +324,14 @@ class AbstractEvaluator(object):
             additional_run_info['validation_loss'] = validation_loss
         if test_loss is not None:
             additional_run_info['test_loss'] = test_loss
+        additional_run_info['phase_timings'] = self.phase_timer.as_dict()
+        peak_memory_mb = get_peak_memory_mb()
+        if peak_memory_mb is not None:
+            additional_run_info['peak_memory_mb'] = peak_memory_mb
+        # Used by ExecuteTaFuncWithQueue to time the process start and the
+        # handoff of the result
+        additional_run_info['phase_timestamps'] = {'start': self.starttime,
+                                                   'result': time.time()}
 
         rval_dict = {'loss': loss,
                      'additional_run_info': additional_run_info,
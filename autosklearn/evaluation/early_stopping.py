@@ -0,0 +1,158 @@
+# -*- encoding: utf-8 -*-
+"""Policies to stop the iterative fit of a configuration early.
+
+The iterative fit doubles the number of iterations in every step and computes
+the validation loss after each step. A policy looks at this learning curve and
+at the learning curves of the configurations which were fitted until the end
+before, which the evaluations share through the backend, and decides whether
+fitting the configuration any further is worth it.
+
+A learning curve is a list of ``(n_iter, loss)`` pairs, where ``n_iter`` is the
+total number of iterations the model was fitted for when the loss was
+computed.
+"""
+from abc import ABCMeta, abstractmethod
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+__all__ = [
+    'AbstractEarlyStopping',
+    'CurveExtrapolation',
+    'MedianStopping',
+    'get_early_stopping',
+]
+
+
+LearningCurve = Sequence[Tuple[float, float]]
+
+
+class AbstractEarlyStopping(object):
+    """Decides whether to stop the iterative fit of a configuration.
+
+    Parameters
+    ----------
+    min_steps : int
+        Never stop before the learning curve has this many points.
+    """
+    __metaclass__ = ABCMeta
+
+    def __init__(self, min_steps: int = 3):
+        self.min_steps = min_steps
+
+    def should_stop(
+        self,
+        curve: LearningCurve,
+        max_iter: float,
+        finished_curves: List[LearningCurve],
+    ) -> bool:
+        """Whether to stop fitting the configuration with the learning curve
+        ``curve``, which would be fitted for up to ``max_iter`` iterations."""
+        if len(curve) < self.min_steps:
+            return False
+        return self._should_stop(curve, max_iter, finished_curves)
+
+    @abstractmethod
+    def _should_stop(
+        self,
+        curve: LearningCurve,
+        max_iter: float,
+        finished_curves: List[LearningCurve],
+    ) -> bool:
+        pass
+
+
+class MedianStopping(AbstractEarlyStopping):
+    """Median stopping rule.
+
+    Stops a configuration if the best loss of its first ``t`` points is worse
+    than the median of the running averages of the first ``t`` points of the
+    finished learning curves.
+
+    Parameters
+    ----------
+    min_steps : int
+        Never stop before the learning curve has this many points.
+    min_curves : int
+        Never stop if there are fewer finished learning curves with at least
+        as many points as the learning curve to compare to.
+    """
+
+    def __init__(self, min_steps: int = 3, min_curves: int = 5):
+        super().__init__(min_steps=min_steps)
+        self.min_curves = min_curves
+
+    def _should_stop(
+        self,
+        curve: LearningCurve,
+        max_iter: float,
+        finished_curves: List[LearningCurve],
+    ) -> bool:
+        n_steps = len(curve)
+        running_averages = [
+            np.mean([loss for _, loss in finished_curve[:n_steps]])
+            for finished_curve in finished_curves
+            if len(finished_curve) >= n_steps
+        ]
+        if len(running_averages) < max(1, self.min_curves):
+            return False
+        best_loss = min(loss for _, loss in curve)
+        return bool(best_loss > np.median(running_averages))
+
+
+class CurveExtrapolation(AbstractEarlyStopping):
+    """Stops a configuration if its extrapolated final loss does not beat the
+    best final loss of the finished learning curves.
+
+    The learning curve is extrapolated to ``max_iter`` iterations by a least
+    squares fit of ``loss = a + b / n_iter``.
+
+    Parameters
+    ----------
+    min_steps : int
+        Never stop before the learning curve has this many points.
+    margin : float
+        Only stop if the extrapolated loss is worse than the best final loss
+        by more than this.
+    """
+
+    def __init__(self, min_steps: int = 3, margin: float = 0.0):
+        super().__init__(min_steps=min_steps)
+        self.margin = margin
+
+    def _should_stop(
+        self,
+        curve: LearningCurve,
+        max_iter: float,
+        finished_curves: List[LearningCurve],
+    ) -> bool:
+        final_losses = [finished_curve[-1][1] for finished_curve in finished_curves
+                        if len(finished_curve) > 0]
+        if not final_losses:
+            return False
+        n_iters = np.array([n_iter for n_iter, _ in curve], dtype=float)
+        losses = np.array([loss for _, loss in curve], dtype=float)
+        if len(np.unique(n_iters)) < 2:
+            return False
+        b, a = np.polyfit(1 / n_iters, losses, deg=1)
+        projected_loss = a + b / max_iter
+        return bool(projected_loss > min(final_losses) + self.margin)
+
+
+def get_early_stopping(
+    early_stopping: Union[None, str, AbstractEarlyStopping],
+) -> Optional[AbstractEarlyStopping]:
+    """Return the policy for the ``early_stopping`` resampling strategy
+    argument, which is either ``None``, ``'median'``, ``'extrapolation'`` or
+    a policy object."""
+    if early_stopping is None or isinstance(early_stopping, AbstractEarlyStopping):
+        return early_stopping
+    elif early_stopping == 'median':
+        return MedianStopping()
+    elif early_stopping == 'extrapolation':
+        return CurveExtrapolation()
+    else:
+        raise ValueError('Unknown early stopping policy %s, must be one of '
+                         '\'median\', \'extrapolation\' or an instance of '
+                         'AbstractEarlyStopping.' % str(early_stopping))
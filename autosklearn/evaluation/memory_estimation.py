@@ -0,0 +1,217 @@
+# -*- encoding: utf-8 -*-
+"""Prediction of the peak memory usage of evaluating a configuration.
+
+The prediction is ``overhead_mb + factor * data_mb``: ``data_mb`` is the size
+of the training data after one-hot encoding (scaled down by a subsample
+budget), and ``factor`` depends on the estimator and the feature
+preprocessor of the configuration. Before any run was observed, the factor
+is a rough prior per component. Afterwards it is estimated from the peak
+memory usage of the runs with the same components, which the evaluations
+share through the backend. As the priors are rough, only predictions based on
+observations are used to skip configurations.
+"""
+import resource
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import scipy.sparse
+
+from autosklearn.util.data import predict_RAM_usage
+
+
+__all__ = [
+    'MemoryEstimator',
+    'get_components',
+    'get_peak_memory_mb',
+    'reset_peak_memory',
+]
+
+
+# Number of runs started in this process, and whether the peak memory usage
+# was reset at the start of the current one
+_runs_in_process = 0
+_peak_memory_reset = False
+
+
+def reset_peak_memory() -> None:
+    """Start measuring the peak memory usage of a run.
+
+    Long-lived evaluation workers run one configuration after the other, so
+    the peak memory usage of the process includes the earlier runs. Writing 5
+    to ``/proc/self/clear_refs`` resets it to the current memory usage
+    (Linux >= 4.0).
+    """
+    global _runs_in_process, _peak_memory_reset
+    _runs_in_process += 1
+    try:
+        with open('/proc/self/clear_refs', 'w') as fh:
+            fh.write('5')
+        _peak_memory_reset = True
+    except OSError:
+        _peak_memory_reset = False
+
+
+def get_peak_memory_mb() -> Optional[float]:
+    """Peak memory usage in MB since ``reset_peak_memory``, or ``None`` if it
+    cannot be told apart from the earlier runs in this process."""
+    if _peak_memory_reset:
+        try:
+            with open('/proc/self/status') as fh:
+                for line in fh:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+    if _runs_in_process > 1:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Peak memory usage of fitting an estimator relative to the size of the data
+_ESTIMATOR_FACTORS = {
+    'adaboost': 4.0,
+    'extra_trees': 10.0,
+    'gaussian_process': 20.0,
+    'gradient_boosting': 6.0,
+    'k_nearest_neighbors': 3.0,
+    'libsvm_svc': 10.0,
+    'libsvm_svr': 10.0,
+    'mlp': 6.0,
+    'random_forest': 10.0,
+}
+_DEFAULT_ESTIMATOR_FACTOR = 4.0
+
+# Additional factor of feature preprocessors which enlarge the data
+_PREPROCESSOR_FACTORS = {
+    'kernel_pca': 4.0,
+    'kitchen_sinks': 4.0,
+    'nystroem_sampler': 4.0,
+    'polynomial': 8.0,
+    'random_trees_embedding': 4.0,
+}
+
+
+def get_components(configuration: Any) -> Tuple[Optional[str], Optional[str]]:
+    """Return the names of the estimator and the feature preprocessor of a
+    configuration."""
+    values = configuration.get_dictionary()
+    estimator = values.get('classifier:__choice__', values.get('regressor:__choice__'))
+    return estimator, values.get('feature_preprocessor:__choice__')
+
+
+def _get_data_mb(X: Any, feat_type: Sequence[str]) -> float:
+    if scipy.sparse.issparse(X):
+        X = X.tocsr()
+        nbytes = X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    else:
+        categorical = [feat.lower() == 'categorical' for feat in feat_type]
+        if any(categorical):
+            nbytes = predict_RAM_usage(np.asarray(X), categorical)
+        else:
+            nbytes = np.asarray(X).nbytes
+    return nbytes / 1024 / 1024
+
+
+class MemoryEstimator(object):
+    """Predicts the peak memory usage of evaluating a configuration in MB.
+
+    Parameters
+    ----------
+    data_mb : float
+        Size of the training data in MB.
+    overhead_mb : float
+        Memory usage of an evaluation independent of the data, used until the
+        overhead was observed.
+    min_observations : int
+        Number of observed runs with the same components needed to replace the
+        prior factor of the components by the observed one.
+    margin : float
+        Only configurations predicted to use more than ``margin`` times the
+        memory limit are skipped.
+    """
+
+    def __init__(self, data_mb: float, overhead_mb: float = 200.0,
+                 min_observations: int = 2, margin: float = 1.5):
+        self.data_mb = data_mb
+        self.overhead_mb = overhead_mb
+        self.min_observations = min_observations
+        self.margin = margin
+
+    @classmethod
+    def from_datamanager(cls, datamanager: Any, **kwargs: Any) -> 'MemoryEstimator':
+        return cls(_get_data_mb(datamanager.data['X_train'], datamanager.feat_type), **kwargs)
+
+    def get_data_mb(self, budget: float, budget_type: Optional[str]) -> float:
+        """Size of the data a run with ``budget`` is fitted on."""
+        if budget_type == 'subsample' and budget > 0:
+            return self.data_mb * budget / 100
+        return self.data_mb
+
+    @staticmethod
+    def get_prior_factor(components: Tuple[Optional[str], Optional[str]]) -> float:
+        estimator, preprocessor = components
+        return (_ESTIMATOR_FACTORS.get(estimator, _DEFAULT_ESTIMATOR_FACTOR)
+                * _PREPROCESSOR_FACTORS.get(preprocessor, 1.0))
+
+    def predict(
+        self,
+        components: Tuple[Optional[str], Optional[str]],
+        data_mb: float,
+        observations: List[Tuple[List[Optional[str]], float, float]],
+    ) -> float:
+        """Predict the peak memory usage in MB.
+
+        Parameters
+        ----------
+        components : tuple
+            Names of the estimator and the feature preprocessor, see
+            ``get_components``.
+        data_mb : float
+            Size of the data the configuration is fitted on, see
+            ``get_data_mb``.
+        observations : list
+            ``(components, data_mb, peak_mb)`` of the runs so far.
+        """
+        overhead_mb = self._get_overhead_mb(observations)
+        ratios = self._get_ratios(components, overhead_mb, observations)
+        if len(ratios) >= max(1, self.min_observations):
+            factor = max(float(np.median(ratios)), 1.0)
+        else:
+            factor = self.get_prior_factor(components)
+        return overhead_mb + factor * data_mb
+
+    def is_observed(
+        self,
+        components: Tuple[Optional[str], Optional[str]],
+        observations: List[Tuple[List[Optional[str]], float, float]],
+    ) -> bool:
+        """Whether the prediction for ``components`` is based on observed
+        runs instead of the prior factor."""
+        ratios = self._get_ratios(components, self._get_overhead_mb(observations), observations)
+        return len(ratios) >= max(1, self.min_observations)
+
+    def exceeds(self, predicted_mb: float, memory_limit: float) -> bool:
+        """Whether a configuration predicted to use ``predicted_mb`` is
+        skipped under ``memory_limit``."""
+        return predicted_mb > self.margin * memory_limit
+
+    @staticmethod
+    def _get_ratios(
+        components: Tuple[Optional[str], Optional[str]],
+        overhead_mb: float,
+        observations: List[Tuple[List[Optional[str]], float, float]],
+    ) -> List[float]:
+        return [
+            (peak_mb - overhead_mb) / observed_data_mb
+            for observed_components, observed_data_mb, peak_mb in observations
+            if tuple(observed_components) == tuple(components) and observed_data_mb > 0
+        ]
+
+    def _get_overhead_mb(self, observations: List[Tuple[Any, float, float]]) -> float:
+        # The smallest peak observed so far bounds the overhead of a run
+        peaks = [peak_mb for _, _, peak_mb in observations]
+        if not peaks:
+            return self.overhead_mb
+        return min(min(peaks), self.overhead_mb)
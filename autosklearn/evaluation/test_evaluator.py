@@ -67,8 +67,9 @@ class TestEvaluator(AbstractEvaluator):
     def predict_and_loss(self, train=False):
 
         if train:
-            Y_pred = self.predict_function(self.X_train, self.model,
-                                           self.task_type, self.Y_train)
+            with self.phase_timer.time('predict_train'):
+                Y_pred = self.predict_function(self.X_train, self.model,
+                                               self.task_type, self.Y_train)
             score = calculate_score(
                 solution=self.Y_train,
                 prediction=Y_pred,
@@ -76,8 +77,9 @@ class TestEvaluator(AbstractEvaluator):
                 metric=self.metric,
                 all_scoring_functions=self.all_scoring_functions)
         else:
-            Y_pred = self.predict_function(self.X_test, self.model,
-                                           self.task_type, self.Y_train)
+            with self.phase_timer.time('predict_test'):
+                Y_pred = self.predict_function(self.X_test, self.model,
+                                               self.task_type, self.Y_train)
             score = calculate_score(
                 solution=self.Y_test,
                 prediction=Y_pred,
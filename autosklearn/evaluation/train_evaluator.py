@@ -1,7 +1,10 @@
+import concurrent.futures
 import copy
 import json
+import warnings
 
 import numpy as np
+import scipy.stats
 from smac.tae import TAEAbortException, StatusType
 from sklearn.model_selection import ShuffleSplit, StratifiedShuffleSplit, KFold, \
     StratifiedKFold, train_test_split, BaseCrossValidator, PredefinedSplit
@@ -11,6 +14,7 @@ from autosklearn.evaluation.abstract_evaluator import (
     AbstractEvaluator,
     _fit_and_suppress_warnings,
 )
+from autosklearn.evaluation.early_stopping import get_early_stopping
 from autosklearn.constants import (
     CLASSIFICATION_TASKS,
     MULTILABEL_CLASSIFICATION,
@@ -54,6 +58,11 @@ __baseCrossValidator_defaults__ = {'GroupKFold': {'n_splits': 3},
                                    }
 
 
+# Resampling strategy arguments which configure the evaluator, not the splitter
+_EVALUATOR_ARGS = ('fold_n_jobs', 'racing_confidence', 'racing_min_folds',
+                   'early_stopping')
+
+
 def _get_y_array(y, task_type):
     if task_type in CLASSIFICATION_TASKS and task_type != \
             MULTILABEL_CLASSIFICATION:
@@ -178,10 +187,26 @@ class TrainEvaluator(AbstractEvaluator):
             self.resampling_strategy_args = {}
         else:
             self.resampling_strategy_args = resampling_strategy_args
-        self.splitter = self.get_splitter(self.datamanager)
-        self.num_cv_folds = self.splitter.get_n_splits(
-            groups=self.resampling_strategy_args.get('groups')
-        )
+        # The splits are computed once per run and stored in the backend,
+        # only split the data here if they are not available
+        self.splits = self.backend.load_resampling_splits()
+        if self.splits is None:
+            self.splitter = self.get_splitter(self.datamanager)
+            self.num_cv_folds = self.splitter.get_n_splits(
+                groups=self.resampling_strategy_args.get('groups')
+            )
+        else:
+            self.splitter = None
+            self.num_cv_folds = len(self.splits)
+        # Number of folds of a full cross-validation to fit in parallel
+        self.fold_n_jobs = self.resampling_strategy_args.get('fold_n_jobs', 1)
+        # Stop a full cross-validation once the evaluated folds show with
+        # this confidence that the configuration does not beat the best one
+        self.racing_confidence = self.resampling_strategy_args.get('racing_confidence')
+        self.racing_min_folds = self.resampling_strategy_args.get('racing_min_folds', 2)
+        # Policy to stop an iterative fit based on its learning curve
+        self.early_stopping = get_early_stopping(
+            self.resampling_strategy_args.get('early_stopping'))
         self.X_train = self.datamanager.data['X_train']
         self.Y_train = self.datamanager.data['Y_train']
         self.Y_optimization = None
@@ -204,10 +229,7 @@ class TrainEvaluator(AbstractEvaluator):
         if iterative:
             if self.num_cv_folds == 1:
 
-                for train_split, test_split in self.splitter.split(
-                    self.X_train, self.Y_train,
-                    groups=self.resampling_strategy_args.get('groups')
-                ):
+                for train_split, test_split in self.get_splits():
                     self.Y_optimization = self.Y_train[test_split]
                     self.Y_actual_train = self.Y_train[train_split]
                     self._partial_fit_and_predict_iterative(0, train_indices=train_split,
@@ -250,8 +272,6 @@ class TrainEvaluator(AbstractEvaluator):
                 Xt_array = [None] * self.num_cv_folds
                 fit_params_array = [{}] * self.num_cv_folds
 
-                y = _get_y_array(self.Y_train, self.task_type)
-
                 # stores train loss of each fold.
                 train_losses = [np.NaN] * self.num_cv_folds
                 # used as weights when averaging train losses.
@@ -261,14 +281,14 @@ class TrainEvaluator(AbstractEvaluator):
                 # weights for opt_losses.
                 opt_fold_weights = [np.NaN] * self.num_cv_folds
 
-                while not all(converged):
+                # (n_iter, loss) after each step, for early stopping
+                learning_curve = []
+                finished_curves = self._load_learning_curves()
+                stopped_early = False
 
-                    splitter = self.get_splitter(self.datamanager)
+                while not all(converged):
 
-                    for i, (train_indices, test_indices) in enumerate(splitter.split(
-                            self.X_train, y,
-                            groups=self.resampling_strategy_args.get('groups')
-                    )):
+                    for i, (train_indices, test_indices) in enumerate(self.get_splits()):
                         if converged[i]:
                             continue
 
@@ -345,16 +365,7 @@ class TrainEvaluator(AbstractEvaluator):
                     opt_fold_weights = [w / sum(opt_fold_weights)
                                         for w in opt_fold_weights]
 
-                    # train_losses is a list of either scalars or dicts. If it contains
-                    # dicts, then train_loss is computed using the target metric
-                    # (self.metric).
-                    if all(isinstance(elem, dict) for elem in train_losses):
-                        train_loss = np.average([train_losses[i][str(self.metric)]
-                                                 for i in range(self.num_cv_folds)],
-                                                weights=train_fold_weights,
-                                                )
-                    else:
-                        train_loss = np.average(train_losses, weights=train_fold_weights)
+                    train_loss = self._average_train_losses(train_losses, train_fold_weights)
 
                     # if all_scoring_function is true, return a dict of opt_loss.
                     # Otherwise, return a scalar.
@@ -405,6 +416,15 @@ class TrainEvaluator(AbstractEvaluator):
                     self.Y_optimization = Y_targets
                     self.Y_actual_train = Y_train_targets
 
+                    learning_curve.append((max(total_n_iterations), opt_loss))
+                    if (
+                        not all(converged)
+                        and self._should_stop_early(learning_curve, max_iter, finished_curves)
+                    ):
+                        converged = [True] * self.num_cv_folds
+                        stopped_early = True
+                        additional_run_info = {'early_stopping_iter': max(total_n_iterations)}
+
                     self.model = self._get_model()
                     status = StatusType.DONOTADVANCE
                     if any([model_current_iter == max_iter
@@ -422,6 +442,9 @@ class TrainEvaluator(AbstractEvaluator):
                         status=status,
                     )
 
+                if not stopped_early:
+                    self._append_to_learning_curve_log(learning_curve)
+
         else:
 
             self.partial = False
@@ -433,8 +456,6 @@ class TrainEvaluator(AbstractEvaluator):
             additional_run_info = None
             train_splits = [None] * self.num_cv_folds
 
-            y = _get_y_array(self.Y_train, self.task_type)
-
             train_losses = []  # stores train loss of each fold.
             train_fold_weights = []  # used as weights when averaging train losses.
             opt_losses = []  # stores opt (validation) loss of each fold.
@@ -443,41 +464,22 @@ class TrainEvaluator(AbstractEvaluator):
             # TODO: mention that no additional run info is possible in this
             # case! -> maybe remove full CV from the train evaluator anyway and
             # make the user implement this!
-            for i, (train_split, test_split) in enumerate(self.splitter.split(
-                    self.X_train, y,
-                    groups=self.resampling_strategy_args.get('groups')
-            )):
-
-                # TODO add check that split is actually an integer array,
-                # not a boolean array (to allow indexed assignement of
-                # training data later).
-
-                if self.budget_type is None:
-                    (
-                        train_pred,
-                        opt_pred,
-                        valid_pred,
-                        test_pred,
-                        additional_run_info,
-                    ) = (
-                        self._partial_fit_and_predict_standard(
-                            i, train_indices=train_split, test_indices=test_split,
-                            add_model_to_self=self.num_cv_folds == 1,
-                        )
-                    )
-                else:
-                    (
-                        train_pred,
-                        opt_pred,
-                        valid_pred,
-                        test_pred,
-                        additional_run_info,
-                    ) = (
-                        self._partial_fit_and_predict_budget(
-                            i, train_indices=train_split, test_indices=test_split,
-                            add_model_to_self=self.num_cv_folds == 1,
-                        )
-                    )
+            splits = self.get_splits()
+            best_loss = None
+            if self.racing_confidence is not None and self.num_cv_folds > 1:
+                best_loss = self.backend.load_best_cv_loss(self.budget)
+            fold_results = self._fit_and_predict_folds(splits)
+
+            for i, ((train_split, test_split), fold_result) in enumerate(
+                zip(splits, fold_results)
+            ):
+                (
+                    train_pred,
+                    opt_pred,
+                    valid_pred,
+                    test_pred,
+                    additional_run_info,
+                ) = fold_result
 
                 if (
                     additional_run_info is not None
@@ -517,20 +519,18 @@ class TrainEvaluator(AbstractEvaluator):
                 # the average.
                 opt_fold_weights.append(len(test_split))
 
+                if best_loss is not None and self._race_is_lost(opt_losses, best_loss):
+                    fold_results.close()
+                    self._finish_lost_race(train_losses, train_fold_weights,
+                                           opt_losses, opt_fold_weights, best_loss)
+                    return
+
             # Compute weights of each fold based on the number of samples in each
             # fold.
             train_fold_weights = [w / sum(train_fold_weights) for w in train_fold_weights]
             opt_fold_weights = [w / sum(opt_fold_weights) for w in opt_fold_weights]
 
-            # train_losses is a list of either scalars or dicts. If it contains dicts,
-            # then train_loss is computed using the target metric (self.metric).
-            if all(isinstance(elem, dict) for elem in train_losses):
-                train_loss = np.average([train_losses[i][str(self.metric)]
-                                         for i in range(self.num_cv_folds)],
-                                        weights=train_fold_weights,
-                                        )
-            else:
-                train_loss = np.average(train_losses, weights=train_fold_weights)
+            train_loss = self._average_train_losses(train_losses, train_fold_weights)
 
             # if all_scoring_function is true, return a dict of opt_loss. Otherwise,
             # return a scalar.
@@ -576,6 +576,12 @@ class TrainEvaluator(AbstractEvaluator):
             self.Y_optimization = Y_targets
             self.Y_actual_train = Y_train_targets
 
+            if self.racing_confidence is not None and self.num_cv_folds > 1:
+                self.backend.append_to_cv_loss_log(
+                    self.budget,
+                    float(opt_loss[self.metric.name] if isinstance(opt_loss, dict) else opt_loss),
+                )
+
             if self.num_cv_folds > 1:
                 self.model = self._get_model()
                 # Bad style, but necessary for unit testing that self.model is
@@ -627,15 +633,7 @@ class TrainEvaluator(AbstractEvaluator):
         if self.budget_type is not None:
             raise NotImplementedError()
 
-        y = _get_y_array(self.Y_train, self.task_type)
-        for i, (train_split, test_split) in enumerate(self.splitter.split(
-                self.X_train, y,
-                groups=self.resampling_strategy_args.get('groups')
-        )):
-            if i != fold:
-                continue
-            else:
-                break
+        train_split, test_split = self.get_splits()[fold]
 
         if self.num_cv_folds > 1:
             self.Y_optimization = self.Y_train[test_split]
@@ -709,8 +707,15 @@ class TrainEvaluator(AbstractEvaluator):
                 max_iter = model_max_iter
             model_current_iter = 0
 
+            # (n_iter, loss) after each step, for early stopping
+            learning_curve = []
+            finished_curves = self._load_learning_curves()
+            stopped_early = False
+
             while (
-                not model.configuration_fully_fitted() and model_current_iter < max_iter
+                not stopped_early
+                and not model.configuration_fully_fitted()
+                and model_current_iter < max_iter
             ):
                 n_iter = int(2**iteration/2) if iteration > 1 else 2
                 total_n_iteration += n_iter
@@ -745,6 +750,16 @@ class TrainEvaluator(AbstractEvaluator):
                 else:
                     final_call = False
 
+                learning_curve.append((total_n_iteration, loss))
+                if (
+                    not final_call
+                    and self._should_stop_early(learning_curve, max_iter, finished_curves)
+                ):
+                    final_call = True
+                    stopped_early = True
+                    additional_run_info = dict(additional_run_info or {},
+                                               early_stopping_iter=total_n_iteration)
+
                 self.finish_up(
                     loss=loss,
                     train_loss=train_loss,
@@ -758,6 +773,8 @@ class TrainEvaluator(AbstractEvaluator):
                 )
                 iteration += 1
 
+            if not stopped_early:
+                self._append_to_learning_curve_log(learning_curve)
             return
         else:
 
@@ -793,6 +810,119 @@ class TrainEvaluator(AbstractEvaluator):
             )
             return
 
+    def _fit_and_predict_folds(self, splits):
+        """Fit and predict the folds of a full cross-validation, yields the
+        results in the order of the folds.
+
+        With ``fold_n_jobs`` in the resampling strategy arguments, up to that
+        many folds are fitted at the same time in threads of this process.
+        Threads share the memory limit of the process, so the limit holds for
+        all folds together.
+        """
+        # TODO add check that split is actually an integer array,
+        # not a boolean array (to allow indexed assignement of
+        # training data later).
+        if self.budget_type is None:
+            partial_fit_and_predict = self._partial_fit_and_predict_standard
+        else:
+            partial_fit_and_predict = self._partial_fit_and_predict_budget
+
+        def fit_and_predict_fold(fold):
+            train_split, test_split = splits[fold]
+            return partial_fit_and_predict(
+                fold, train_indices=train_split, test_indices=test_split,
+                add_model_to_self=self.num_cv_folds == 1,
+            )
+
+        n_jobs = min(self.fold_n_jobs, len(splits))
+        if n_jobs <= 1:
+            for fold in range(len(splits)):
+                yield fit_and_predict_fold(fold)
+            return
+
+        # _fit_and_suppress_warnings replaces the warning filters of the whole
+        # process, restore them once all threads are done
+        with warnings.catch_warnings():
+            with concurrent.futures.ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                futures = [executor.submit(fit_and_predict_fold, fold)
+                           for fold in range(len(splits))]
+                try:
+                    for future in futures:
+                        yield future.result()
+                finally:
+                    # Do not start the remaining folds when the caller stops early
+                    for future in futures:
+                        future.cancel()
+
+    def _load_learning_curves(self):
+        if self.early_stopping is None:
+            return []
+        return self.backend.load_learning_curves(self.budget)
+
+    def _append_to_learning_curve_log(self, learning_curve):
+        if self.early_stopping is None or not learning_curve:
+            return
+        self.backend.append_to_learning_curve_log(
+            self.budget,
+            [(n_iter, float(loss[self.metric.name] if isinstance(loss, dict) else loss))
+             for n_iter, loss in learning_curve],
+        )
+
+    def _should_stop_early(self, learning_curve, max_iter, finished_curves):
+        """Whether the early stopping policy stops the iterative fit with the
+        learning curve so far."""
+        if self.early_stopping is None:
+            return False
+        curve = [(n_iter, loss[self.metric.name] if isinstance(loss, dict) else loss)
+                 for n_iter, loss in learning_curve]
+        return self.early_stopping.should_stop(curve, max_iter, finished_curves)
+
+    def _race_is_lost(self, opt_losses, best_loss):
+        """Whether the losses of the folds evaluated so far show that the
+        configuration does not beat ``best_loss``.
+
+        This is the case if the lower bound of the one-sided confidence
+        interval (Student's t) of the mean fold loss is above ``best_loss``.
+        """
+        n_folds = len(opt_losses)
+        if n_folds < max(2, self.racing_min_folds) or n_folds == self.num_cv_folds:
+            return False
+        losses = [loss[self.metric.name] if isinstance(loss, dict) else loss
+                  for loss in opt_losses]
+        standard_error = np.std(losses, ddof=1) / np.sqrt(n_folds)
+        t = scipy.stats.t.ppf(self.racing_confidence, df=n_folds - 1)
+        return np.mean(losses) - t * standard_error > best_loss
+
+    def _finish_lost_race(self, train_losses, train_fold_weights, opt_losses,
+                          opt_fold_weights, best_loss):
+        """Report the average loss of the folds evaluated so far.
+
+        The predictions do not cover all data points, so they are neither
+        stored nor used for the ensemble.
+        """
+        train_loss = self._average_train_losses(train_losses, train_fold_weights)
+
+        if self.all_scoring_functions is True:
+            opt_loss = {}
+            for metric in opt_losses[0].keys():
+                opt_loss[metric] = np.average([elem[metric] for elem in opt_losses],
+                                              weights=opt_fold_weights)
+        else:
+            opt_loss = np.average(opt_losses, weights=opt_fold_weights)
+
+        self.finish_up(
+            loss=opt_loss,
+            train_loss=train_loss,
+            opt_pred=None,
+            valid_pred=None,
+            test_pred=None,
+            additional_run_info={'racing_folds': len(opt_losses),
+                                 'racing_best_loss': best_loss},
+            file_output=False,
+            final_call=True,
+            status=StatusType.DONOTADVANCE,
+        )
+
     def _partial_fit_and_predict_standard(self, fold, train_indices, test_indices,
                                           add_model_to_self=False):
         model = self._get_model()
@@ -869,168 +999,231 @@ class TrainEvaluator(AbstractEvaluator):
         )
 
     def _predict(self, model, test_indices, train_indices):
-        train_pred = self.predict_function(self.X_train[train_indices],
-                                           model, self.task_type,
-                                           self.Y_train[train_indices])
-
-        opt_pred = self.predict_function(self.X_train[test_indices],
-                                         model, self.task_type,
-                                         self.Y_train[train_indices])
-
-        if self.X_valid is not None:
-            X_valid = self.X_valid.copy()
-            valid_pred = self.predict_function(X_valid, model,
-                                               self.task_type,
-                                               self.Y_train[train_indices])
+        # Only predict the data sets whose predictions are used: the training
+        # data for the train loss, and the validation and test data for their
+        # losses or to store the predictions. Predicting does not modify X,
+        # the data preprocessing selects the columns with a mask and thereby
+        # copies them before rescaling and imputing in place.
+        disabled = self.disable_file_output if isinstance(self.disable_file_output, list) \
+            else []
+
+        if 'train_loss' in disabled:
+            train_pred = None
+        else:
+            with self.phase_timer.time('predict_train'):
+                train_pred = self.predict_function(self.X_train[train_indices],
+                                                   model, self.task_type,
+                                                   self.Y_train[train_indices])
+
+        with self.phase_timer.time('predict_optimization'):
+            opt_pred = self.predict_function(self.X_train[test_indices],
+                                             model, self.task_type,
+                                             self.Y_train[train_indices])
+
+        if self.X_valid is not None and self._predictions_are_used(self.y_valid, 'y_valid'):
+            with self.phase_timer.time('predict_valid'):
+                valid_pred = self.predict_function(self.X_valid, model,
+                                                   self.task_type,
+                                                   self.Y_train[train_indices])
         else:
             valid_pred = None
 
-        if self.X_test is not None:
-            X_test = self.X_test.copy()
-            test_pred = self.predict_function(X_test, model,
-                                              self.task_type,
-                                              self.Y_train[train_indices])
+        if self.X_test is not None and self._predictions_are_used(self.y_test, 'y_test'):
+            with self.phase_timer.time('predict_test'):
+                test_pred = self.predict_function(self.X_test, model,
+                                                  self.task_type,
+                                                  self.Y_train[train_indices])
         else:
             test_pred = None
 
         return train_pred, opt_pred, valid_pred, test_pred
 
+    def _predictions_are_used(self, targets, output):
+        if targets is not None:
+            return True
+        if self.disable_file_output is True:
+            return False
+        return not (isinstance(self.disable_file_output, list)
+                    and output in self.disable_file_output)
+
+    def _average_train_losses(self, train_losses, train_fold_weights):
+        """Average the train losses of the folds, which are either scalars or
+        dicts. With dicts, the average of the target metric is returned. The
+        train loss is ``None`` if it was not computed."""
+        if any(elem is None for elem in train_losses):
+            return None
+        if all(isinstance(elem, dict) for elem in train_losses):
+            train_losses = [elem[str(self.metric)] for elem in train_losses]
+        return np.average(train_losses, weights=train_fold_weights)
+
+    def get_splits(self):
+        """Return the train and test indices of all folds."""
+        if self.splits is None:
+            y = _get_y_array(self.Y_train, self.task_type)
+            self.splits = list(self.splitter.split(
+                self.X_train, y,
+                groups=self.resampling_strategy_args.get('groups')
+            ))
+        return self.splits
+
     def get_splitter(self, D):
 
         if self.resampling_strategy_args is None:
             self.resampling_strategy_args = {}
 
-        if not isinstance(self.resampling_strategy, str):
-
-            if issubclass(self.resampling_strategy, BaseCrossValidator) or \
-               issubclass(self.resampling_strategy, _RepeatedSplits) or \
-               issubclass(self.resampling_strategy, BaseShuffleSplit):
-
-                class_name = self.resampling_strategy.__name__
-                if class_name not in __baseCrossValidator_defaults__:
-                    raise ValueError('Unknown CrossValidator.')
-                ref_arg_dict = __baseCrossValidator_defaults__[class_name]
-
-                y = D.data['Y_train']
-                if (D.info['task'] in CLASSIFICATION_TASKS and
-                   D.info['task'] != MULTILABEL_CLASSIFICATION) or \
-                   (D.info['task'] in REGRESSION_TASKS and
-                   D.info['task'] != MULTIOUTPUT_REGRESSION):
-
-                    y = y.ravel()
-                if class_name == 'PredefinedSplit':
-                    if 'test_fold' not in self.resampling_strategy_args:
-                        raise ValueError('Must provide parameter test_fold'
-                                         ' for class PredefinedSplit.')
-                if class_name == 'LeaveOneGroupOut' or \
-                        class_name == 'LeavePGroupsOut' or\
-                        class_name == 'GroupKFold' or\
-                        class_name == 'GroupShuffleSplit':
-                    if 'groups' not in self.resampling_strategy_args:
-                        raise ValueError('Must provide parameter groups '
-                                         'for chosen CrossValidator.')
-                    try:
-                        if self.resampling_strategy_args['groups'].shape[0] != y.shape[0]:
-                            raise ValueError('Groups must be array-like '
-                                             'with shape (n_samples,).')
-                    except Exception:
+        return create_splitter(D, self.resampling_strategy, self.resampling_strategy_args)
+
+
+def compute_splits(D, resampling_strategy, resampling_strategy_args):
+    """Compute the train and test indices of all folds of a resampling
+    strategy, as used by the ``TrainEvaluator``."""
+    splitter = create_splitter(D, resampling_strategy, resampling_strategy_args)
+    y = _get_y_array(D.data['Y_train'], D.info['task'])
+    return list(splitter.split(
+        D.data['X_train'], y,
+        groups=resampling_strategy_args.get('groups')
+    ))
+
+
+def create_splitter(D, resampling_strategy, resampling_strategy_args):
+    """Create the scikit-learn splitter of a resampling strategy.
+
+    Fills in the defaults of the splitter in ``resampling_strategy_args``.
+    """
+
+    if not isinstance(resampling_strategy, str):
+
+        if issubclass(resampling_strategy, BaseCrossValidator) or \
+           issubclass(resampling_strategy, _RepeatedSplits) or \
+           issubclass(resampling_strategy, BaseShuffleSplit):
+
+            class_name = resampling_strategy.__name__
+            if class_name not in __baseCrossValidator_defaults__:
+                raise ValueError('Unknown CrossValidator.')
+            ref_arg_dict = __baseCrossValidator_defaults__[class_name]
+
+            y = D.data['Y_train']
+            if (D.info['task'] in CLASSIFICATION_TASKS and
+               D.info['task'] != MULTILABEL_CLASSIFICATION) or \
+               (D.info['task'] in REGRESSION_TASKS and
+               D.info['task'] != MULTIOUTPUT_REGRESSION):
+
+                y = y.ravel()
+            if class_name == 'PredefinedSplit':
+                if 'test_fold' not in resampling_strategy_args:
+                    raise ValueError('Must provide parameter test_fold'
+                                     ' for class PredefinedSplit.')
+            if class_name == 'LeaveOneGroupOut' or \
+                    class_name == 'LeavePGroupsOut' or\
+                    class_name == 'GroupKFold' or\
+                    class_name == 'GroupShuffleSplit':
+                if 'groups' not in resampling_strategy_args:
+                    raise ValueError('Must provide parameter groups '
+                                     'for chosen CrossValidator.')
+                try:
+                    if resampling_strategy_args['groups'].shape[0] != y.shape[0]:
                         raise ValueError('Groups must be array-like '
                                          'with shape (n_samples,).')
+                except Exception:
+                    raise ValueError('Groups must be array-like '
+                                     'with shape (n_samples,).')
+            else:
+                if 'groups' in resampling_strategy_args:
+                    if resampling_strategy_args['groups'].shape[0] != y.shape[0]:
+                        raise ValueError('Groups must be array-like'
+                                         ' with shape (n_samples,).')
+
+            # Put args in resampling_strategy_args
+            for key in ref_arg_dict:
+                if key == 'n_splits':
+                    if 'folds' not in resampling_strategy_args:
+                        resampling_strategy_args['folds'] = ref_arg_dict['n_splits']
                 else:
-                    if 'groups' in self.resampling_strategy_args:
-                        if self.resampling_strategy_args['groups'].shape[0] != y.shape[0]:
-                            raise ValueError('Groups must be array-like'
-                                             ' with shape (n_samples,).')
-
-                # Put args in self.resampling_strategy_args
-                for key in ref_arg_dict:
-                    if key == 'n_splits':
-                        if 'folds' not in self.resampling_strategy_args:
-                            self.resampling_strategy_args['folds'] = ref_arg_dict['n_splits']
+                    if key not in resampling_strategy_args:
+                        resampling_strategy_args[key] = ref_arg_dict[key]
+
+            # Instantiate object with args
+            init_dict = copy.deepcopy(resampling_strategy_args)
+            init_dict.pop('groups', None)
+            for key in _EVALUATOR_ARGS:
+                init_dict.pop(key, None)
+            if 'folds' in init_dict:
+                init_dict['n_splits'] = init_dict.pop('folds', None)
+            cv = copy.deepcopy(resampling_strategy)(**init_dict)
+
+            if 'groups' not in resampling_strategy_args:
+                resampling_strategy_args['groups'] = None
+
+            return cv
+
+    y = D.data['Y_train']
+    shuffle = resampling_strategy_args.get('shuffle', True)
+    train_size = 0.67
+    if resampling_strategy_args:
+        train_size = resampling_strategy_args.get('train_size',
+                                                  train_size)
+    test_size = float("%.4f" % (1 - train_size))
+
+    if D.info['task'] in CLASSIFICATION_TASKS and D.info['task'] != MULTILABEL_CLASSIFICATION:
+
+        y = y.ravel()
+        if resampling_strategy in ['holdout',
+                                   'holdout-iterative-fit']:
+
+            if shuffle:
+                try:
+                    cv = StratifiedShuffleSplit(n_splits=1,
+                                                test_size=test_size,
+                                                random_state=1)
+                    test_cv = copy.deepcopy(cv)
+                    next(test_cv.split(y, y))
+                except ValueError as e:
+                    if 'The least populated class in y has only' in e.args[0]:
+                        cv = ShuffleSplit(n_splits=1, test_size=test_size,
+                                          random_state=1)
                     else:
-                        if key not in self.resampling_strategy_args:
-                            self.resampling_strategy_args[key] = ref_arg_dict[key]
-
-                # Instantiate object with args
-                init_dict = copy.deepcopy(self.resampling_strategy_args)
-                init_dict.pop('groups', None)
-                if 'folds' in init_dict:
-                    init_dict['n_splits'] = init_dict.pop('folds', None)
-                cv = copy.deepcopy(self.resampling_strategy)(**init_dict)
-
-                if 'groups' not in self.resampling_strategy_args:
-                    self.resampling_strategy_args['groups'] = None
-
-                return cv
-
-        y = D.data['Y_train']
-        shuffle = self.resampling_strategy_args.get('shuffle', True)
-        train_size = 0.67
-        if self.resampling_strategy_args:
-            train_size = self.resampling_strategy_args.get('train_size',
-                                                           train_size)
-        test_size = float("%.4f" % (1 - train_size))
-
-        if D.info['task'] in CLASSIFICATION_TASKS and D.info['task'] != MULTILABEL_CLASSIFICATION:
-
-            y = y.ravel()
-            if self.resampling_strategy in ['holdout',
-                                            'holdout-iterative-fit']:
-
-                if shuffle:
-                    try:
-                        cv = StratifiedShuffleSplit(n_splits=1,
-                                                    test_size=test_size,
-                                                    random_state=1)
-                        test_cv = copy.deepcopy(cv)
-                        next(test_cv.split(y, y))
-                    except ValueError as e:
-                        if 'The least populated class in y has only' in e.args[0]:
-                            cv = ShuffleSplit(n_splits=1, test_size=test_size,
-                                              random_state=1)
-                        else:
-                            raise e
-                else:
-                    tmp_train_size = int(np.floor(train_size * y.shape[0]))
-                    test_fold = np.zeros(y.shape[0])
-                    test_fold[:tmp_train_size] = -1
-                    cv = PredefinedSplit(test_fold=test_fold)
-                    cv.n_splits = 1  # As sklearn is inconsistent here
-            elif self.resampling_strategy in ['cv', 'cv-iterative-fit', 'partial-cv',
-                                              'partial-cv-iterative-fit']:
-                if shuffle:
-                    cv = StratifiedKFold(
-                        n_splits=self.resampling_strategy_args['folds'],
-                        shuffle=shuffle, random_state=1)
-                else:
-                    cv = KFold(n_splits=self.resampling_strategy_args['folds'],
-                               shuffle=shuffle)
+                        raise e
             else:
-                raise ValueError(self.resampling_strategy)
+                tmp_train_size = int(np.floor(train_size * y.shape[0]))
+                test_fold = np.zeros(y.shape[0])
+                test_fold[:tmp_train_size] = -1
+                cv = PredefinedSplit(test_fold=test_fold)
+                cv.n_splits = 1  # As sklearn is inconsistent here
+        elif resampling_strategy in ['cv', 'cv-iterative-fit', 'partial-cv',
+                                     'partial-cv-iterative-fit']:
+            if shuffle:
+                cv = StratifiedKFold(
+                    n_splits=resampling_strategy_args['folds'],
+                    shuffle=shuffle, random_state=1)
+            else:
+                cv = KFold(n_splits=resampling_strategy_args['folds'],
+                           shuffle=shuffle)
         else:
-            if self.resampling_strategy in ['holdout',
-                                            'holdout-iterative-fit']:
-                # TODO shuffle not taken into account for this
-                if shuffle:
-                    cv = ShuffleSplit(n_splits=1, test_size=test_size,
-                                      random_state=1)
-                else:
-                    tmp_train_size = int(np.floor(train_size * y.shape[0]))
-                    test_fold = np.zeros(y.shape[0])
-                    test_fold[:tmp_train_size] = -1
-                    cv = PredefinedSplit(test_fold=test_fold)
-                    cv.n_splits = 1  # As sklearn is inconsistent here
-            elif self.resampling_strategy in ['cv', 'partial-cv',
-                                              'partial-cv-iterative-fit']:
-                random_state = 1 if shuffle else None
-                cv = KFold(
-                    n_splits=self.resampling_strategy_args['folds'],
-                    shuffle=shuffle,
-                    random_state=random_state,
-                )
+            raise ValueError(resampling_strategy)
+    else:
+        if resampling_strategy in ['holdout',
+                                   'holdout-iterative-fit']:
+            # TODO shuffle not taken into account for this
+            if shuffle:
+                cv = ShuffleSplit(n_splits=1, test_size=test_size,
+                                  random_state=1)
             else:
-                raise ValueError(self.resampling_strategy)
-        return cv
+                tmp_train_size = int(np.floor(train_size * y.shape[0]))
+                test_fold = np.zeros(y.shape[0])
+                test_fold[:tmp_train_size] = -1
+                cv = PredefinedSplit(test_fold=test_fold)
+                cv.n_splits = 1  # As sklearn is inconsistent here
+        elif resampling_strategy in ['cv', 'partial-cv',
+                                     'partial-cv-iterative-fit']:
+            random_state = 1 if shuffle else None
+            cv = KFold(
+                n_splits=resampling_strategy_args['folds'],
+                shuffle=shuffle,
+                random_state=random_state,
+            )
+        else:
+            raise ValueError(resampling_strategy)
+    return cv
 
 
 # create closure for evaluating an algorithm
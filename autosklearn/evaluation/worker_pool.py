@@ -0,0 +1,269 @@
+# -*- encoding: utf-8 -*-
+"""Long-lived worker processes to evaluate configurations in.
+
+Starting a new pynisher process per configuration means importing the
+pipeline components and loading the datamanager over and over again. The
+workers of a :class:`WorkerPool` instead evaluate one configuration after the
+other and keep both in memory. The limits are still enforced per run: the
+memory limit of a worker is set once via ``RLIMIT_AS``, a worker which runs out
+of memory is replaced, and a worker which exceeds the wall time limit of a run
+is killed and replaced.
+
+The results are reported through the same interface as a function wrapped by
+``pynisher.enforce_limits``, so that ``ExecuteTaFuncWithQueue`` can treat both
+the same way.
+"""
+import atexit
+import contextlib
+import io
+import multiprocessing
+import queue
+import resource
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import pynisher
+
+
+__all__ = [
+    'EvaluationResult',
+    'LocalQueue',
+    'WorkerPool',
+    'create_worker_pool_id',
+    'get_worker_pool',
+    'shutdown_worker_pool',
+]
+
+
+class LocalQueue(queue.Queue):
+    """Queue holding the results received from a worker.
+
+    Provides the parts of the ``multiprocessing.Queue`` interface which are
+    used on the results of an evaluation.
+    """
+
+    def close(self) -> None:
+        pass
+
+
+class _PipeQueue(object):
+    """Sends everything the evaluator puts into its queue to the parent
+    process right away, so that the results reported so far survive killing
+    the worker on a timeout."""
+
+    def __init__(self, connection: Any):
+        self.connection = connection
+
+    def put(self, item: Any, block: bool = True, timeout: Optional[float] = None) -> None:
+        self.connection.send(('put', item))
+
+    def close(self) -> None:
+        pass
+
+
+def _worker_loop(connection: Any, memory_limit: Optional[int]) -> None:
+    if memory_limit is not None:
+        mem_in_b = memory_limit * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (mem_in_b, mem_in_b))
+
+    # The backends passed with the tasks, by temporary directory. They keep
+    # the datamanager in memory across evaluations.
+    backends = {}  # type: Dict[str, Any]
+
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            # The parent process is gone
+            break
+        if task is None:
+            break
+        ta, kwargs = task
+
+        backend = kwargs.get('backend')
+        if backend is not None:
+            backend = backends.setdefault(backend.temporary_directory, backend)
+            backend.cache_datamanager = True
+            kwargs['backend'] = backend
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                ta(queue=_PipeQueue(connection), **kwargs)
+                exit_status = 0  # type: Any
+            except MemoryError:
+                exit_status = pynisher.MemorylimitException
+            except OSError:
+                exit_status = pynisher.SubprocessException
+            except Exception:
+                exit_status = pynisher.AnythingException
+        connection.send(('done', exit_status, stdout.getvalue(), stderr.getvalue()))
+
+        if exit_status != 0:
+            # The state of the process can not be trusted anymore, e.g. the
+            # heap might be fragmented after running out of memory
+            break
+
+
+class _Worker(object):
+
+    def __init__(self, context: Any, memory_limit: Optional[int]):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_worker_loop,
+            name='auto-sklearn evaluation worker',
+            args=(child_connection, memory_limit),
+        )
+        self.process.start()
+        child_connection.close()
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+    def shutdown(self) -> None:
+        try:
+            self.connection.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+class EvaluationResult(object):
+    """Outcome of an evaluation in a worker, with the attributes of a function
+    wrapped by ``pynisher.enforce_limits`` after calling it."""
+
+    def __init__(self) -> None:
+        self.result = None
+        self.exit_status = None  # type: Any
+        self.wall_clock_time = None  # type: Optional[float]
+        self.stdout = None  # type: Optional[str]
+        self.stderr = None  # type: Optional[str]
+        self.exitcode = None  # type: Optional[int]
+
+
+class WorkerPool(object):
+    """Pool of long-lived processes to evaluate configurations in.
+
+    A worker is started whenever there is no idle one, so the pool grows to
+    the number of evaluations which run in parallel (e.g. the number of dask
+    worker threads).
+
+    Parameters
+    ----------
+    memory_limit : Optional[int]
+        Memory limit of each worker in MB.
+    """
+
+    def __init__(self, memory_limit: Optional[int], context: Any = None):
+        self.memory_limit = memory_limit
+        self.context = multiprocessing.get_context() if context is None else context
+        self._idle = []  # type: List[_Worker]
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.is_alive():
+                    return worker
+                worker.kill()
+        return _Worker(self.context, self.memory_limit)
+
+    def _release(self, worker: _Worker) -> None:
+        with self._lock:
+            self._idle.append(worker)
+
+    def run(
+        self,
+        ta: Callable,
+        kwargs: Dict[str, Any],
+        wall_time_in_s: Optional[float],
+        result_queue: LocalQueue,
+    ) -> EvaluationResult:
+        """Evaluate ``ta(queue=..., **kwargs)`` in one of the workers.
+
+        Everything the evaluation puts into its queue ends up in
+        ``result_queue``.
+        """
+        result = EvaluationResult()
+        worker = self._acquire()
+        start = time.time()
+        keep_worker = False
+        try:
+            worker.connection.send((ta, kwargs))
+            while True:
+                remaining = None if wall_time_in_s is None \
+                    else wall_time_in_s - (time.time() - start)
+                if remaining is not None and (
+                    remaining <= 0 or not worker.connection.poll(remaining)
+                ):
+                    result.exit_status = pynisher.TimeoutException
+                    break
+                message = worker.connection.recv()
+                if message[0] == 'put':
+                    result_queue.put(message[1])
+                else:
+                    _, result.exit_status, result.stdout, result.stderr = message
+                    keep_worker = result.exit_status == 0
+                    break
+        except (EOFError, OSError):
+            # The worker died, e.g. because it was killed by the operating system
+            worker.process.join()
+            result.exitcode = worker.process.exitcode
+            result.exit_status = pynisher.AnythingException
+        finally:
+            result.wall_clock_time = time.time() - start
+            if keep_worker:
+                self._release(worker)
+            else:
+                worker.kill()
+                if result.exitcode is None:
+                    result.exitcode = worker.process.exitcode
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            workers, self._idle = self._idle, []
+        for worker in workers:
+            worker.shutdown()
+
+
+# Worker pools of this process. Target algorithm runners only store the key
+# of their pool, because they are pickled to be sent to dask workers.
+_worker_pools = {}  # type: Dict[str, WorkerPool]
+_worker_pools_lock = threading.Lock()
+
+
+def create_worker_pool_id() -> str:
+    return str(uuid.uuid4())
+
+
+def get_worker_pool(pool_id: str, memory_limit: Optional[int]) -> WorkerPool:
+    with _worker_pools_lock:
+        if pool_id not in _worker_pools:
+            _worker_pools[pool_id] = WorkerPool(memory_limit)
+        return _worker_pools[pool_id]
+
+
+def shutdown_worker_pool(pool_id: str) -> None:
+    with _worker_pools_lock:
+        pool = _worker_pools.pop(pool_id, None)
+    if pool is not None:
+        pool.shutdown()
+
+
+@atexit.register
+def _shutdown_worker_pools() -> None:
+    for pool_id in list(_worker_pools):
+        shutdown_worker_pool(pool_id)
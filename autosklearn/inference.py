@@ -0,0 +1,350 @@
+# -*- encoding: utf-8 -*-
+"""Inference-only export of a fitted ensemble.
+
+An inference bundle is a directory with everything ``predict`` and
+``predict_proba`` need, and nothing else: the fitted pipelines of the
+ensemble members, their ensemble weights, the input validator which encodes
+the features and decodes the targets, and a manifest describing them. Loading
+a bundle neither unpickles the ``AutoML`` object nor imports the modules used
+only during the search, and the arrays of the pipelines are memory mapped
+instead of read into memory.
+"""
+import copy
+import json
+import os
+import shutil
+import tempfile
+import warnings
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import VotingClassifier, VotingRegressor
+
+from autosklearn.__version__ import __version__
+from autosklearn.constants import REGRESSION_TASKS
+from autosklearn.pipeline.base import BasePipeline
+from autosklearn.util.logging_ import get_logger
+
+
+__all__ = [
+    'InferenceBundle',
+    'Predictor',
+    'export_inference_bundle',
+    'load_inference_bundle',
+]
+
+
+FORMAT_VERSION = 1
+MANIFEST_FILENAME = 'manifest.json'
+INPUT_VALIDATOR_FILENAME = 'input_validator.pkl'
+
+
+def _model_predict(model, X, batch_size, logger, task, copy_input=True):
+    def send_warnings_to_log(
+            message, category, filename, lineno, file=None, line=None):
+        logger.debug('%s:%s: %s:%s' % (filename, lineno, category.__name__, message))
+        return
+    # Some pipeline steps modify their input in place, which a copy on write
+    # memory map (see autosklearn.automl._share_input) already protects against
+    X_ = X.copy() if copy_input else X
+    with warnings.catch_warnings():
+        warnings.showwarning = send_warnings_to_log
+        if task in REGRESSION_TASKS:
+            if hasattr(model, 'batch_size'):
+                prediction = model.predict(X_, batch_size=batch_size)
+            else:
+                prediction = model.predict(X_)
+        else:
+            if hasattr(model, 'batch_size'):
+                prediction = model.predict_proba(X_, batch_size=batch_size)
+            else:
+                prediction = model.predict_proba(X_)
+
+            # Check that all probability values lie between 0 and 1.
+            assert(
+                (prediction >= 0).all() and (prediction <= 1).all()
+            ), "For {}, prediction probability not within [0, 1]!".format(
+                model
+            )
+
+    if len(prediction.shape) < 1 or len(X_.shape) < 1 or \
+            X_.shape[0] < 1 or prediction.shape[0] != X_.shape[0]:
+        logger.warning(
+            "Prediction shape for model %s is %s while X_.shape is %s",
+            model, str(prediction.shape), str(X_.shape)
+        )
+    return prediction
+
+
+def _strip_training_state(model: Any) -> Any:
+    """Return a shallow copy of ``model`` without the state which is only
+    used while fitting and evaluating it."""
+    if isinstance(model, BasePipeline):
+        # The transform cache and the phase timer are not pickled anyway
+        model = copy.copy(model)
+        model._additional_run_info = {}
+    elif isinstance(model, (VotingClassifier, VotingRegressor)):
+        # The models of the folds of cross-validation
+        model = copy.copy(model)
+        model.estimators_ = [_strip_training_state(estimator)
+                             for estimator in model.estimators_]
+    return model
+
+
+def export_inference_bundle(
+    directory: str,
+    models_with_weights: List[Tuple[float, Any]],
+    input_validator: Any,
+    task: int,
+) -> None:
+    """Write an inference bundle to ``directory``, which must not exist.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to create the bundle in.
+    models_with_weights : list
+        ``(weight, model)`` of the ensemble members, see
+        ``AbstractEnsemble.get_models_with_weights``.
+    input_validator : autosklearn.data.validation.InputValidator
+        Input validator of the fitted ``AutoML`` object.
+    task : int
+        Task type, see ``autosklearn.constants``.
+    """
+    directory = os.path.abspath(directory)
+    if os.path.exists(directory):
+        raise ValueError('The directory %s already exists.' % directory)
+
+    tmpdir = tempfile.mkdtemp(dir=os.path.dirname(directory))
+    try:
+        models = []
+        for i, (weight, model) in enumerate(models_with_weights):
+            filename = 'model_%d.pkl' % i
+            # joblib stores the arrays uncompressed, so that the loader can
+            # memory map them
+            joblib.dump(_strip_training_state(model), os.path.join(tmpdir, filename))
+            models.append({'filename': filename, 'weight': float(weight)})
+        joblib.dump(input_validator, os.path.join(tmpdir, INPUT_VALIDATOR_FILENAME))
+
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'autosklearn_version': __version__,
+            'sklearn_version': sklearn.__version__,
+            'task': int(task),
+            'models': models,
+            'input_validator': INPUT_VALIDATOR_FILENAME,
+        }
+        with open(os.path.join(tmpdir, MANIFEST_FILENAME), 'w') as fh:
+            json.dump(manifest, fh, indent=2)
+        os.rename(tmpdir, directory)
+    except BaseException:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        raise
+
+
+def load_inference_bundle(directory: str, mmap_mode: Optional[str] = 'c') -> 'InferenceBundle':
+    """Load an inference bundle written by ``export_inference_bundle``.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the bundle.
+    mmap_mode : str or None
+        Memory map the arrays of the pipelines with this mode instead of
+        reading them, see ``numpy.load``. The default copy on write mapping
+        keeps the arrays writable for the estimators which require it.
+        ``None`` reads them into memory.
+    """
+    with open(os.path.join(directory, MANIFEST_FILENAME)) as fh:
+        manifest = json.load(fh)
+    if manifest['format_version'] > FORMAT_VERSION:
+        raise ValueError('Inference bundle %s has format version %d, but this version of '
+                         'auto-sklearn only supports format versions up to %d.'
+                         % (directory, manifest['format_version'], FORMAT_VERSION))
+    if manifest['sklearn_version'] != sklearn.__version__:
+        warnings.warn('Inference bundle %s was exported with scikit-learn %s, but '
+                      'scikit-learn %s is installed.'
+                      % (directory, manifest['sklearn_version'], sklearn.__version__))
+
+    models = [joblib.load(os.path.join(directory, model['filename']), mmap_mode=mmap_mode)
+              for model in manifest['models']]
+    weights = [model['weight'] for model in manifest['models']]
+    input_validator = joblib.load(os.path.join(directory, manifest['input_validator']))
+    return InferenceBundle(models, weights, input_validator, manifest['task'], manifest)
+
+
+class InferenceBundle(object):
+    """Fitted ensemble loaded by ``load_inference_bundle``.
+
+    Parameters
+    ----------
+    models : list
+        Fitted pipelines of the ensemble members.
+    weights : list of float
+        Ensemble weights of the ``models``.
+    input_validator : autosklearn.data.validation.InputValidator
+        Input validator of the fitted ``AutoML`` object.
+    task : int
+        Task type, see ``autosklearn.constants``.
+    manifest : dict
+        Manifest of the bundle.
+    """
+
+    def __init__(self, models: List[Any], weights: List[float], input_validator: Any,
+                 task: int, manifest: Optional[Dict[str, Any]] = None):
+        self.models = models
+        self.weights = weights
+        self.input_validator = input_validator
+        self.task = task
+        self.manifest = manifest
+        self.logger = get_logger(self.__class__.__name__)
+
+    def _predict(self, X: Any, batch_size: Optional[int]) -> np.ndarray:
+        X = self.input_validator.validate_features(X)
+        predictions = None
+        for model, weight in zip(self.models, self.weights):
+            prediction = _model_predict(model, X, batch_size, self.logger, self.task)
+            if predictions is None:
+                predictions = np.zeros_like(prediction, dtype=np.float64)
+            predictions += weight * prediction
+        if self.task not in REGRESSION_TASKS:
+            predictions = np.clip(predictions, 0.0, 1.0)
+        return predictions
+
+    def predict(self, X: Any, batch_size: Optional[int] = None) -> np.ndarray:
+        """Predict the classes or the regression targets of ``X``, like the
+        ``predict`` method of the exported estimator."""
+        predictions = self._predict(X, batch_size)
+        if self.task in REGRESSION_TASKS:
+            return predictions
+        if self.input_validator.is_single_column_target():
+            predicted_indexes = np.argmax(predictions, axis=1)
+        else:
+            predicted_indexes = (predictions > 0.5).astype(int)
+        return self.input_validator.decode_target(predicted_indexes)
+
+    def predict_proba(self, X: Any, batch_size: Optional[int] = None) -> np.ndarray:
+        """Predict the class probabilities of ``X``, like the
+        ``predict_proba`` method of the exported classifier."""
+        if self.task in REGRESSION_TASKS:
+            raise ValueError('predict_proba is only available for classification.')
+        return self._predict(X, batch_size)
+
+    def get_predictor(self) -> 'Predictor':
+        """Return a ``Predictor`` for low-latency predictions on small
+        batches."""
+        return Predictor(list(zip(self.weights, self.models)), self.input_validator, self.task)
+
+
+class Predictor(object):
+    """Predicts with a fitted ensemble on small batches with little overhead.
+
+    The checks and decisions which ``predict`` makes on every call are made
+    once when creating the predictor: the models are known to be fitted, the
+    mapping of the categories of the input columns to their ordinal codes and
+    the decoding of the targets are looked up in plain dictionaries and
+    arrays, and the ensemble members are evaluated one after another in the
+    calling process. Input the fast path does not cover, such as sparse
+    matrices, goes through the input validator like in ``predict``.
+
+    Parameters
+    ----------
+    models_with_weights : list
+        ``(weight, model)`` of the fitted ensemble members.
+    input_validator : autosklearn.data.validation.InputValidator
+        Fitted input validator.
+    task : int
+        Task type, see ``autosklearn.constants``.
+    """
+
+    def __init__(self, models_with_weights: List[Tuple[float, Any]], input_validator: Any,
+                 task: int):
+        self.models = [model for _, model in models_with_weights]
+        self.weights = [float(weight) for weight, _ in models_with_weights]
+        self.input_validator = input_validator
+        self.task = task
+        self.is_classification = task not in REGRESSION_TASKS
+
+        self._features_type = input_validator.features_type
+        encoder = input_validator.feature_encoder
+        if encoder is not None:
+            _, ordinal_encoder, self._encoded_columns = encoder.transformers_[0]
+            self._category_codes = [
+                {category: float(code) for code, category in enumerate(categories)}
+                for categories in ordinal_encoder.categories_
+            ]
+            self._passthrough_columns = [
+                index for name, _, columns in encoder.transformers_ if name == 'remainder'
+                for index in columns
+            ]
+
+        # The classes of a label encoded target, to decode it by indexing
+        self._classes = getattr(input_validator.target_encoder, 'classes_', None)
+
+    def _validate_features(self, X: Any) -> Any:
+        if type(X) is not self._features_type:
+            return self.input_validator.validate_features(X)
+        try:
+            if isinstance(X, np.ndarray):
+                if X.ndim == 2 and np.issubdtype(X.dtype, np.number):
+                    return X
+            elif isinstance(X, pd.DataFrame):
+                return self._encode_dataframe(X)
+        except (KeyError, TypeError, ValueError):
+            # Let the input validator raise an informative error
+            pass
+        return self.input_validator.validate_features(X)
+
+    def _encode_dataframe(self, X: pd.DataFrame) -> np.ndarray:
+        if self.input_validator.feature_encoder is None:
+            Xt = X.to_numpy()
+            if not np.issubdtype(Xt.dtype, np.number):
+                raise TypeError(Xt.dtype)
+            return Xt
+        n_encoded = len(self._encoded_columns)
+        Xt = np.empty((X.shape[0], n_encoded + len(self._passthrough_columns)),
+                      dtype=np.float64)
+        for i, (column, codes) in enumerate(zip(self._encoded_columns, self._category_codes)):
+            Xt[:, i] = [codes[value] for value in X[column]]
+        if self._passthrough_columns:
+            Xt[:, n_encoded:] = X.iloc[:, self._passthrough_columns].to_numpy(dtype=np.float64)
+        return Xt
+
+    def _predict(self, X: Any) -> np.ndarray:
+        X = self._validate_features(X)
+        predictions = None
+        for model, weight in zip(self.models, self.weights):
+            # Some pipeline steps modify their input in place
+            X_ = X.copy()
+            if self.is_classification:
+                prediction = model.predict_proba(X_)
+            else:
+                prediction = model.predict(X_)
+            if predictions is None:
+                predictions = np.multiply(prediction, weight, dtype=np.float64)
+            else:
+                predictions += weight * prediction
+        if self.is_classification:
+            predictions = np.clip(predictions, 0.0, 1.0)
+        return predictions
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Predict the classes or the regression targets of ``X``."""
+        predictions = self._predict(X)
+        if not self.is_classification:
+            return predictions
+        if not self.input_validator.is_single_column_target():
+            return self.input_validator.decode_target((predictions > 0.5).astype(int))
+        predicted_indexes = np.argmax(predictions, axis=1)
+        if self._classes is not None:
+            return self._classes[predicted_indexes]
+        return self.input_validator.decode_target(predicted_indexes)
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """Predict the class probabilities of ``X``."""
+        if not self.is_classification:
+            raise ValueError('predict_proba is only available for classification.')
+        return self._predict(X)
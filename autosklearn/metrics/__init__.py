@@ -13,6 +13,7 @@ from smac.utils.constants import MAXINT
 from autosklearn.constants import REGRESSION_TASKS, TASK_TYPES
 
 
+from .kernels import ScoreKernel, find_score_kernel
 from .util import sanitize_array
 
 
@@ -336,6 +337,15 @@ for name, metric in [('precision', sklearn.metrics.precision_score),
         CLASSIFICATION_METRICS[qualified_name] = globals()[qualified_name]
 
 
+def get_score_kernel(metric: Scorer, task_type: int) -> Optional[ScoreKernel]:
+    """Return the vectorized kernel of a built-in metric.
+
+    Returns ``None`` for user-defined metrics and for task types the kernel
+    does not cover. See :mod:`autosklearn.metrics.kernels`.
+    """
+    return find_score_kernel(metric._score_func, metric._kwargs, task_type)
+
+
 def calculate_score(
     solution: np.ndarray,
     prediction: np.ndarray,
@@ -393,9 +403,17 @@ def calculate_score(
     else:
         if task_type in REGRESSION_TASKS:
             # TODO put this into the regression metric itself
-            cprediction = sanitize_array(prediction)
-            score = metric(solution, cprediction)
-        else:
-            score = metric(solution, prediction)
+            prediction = sanitize_array(prediction)
+
+        # Built-in metrics skip sklearn's input validation
+        kernel = get_score_kernel(metric, task_type)
+        if kernel is not None:
+            encoded_solution = kernel.encode_labels(solution)
+            if encoded_solution is not None:
+                kernel_score = kernel.score(encoded_solution, prediction)
+                if kernel_score is not None:
+                    return metric._sign * kernel_score
+
+        score = metric(solution, prediction)
 
         return score
@@ -0,0 +1,273 @@
+# -*- encoding: utf-8 -*-
+"""Vectorized implementations of the score functions of built-in metrics.
+
+Scoring through a :class:`autosklearn.metrics.Scorer` runs sklearn's input
+validation and target type detection on every call. The kernels in this module
+instead work on labels which are encoded once up-front and skip all checks.
+They are only used for inputs they are known to handle, see
+:meth:`ScoreKernel.supports`; everything else goes through the generic scorer.
+
+All kernels score a stack of predictions at once, i.e. the first axis of the
+predictions indexes different models or ensembles, and return the raw value of
+the score function for each of them.
+"""
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+import scipy.stats
+
+import sklearn.metrics
+
+from autosklearn.constants import (
+    BINARY_CLASSIFICATION,
+    MULTICLASS_CLASSIFICATION,
+    MULTILABEL_CLASSIFICATION,
+    REGRESSION,
+)
+
+
+EncodedLabels = Dict[str, Any]
+
+
+class ScoreKernel(object):
+    def __init__(
+        self,
+        name: str,
+        task_types: Tuple[int, ...],
+        encode: Callable[[np.ndarray], Optional[EncodedLabels]],
+        score: Callable[[EncodedLabels, np.ndarray], np.ndarray],
+    ) -> None:
+        self.name = name
+        self.task_types = task_types
+        self._encode = encode
+        self._score = score
+
+    def encode_labels(self, y_true: np.ndarray) -> Optional[EncodedLabels]:
+        """Pre-compute everything the kernel needs to know about the labels.
+
+        Returns ``None`` if the kernel cannot handle the labels, in which case
+        the generic scorer must be used.
+        """
+        y_true = np.asarray(y_true)
+        if y_true.ndim == 2 and y_true.shape[1] == 1:
+            y_true = y_true.ravel()
+        if y_true.dtype.kind not in 'biuf' or y_true.size == 0 \
+                or not np.all(np.isfinite(y_true)):
+            return None
+        return self._encode(y_true)
+
+    def supports(self, encoded_labels: EncodedLabels, y_pred: np.ndarray) -> bool:
+        """Whether a stack of predictions can be scored by this kernel."""
+        if y_pred.ndim != encoded_labels['prediction_ndim'] + 1:
+            return False
+        if y_pred.shape[1] != encoded_labels['n_samples']:
+            return False
+        check = encoded_labels.get('check_prediction')
+        return check is None or check(y_pred)
+
+    def __call__(self, encoded_labels: EncodedLabels, y_pred: np.ndarray) -> np.ndarray:
+        """Score a stack of predictions of shape ``(n_predictions, n_samples, ...)``."""
+        return self._score(encoded_labels, y_pred)
+
+    def score(self, encoded_labels: EncodedLabels, y_pred: np.ndarray) -> Optional[float]:
+        """Score a single prediction.
+
+        Returns ``None`` if the prediction cannot be handled by the kernel,
+        for example because it contains NaNs which sklearn would reject.
+        """
+        y_pred = np.asarray(y_pred)
+        if encoded_labels['prediction_ndim'] == 1 and y_pred.ndim == 2 \
+                and y_pred.shape[1] == 1:
+            y_pred = y_pred.ravel()
+        y_pred = y_pred[np.newaxis]
+        if not self.supports(encoded_labels, y_pred) or not np.all(np.isfinite(y_pred)):
+            return None
+        return float(self._score(encoded_labels, y_pred)[0])
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+def _encode_class_labels(y_true: np.ndarray) -> Optional[EncodedLabels]:
+    if y_true.ndim != 1:
+        return None
+    classes, columns = np.unique(y_true, return_inverse=True)
+    one_hot = np.zeros((len(y_true), len(classes)), dtype=np.float64)
+    one_hot[np.arange(len(y_true)), columns] = 1
+    is_integral = bool(np.all(np.mod(classes, 1) == 0))
+
+    def check_prediction(y_pred: np.ndarray) -> bool:
+        # The columns of the predictions refer to the (integer) class labels
+        if y_pred.shape[2] < 2 or not is_integral:
+            return False
+        return bool(classes[0] >= 0 and classes[-1] < y_pred.shape[2])
+
+    return {
+        'n_samples': len(y_true),
+        'prediction_ndim': 2,
+        'labels': y_true,
+        'classes': classes,
+        'columns': columns,
+        'one_hot': one_hot,
+        'class_counts': np.sum(one_hot, axis=0),
+        'check_prediction': check_prediction,
+    }
+
+
+def _encode_binary_labels(y_true: np.ndarray) -> Optional[EncodedLabels]:
+    if y_true.ndim != 1:
+        return None
+    classes = np.unique(y_true)
+    if len(classes) != 2:
+        # ROC AUC is not defined, let sklearn raise the appropriate error
+        return None
+    return {
+        'n_samples': len(y_true),
+        'prediction_ndim': 2,
+        'positive': [y_true == classes[1]],
+        'check_prediction': lambda y_pred: y_pred.shape[2] == 2,
+    }
+
+
+def _encode_multilabel_labels(y_true: np.ndarray) -> Optional[EncodedLabels]:
+    if y_true.ndim != 2:
+        return None
+    classes = [np.unique(column) for column in y_true.T]
+    if any(len(column_classes) != 2 for column_classes in classes):
+        return None
+    positive = [column == column_classes[1]
+                for column, column_classes in zip(y_true.T, classes)]
+    return {
+        'n_samples': len(y_true),
+        'prediction_ndim': 2,
+        'positive': positive,
+        'check_prediction': lambda y_pred: y_pred.shape[2] == len(positive),
+    }
+
+
+def _encode_continuous_labels(y_true: np.ndarray) -> Optional[EncodedLabels]:
+    if y_true.ndim != 1 or len(y_true) < 2:
+        return None
+    y_true = y_true.astype(np.float64)
+    return {
+        'n_samples': len(y_true),
+        'prediction_ndim': 1,
+        'labels': y_true,
+        'total_sum_of_squares': np.sum((y_true - np.mean(y_true)) ** 2),
+    }
+
+
+def _accuracy(encoded_labels: EncodedLabels, y_pred: np.ndarray) -> np.ndarray:
+    return np.mean(np.argmax(y_pred, axis=2) == encoded_labels['labels'], axis=1)
+
+
+def _balanced_accuracy(encoded_labels: EncodedLabels, y_pred: np.ndarray) -> np.ndarray:
+    # Classes which are only predicted, but not present in the labels, are
+    # ignored just like in sklearn.metrics.balanced_accuracy_score
+    correct = np.argmax(y_pred, axis=2) == encoded_labels['labels']
+    per_class = np.dot(correct, encoded_labels['one_hot']) / encoded_labels['class_counts']
+    return np.mean(per_class, axis=1)
+
+
+def _log_loss(encoded_labels: EncodedLabels, y_pred: np.ndarray) -> np.ndarray:
+    # Mirrors sklearn.metrics.log_loss: clip, re-normalize and look up the
+    # probability of the true class. Only the true class contributes to the
+    # loss, therefore the remaining entries are never normalized. If the
+    # predictions have more columns than there are classes, the columns refer
+    # to the class labels (see autosklearn.metrics._ProbaScorer).
+    if len(encoded_labels['classes']) != y_pred.shape[2]:
+        columns = encoded_labels['labels'].astype(np.int64)
+    else:
+        columns = encoded_labels['columns']
+    eps = 1e-15
+    clipped = np.clip(np.asarray(y_pred, dtype=np.float64), eps, 1 - eps)
+    normalization = np.sum(clipped, axis=2)
+    true_class_proba = clipped[:, np.arange(y_pred.shape[1]), columns] / normalization
+    return np.mean(-np.log(true_class_proba), axis=1)
+
+
+def _roc_auc(encoded_labels: EncodedLabels, y_pred: np.ndarray) -> np.ndarray:
+    # The area under the ROC curve equals the Mann-Whitney U statistic
+    # normalized by the number of positive/negative pairs. Ties get the
+    # average rank, which corresponds to the trapezoidal rule used by sklearn.
+    positive = encoded_labels['positive']
+    if len(positive) == 1:
+        # Binary classification, the second column holds the positive class
+        columns = [1]
+    else:
+        columns = list(range(len(positive)))
+    scores = np.zeros((y_pred.shape[0], len(columns)), dtype=np.float64)
+    for i, (column, is_positive) in enumerate(zip(columns, positive)):
+        n_positive = int(np.sum(is_positive))
+        n_negative = len(is_positive) - n_positive
+        for j in range(y_pred.shape[0]):
+            ranks = scipy.stats.rankdata(y_pred[j, :, column])
+            u_statistic = np.sum(ranks[is_positive]) - n_positive * (n_positive + 1) / 2
+            scores[j, i] = u_statistic / (n_positive * n_negative)
+    # Multilabel predictions are macro-averaged over the labels
+    return np.mean(scores, axis=1)
+
+
+def _mean_squared_error(encoded_labels: EncodedLabels, y_pred: np.ndarray) -> np.ndarray:
+    return np.mean((encoded_labels['labels'] - y_pred) ** 2, axis=1)
+
+
+def _root_mean_squared_error(encoded_labels: EncodedLabels, y_pred: np.ndarray) -> np.ndarray:
+    return np.sqrt(_mean_squared_error(encoded_labels, y_pred))
+
+
+def _mean_absolute_error(encoded_labels: EncodedLabels, y_pred: np.ndarray) -> np.ndarray:
+    return np.mean(np.abs(encoded_labels['labels'] - y_pred), axis=1)
+
+
+def _r2(encoded_labels: EncodedLabels, y_pred: np.ndarray) -> np.ndarray:
+    numerator = np.sum((encoded_labels['labels'] - y_pred) ** 2, axis=1)
+    denominator = encoded_labels['total_sum_of_squares']
+    if denominator == 0:
+        return np.where(numerator == 0, 1.0, 0.0)
+    return 1 - numerator / denominator
+
+
+_CLASSIFICATION = (BINARY_CLASSIFICATION, MULTICLASS_CLASSIFICATION)
+_THRESHOLD = (BINARY_CLASSIFICATION, MULTILABEL_CLASSIFICATION)
+_REGRESSION = (REGRESSION, )
+
+# Maps (score function, keyword arguments of the scorer) to a kernel
+_SCORE_KERNELS = [
+    (sklearn.metrics.accuracy_score, {},
+     ScoreKernel('accuracy', _CLASSIFICATION, _encode_class_labels, _accuracy)),
+    (sklearn.metrics.balanced_accuracy_score, {},
+     ScoreKernel('balanced_accuracy', _CLASSIFICATION, _encode_class_labels,
+                 _balanced_accuracy)),
+    (sklearn.metrics.log_loss, {},
+     ScoreKernel('log_loss', _CLASSIFICATION, _encode_class_labels, _log_loss)),
+    (sklearn.metrics.roc_auc_score, {},
+     ScoreKernel('roc_auc', (BINARY_CLASSIFICATION, ), _encode_binary_labels, _roc_auc)),
+    (sklearn.metrics.roc_auc_score, {},
+     ScoreKernel('roc_auc', (MULTILABEL_CLASSIFICATION, ), _encode_multilabel_labels,
+                 _roc_auc)),
+    (sklearn.metrics.mean_squared_error, {'squared': True},
+     ScoreKernel('mean_squared_error', _REGRESSION, _encode_continuous_labels,
+                 _mean_squared_error)),
+    (sklearn.metrics.mean_squared_error, {'squared': False},
+     ScoreKernel('root_mean_squared_error', _REGRESSION, _encode_continuous_labels,
+                 _root_mean_squared_error)),
+    (sklearn.metrics.mean_absolute_error, {},
+     ScoreKernel('mean_absolute_error', _REGRESSION, _encode_continuous_labels,
+                 _mean_absolute_error)),
+    (sklearn.metrics.r2_score, {},
+     ScoreKernel('r2', _REGRESSION, _encode_continuous_labels, _r2)),
+]
+
+
+def find_score_kernel(
+    score_func: Callable,
+    kwargs: Dict[str, Any],
+    task_type: int,
+) -> Optional[ScoreKernel]:
+    for kernel_score_func, kernel_kwargs, kernel in _SCORE_KERNELS:
+        if score_func is kernel_score_func and kwargs == kernel_kwargs \
+                and task_type in kernel.task_types:
+            return kernel
+    return None
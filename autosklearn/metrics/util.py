@@ -9,8 +9,14 @@ def sanitize_array(array: np.ndarray) -> np.ndarray:
     :return:
     """
     a = np.ravel(array)
-    maxi = np.nanmax(a[np.isfinite(a)])
-    mini = np.nanmin(a[np.isfinite(a)])
+    finite = np.isfinite(a)
+    if np.all(finite):
+        return array
+    if not array.flags.writeable:
+        # For example memory mapped predictions
+        array = array.copy()
+    maxi = np.nanmax(a[finite])  # type: float
+    mini = np.nanmin(a[finite])  # type: float
     array[array == float('inf')] = maxi
     array[array == float('-inf')] = mini
     mid = (maxi + mini) / 2
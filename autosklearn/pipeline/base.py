@@ -1,4 +1,8 @@
 from abc import ABCMeta
+import contextlib
+import copy
+import hashlib
+import pickle
 
 import numpy as np
 from ConfigSpace import Configuration
@@ -7,6 +11,7 @@ from sklearn.utils.validation import check_random_state
 
 from .components.base import AutoSklearnChoice, AutoSklearnComponent
 import autosklearn.pipeline.create_searchspace_util
+from autosklearn.util.transform_cache import TransformCache
 
 
 class BasePipeline(Pipeline):
@@ -62,6 +67,27 @@ class BasePipeline(Pipeline):
 
         self._additional_run_info = {}
 
+        # Optional autosklearn.util.transform_cache.TransformCache to look up
+        # and store the fitted preprocessing steps in
+        self.transform_cache = None
+        # Optional autosklearn.util.stopwatch.PhaseTimer to record the time
+        # spent fitting the preprocessing steps and the final estimator in
+        self.phase_timer = None
+
+    def __getstate__(self):
+        # The cache and the timer belong to the evaluation of the pipeline
+        state = dict(super().__getstate__())
+        state.pop('transform_cache', None)
+        state.pop('phase_timer', None)
+        return state
+
+    def _time_phase(self, name):
+        phase_timer = getattr(self, 'phase_timer', None)
+        if phase_timer is None:
+            # Does nothing, contextlib.nullcontext requires python 3.7
+            return contextlib.suppress()
+        return phase_timer.time(name)
+
     def fit(self, X, y, **fit_params):
         """Fit the selected algorithm to the training data.
 
@@ -93,25 +119,103 @@ class BasePipeline(Pipeline):
         return self
 
     def fit_transformer(self, X, y, fit_params=None):
+        with self._time_phase('fit_transformer'):
+            return self._fit_transformer(X, y, fit_params)
+
+    def _fit_transformer(self, X, y, fit_params):
+        self._transformer_key = None
         self.num_targets = 1 if len(y.shape) == 1 else y.shape[1]
         if fit_params is None:
             fit_params = {}
         fit_params = {key.replace(":", "__"): value for key, value in
                       fit_params.items()}
+
+        transform_cache = getattr(self, 'transform_cache', None)
+        if transform_cache is not None:
+            cache_key = self._get_transform_cache_key(X, y, fit_params)
+            cached = transform_cache.get(cache_key)
+            if cached is not None:
+                transformers, Xt = cached
+                self.steps[:-1] = transformers
+                # Route the fit parameters to the final estimator just like
+                # sklearn.pipeline.Pipeline._fit
+                final_step = self.steps[-1][0]
+                fit_params = {
+                    key.split('__', 1)[1]: value for key, value in fit_params.items()
+                    if key.split('__', 1)[0] == final_step
+                }
+                return Xt, fit_params
+
         Xt, fit_params = self._fit(X, y, **fit_params)
         if fit_params is None:
             fit_params = {}
+        if transform_cache is not None:
+            transform_cache.put(cache_key, (self.steps[:-1], Xt))
         return Xt, fit_params
 
+    def _get_transform_cache_key(self, X, y, fit_params):
+        """Hash of everything the fitted preprocessing steps depend on.
+
+        These are the hyperparameters, init params and fit params of all
+        steps but the final estimator, the random state and the training data.
+        """
+        final_step = self.steps[-1][0]
+
+        def is_transformer_param(name):
+            return name.replace('__', ':').split(':', 1)[0] != final_step
+
+        config = sorted((key, value) for key, value in self.config.get_dictionary().items()
+                        if is_transformer_param(key))
+        init_params = sorted((key, value) for key, value in self.init_params.items()
+                             if is_transformer_param(key))
+        transformer_fit_params = sorted((key, value) for key, value in fit_params.items()
+                                        if is_transformer_param(key))
+        return TransformCache.get_key(
+            type(self).__name__, sorted(self.dataset_properties.items()),
+            config, init_params, transformer_fit_params, self.random_state, X, y,
+        )
+
+    def get_transformer_key(self):
+        """Hash of the fitted preprocessing steps.
+
+        Pipelines with the same key transform the data identically, so the
+        output of ``apply_transformer`` of one of them can be passed to the
+        ``without_transformer`` pipelines of all of them.
+        """
+        key = getattr(self, '_transformer_key', None)
+        if key is None:
+            key = hashlib.sha1(pickle.dumps(self.steps[:-1], -1)).hexdigest()
+            self._transformer_key = key
+        return key
+
+    def apply_transformer(self, X):
+        """Transform the data with the fitted preprocessing steps."""
+        Xt = X
+        for _, _, transformer in self._iter(with_final=False):
+            Xt = transformer.transform(Xt)
+        return Xt
+
+    def without_transformer(self):
+        """Return a shallow copy of the pipeline which passes the data
+        through to the final estimator, to predict on the output of
+        ``apply_transformer``."""
+        pipeline = copy.copy(self)
+        pipeline.steps = [(name, 'passthrough') for name, _ in self.steps[:-1]] + \
+            [self.steps[-1]]
+        pipeline._transformer_key = None
+        return pipeline
+
     def fit_estimator(self, X, y, **fit_params):
         fit_params = {key.replace(":", "__"): value for key, value in
                       fit_params.items()}
-        self._final_estimator.fit(X, y, **fit_params)
+        with self._time_phase('fit_estimator'):
+            self._final_estimator.fit(X, y, **fit_params)
         return self
 
     def iterative_fit(self, X, y, n_iter=1, **fit_params):
-        self._final_estimator.iterative_fit(X, y, n_iter=n_iter,
-                                            **fit_params)
+        with self._time_phase('fit_estimator'):
+            self._final_estimator.iterative_fit(X, y, n_iter=n_iter,
+                                                **fit_params)
 
     def estimator_supports_iterative_fit(self):
         return self._final_estimator.estimator_supports_iterative_fit()
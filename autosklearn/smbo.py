@@ -222,6 +222,8 @@ class AutoMLSMBO(object):
                  smac_scenario_args=None,
                  get_smac_object_callback=None,
                  ensemble_callback: typing.Optional[EnsembleBuilderManager] = None,
+                 use_worker_pool=False,
+                 memory_aware_dispatch=False,
                  ):
         super(AutoMLSMBO, self).__init__()
         # data related
@@ -265,6 +267,8 @@ class AutoMLSMBO(object):
         self.get_smac_object_callback = get_smac_object_callback
 
         self.ensemble_callback = ensemble_callback
+        self.use_worker_pool = use_worker_pool
+        self.memory_aware_dispatch = memory_aware_dispatch
 
         dataset_name_ = "" if dataset_name is None else dataset_name
         logger_name = '%s(%d):%s' % (self.__class__.__name__, self.seed, ":" + dataset_name_)
@@ -436,6 +440,8 @@ class AutoMLSMBO(object):
             metric=self.metric,
             memory_limit=self.memory_limit,
             disable_file_output=self.disable_file_output,
+            use_worker_pool=self.use_worker_pool,
+            memory_aware_dispatch=self.memory_aware_dispatch,
             **self.resampling_strategy_args
         )
         ta = ExecuteTaFuncWithQueue
@@ -505,11 +511,16 @@ class AutoMLSMBO(object):
         self.runhistory = smac.solver.runhistory
         self.trajectory = smac.solver.intensifier.traj_logger.trajectory
         if isinstance(smac.solver.tae_runner, DaskParallelRunner):
-            self._budget_type = smac.solver.tae_runner.single_worker.budget_type
+            tae_runner = smac.solver.tae_runner.single_worker
         elif isinstance(smac.solver.tae_runner, SerialRunner):
-            self._budget_type = smac.solver.tae_runner.budget_type
+            tae_runner = smac.solver.tae_runner
         else:
             raise NotImplementedError(type(smac.solver.tae_runner))
+        self._budget_type = tae_runner.budget_type
+        if isinstance(tae_runner, ExecuteTaFuncWithQueue):
+            # With dask, the runs and hence the worker pools live in the
+            # dask workers
+            tae_runner.shutdown_worker_pool(self.dask_client)
 
         return self.runhistory, self.trajectory, self._budget_type
 
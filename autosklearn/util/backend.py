@@ -1,21 +1,26 @@
+import copy
 import glob
+import json
 import os
 import pickle
 import shutil
 import tempfile
 import time
 import uuid
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
 
 import lockfile
 
 import numpy as np
 
+import scipy.sparse
+
 from sklearn.pipeline import Pipeline
 
 from autosklearn.data.abstract_data_manager import AbstractDataManager
 from autosklearn.ensembles.abstract_ensemble import AbstractEnsemble
 from autosklearn.util import logging_ as logging
+from autosklearn.util.transform_cache import TransformCache
 
 
 __all__ = [
@@ -55,6 +60,16 @@ def get_randomized_directory_name(temporary_directory: Optional[str] = None) ->
     return temporary_directory
 
 
+class _StoredArray(NamedTuple):
+    """Placeholder for an array of the datamanager stored as raw .npy files."""
+    # 'dense' or 'csr'
+    format: str
+    # Names of the .npy files relative to the datamanager array directory,
+    # the data, indices and indptr of csr matrices
+    filenames: Tuple[str, ...]
+    shape: Tuple[int, ...]
+
+
 class BackendContext(object):
 
     def __init__(self,
@@ -170,6 +185,28 @@ class Backend(object):
         self.internals_directory = os.path.join(self.temporary_directory, ".auto-sklearn")
         self._make_internals_directory()
 
+        # Predictions are pickled as float32 arrays by default. If a dtype is
+        # set, they are stored as raw .npy files of this dtype instead, which
+        # can be memory mapped when reading them.
+        self.prediction_storage_dtype = None  # type: Optional[type]
+        # The datamanager is pickled as a whole by default. If set, its dense
+        # arrays and the components of sparse matrices are stored as raw .npy
+        # files instead, which are memory mapped by every process loading it.
+        self.memory_mapped_datamanager = False
+        # Keep the datamanager in memory once it was loaded, used by
+        # long-lived evaluation workers
+        self.cache_datamanager = False
+        self._datamanager = None  # type: Optional[AbstractDataManager]
+        # Size limit of the cache of fitted preprocessing steps shared by all
+        # evaluations in MB, the cache is disabled if None
+        self.transform_cache_size_mb = None  # type: Optional[float]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Never send a cached datamanager to other processes
+        state = self.__dict__.copy()
+        state['_datamanager'] = None
+        return state
+
     @property
     def output_directory(self) -> Optional[str]:
         return self.context.output_directory
@@ -284,12 +321,17 @@ class Backend(object):
     def _get_datamanager_pickle_filename(self) -> str:
         return os.path.join(self.internals_directory, 'datamanager.pkl')
 
+    def _get_datamanager_array_directory(self) -> str:
+        return os.path.join(self.internals_directory, 'datamanager')
+
     def save_datamanager(self, datamanager: AbstractDataManager) -> str:
         self._make_internals_directory()
         filepath = self._get_datamanager_pickle_filename()
 
         with lockfile.LockFile(filepath):
             if not os.path.exists(filepath):
+                if self.memory_mapped_datamanager:
+                    datamanager = self._save_datamanager_arrays(datamanager)
                 with tempfile.NamedTemporaryFile('wb', dir=os.path.dirname(
                         filepath), delete=False) as fh:
                     pickle.dump(datamanager, fh, -1)
@@ -298,11 +340,126 @@ class Backend(object):
 
         return filepath
 
+    def _save_datamanager_arrays(self, datamanager: AbstractDataManager) -> AbstractDataManager:
+        """Store the arrays of the datamanager as .npy files.
+
+        Returns a shallow copy of the datamanager in which the arrays are
+        replaced by placeholders, so that only the metadata is pickled.
+        """
+        array_directory = self._get_datamanager_array_directory()
+        if os.path.exists(array_directory):
+            # Left over from a previous attempt which did not write the pickle
+            shutil.rmtree(array_directory)
+        tmpdir = tempfile.mkdtemp(dir=self.internals_directory)
+
+        data = dict(datamanager.data)  # type: Dict[str, Any]
+        for key, value in data.items():
+            if scipy.sparse.issparse(value):
+                value = value.tocsr()
+                components = (('data', value.data), ('indices', value.indices),
+                              ('indptr', value.indptr))
+                filenames = tuple('%s.%s.npy' % (key, name) for name, _ in components)
+                for filename, (_, component) in zip(filenames, components):
+                    np.save(os.path.join(tmpdir, filename), component)
+                data[key] = _StoredArray('csr', filenames, value.shape)
+            elif isinstance(value, np.ndarray) and not value.dtype.hasobject:
+                filename = '%s.npy' % key
+                np.save(os.path.join(tmpdir, filename), value)
+                data[key] = _StoredArray('dense', (filename, ), value.shape)
+
+        datamanager = copy.copy(datamanager)
+        datamanager._data = data
+        os.rename(tmpdir, array_directory)
+        return datamanager
+
     def load_datamanager(self) -> AbstractDataManager:
+        if self._datamanager is not None:
+            return self._datamanager
+
         filepath = self._get_datamanager_pickle_filename()
         with lockfile.LockFile(filepath):
             with open(filepath, 'rb') as fh:
-                return pickle.load(fh)
+                datamanager = pickle.load(fh)
+
+        for key, value in datamanager.data.items():
+            if isinstance(value, _StoredArray):
+                datamanager.data[key] = self._load_datamanager_array(value)
+        if self.cache_datamanager:
+            self._datamanager = datamanager
+        return datamanager
+
+    def _load_datamanager_array(self, stored: _StoredArray) -> Any:
+        array_directory = self._get_datamanager_array_directory()
+        arrays = []
+        for filename in stored.filenames:
+            path = os.path.join(array_directory, filename)
+            # Copy on write, so that the pages are shared between all processes
+            # as long as the arrays are not modified in place
+            try:
+                arrays.append(np.load(path, mmap_mode='c'))
+            except OSError:
+                # The mapping counts towards the address space, which is
+                # limited by pynisher, so fall back to reading the file
+                arrays.append(np.load(path))
+        if stored.format == 'csr':
+            return scipy.sparse.csr_matrix(tuple(arrays), shape=stored.shape, copy=False)
+        return arrays[0]
+
+    def _get_resampling_splits_directory(self) -> str:
+        return os.path.join(self.internals_directory, 'resampling_splits')
+
+    def save_resampling_splits(self, splits: List[Tuple[np.ndarray, np.ndarray]]) -> None:
+        """Store the train and test indices of all folds.
+
+        The indices of all folds are concatenated into a single array, so that
+        the evaluations can memory map them instead of splitting the data
+        themselves.
+        """
+        self._make_internals_directory()
+        directory = self._get_resampling_splits_directory()
+        if os.path.exists(directory):
+            return
+
+        arrays = [np.asarray(indices) for split in splits for indices in split]
+        indices = np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int32)
+        if indices.size == 0 or indices.max() <= np.iinfo(np.int32).max:
+            indices = indices.astype(np.int32)
+        offsets = np.cumsum([0] + [len(indices) for indices in arrays], dtype=np.int64)
+
+        tmpdir = tempfile.mkdtemp(dir=self.internals_directory)
+        np.save(os.path.join(tmpdir, 'indices.npy'), indices)
+        np.save(os.path.join(tmpdir, 'offsets.npy'), offsets)
+        try:
+            os.rename(tmpdir, directory)
+        except OSError:
+            # Stored by another process in the meantime
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def load_resampling_splits(self) -> Optional[List[Tuple[np.ndarray, np.ndarray]]]:
+        """Load the splits stored by ``save_resampling_splits``, or return
+        ``None`` if there are none."""
+        directory = self._get_resampling_splits_directory()
+        try:
+            offsets = np.load(os.path.join(directory, 'offsets.npy'))
+        except FileNotFoundError:
+            return None
+        path = os.path.join(directory, 'indices.npy')
+        try:
+            indices = np.load(path, mmap_mode='r')
+        except OSError:
+            # See _load_datamanager_array
+            indices = np.load(path)
+
+        folds = [indices[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        return list(zip(folds[::2], folds[1::2]))
+
+    def get_transform_cache(self) -> Optional[TransformCache]:
+        if self.transform_cache_size_mb is None:
+            return None
+        return TransformCache(
+            os.path.join(self.internals_directory, 'transform_cache'),
+            self.transform_cache_size_mb,
+        )
 
     def get_runs_directory(self) -> str:
         return os.path.join(self.internals_directory, 'runs')
@@ -310,6 +467,176 @@ class Backend(object):
     def get_numrun_directory(self, seed: int, num_run: int, budget: float) -> str:
         return os.path.join(self.internals_directory, 'runs', '%d_%d_%s' % (seed, num_run, budget))
 
+    def _get_prediction_index_filename(self) -> str:
+        return os.path.join(self.internals_directory, 'prediction_index.log')
+
+    def _append_to_log(self, filepath: str, lines: List[str]) -> None:
+        with lockfile.LockFile(filepath):
+            with open(filepath, 'a') as fh:
+                fh.write(''.join(line + '\n' for line in lines))
+
+    def _read_log(self, filepath: str, offset: int = 0) -> Optional[Tuple[List[str], int]]:
+        """Read the complete lines appended to a log file since ``offset``.
+
+        Returns the lines and the offset to continue reading from, or ``None``
+        if the file does not exist.
+        """
+        try:
+            with open(filepath, 'rb') as fh:
+                fh.seek(offset)
+                content = fh.read()
+        except FileNotFoundError:
+            return None
+
+        # Ignore an incomplete last line, it is read again once complete
+        content = content[:content.rfind(b'\n') + 1]
+        return content.decode('utf-8').splitlines(), offset + len(content)
+
+    def _append_to_prediction_index(self, seed: int, idx: int, budget: float) -> None:
+        """Record the ensemble predictions of a run in the prediction index.
+
+        The prediction index is an append-only log with one line per stored
+        run. It allows the ensemble builder to find new predictions without
+        scanning the runs directory.
+        """
+        prediction_path = os.path.join(
+            self.get_numrun_directory(seed, idx, budget),
+            self.get_prediction_filename('ensemble', seed, idx, budget),
+        )
+        stat = os.stat(prediction_path)
+        self._append_to_log(
+            self._get_prediction_index_filename(),
+            ['%d %d %s %r %d' % (seed, idx, budget, stat.st_mtime, stat.st_size)],
+        )
+
+    def read_prediction_index(
+        self, offset: int = 0,
+    ) -> Optional[Tuple[List[Tuple[str, int, int, float, float, int]], int]]:
+        """Read the entries appended to the prediction index since ``offset``.
+
+        Returns a list of ``(path, seed, num_run, budget, mtime, size)``
+        tuples, one per stored ensemble prediction, and the offset to continue
+        reading from. A run which was stored several times has several
+        entries, the last one is the most recent. Returns ``None`` if there is
+        no index.
+        """
+        log = self._read_log(self._get_prediction_index_filename(), offset)
+        if log is None:
+            return None
+        lines, offset = log
+
+        entries = []
+        for line in lines:
+            seed, idx, budget, mtime, size = line.split(' ')
+            identifier = (int(seed), int(idx), float(budget))
+            prediction_path = os.path.join(
+                self.get_numrun_directory(*identifier),
+                self.get_prediction_filename('ensemble', *identifier),
+            )
+            entries.append((prediction_path, *identifier, float(mtime), int(size)))
+        return entries, offset
+
+    def _get_score_cache_filename(self) -> str:
+        return os.path.join(self.internals_directory, 'ensemble_score_cache.log')
+
+    def append_to_score_cache(
+        self, entries: List[Tuple[Tuple[str, int, int, float, int, float], Tuple[float, float]]],
+    ) -> None:
+        """Add scores of ensemble predictions to the score cache.
+
+        Each entry maps the key ``(metric name, seed, num_run, budget, file
+        size, mtime)`` of a prediction file to its score and its disk
+        consumption in MB. The cache is an append-only log which is shared by
+        all ensemble builders, so that unchanged prediction files are never
+        scored twice.
+        """
+        if not entries:
+            return
+        self._append_to_log(
+            self._get_score_cache_filename(),
+            [json.dumps([*key, *value]) for key, value in entries],
+        )
+
+    def load_score_cache(
+        self,
+    ) -> Dict[Tuple[str, int, int, float, int, float], Tuple[float, float]]:
+        """Load the score cache, see ``append_to_score_cache``."""
+        log = self._read_log(self._get_score_cache_filename())
+        cache = dict()  # type: Dict[Tuple[str, int, int, float, int, float], Tuple[float, float]]
+        if log is not None:
+            for line in log[0]:
+                metric, seed, idx, budget, size, mtime, score, cost = json.loads(line)
+                cache[(metric, seed, idx, budget, size, mtime)] = (score, cost)
+        return cache
+
+    def _get_cv_loss_log_filename(self) -> str:
+        return os.path.join(self.internals_directory, 'cv_losses.log')
+
+    def append_to_cv_loss_log(self, budget: float, loss: float) -> None:
+        """Record the loss of a configuration evaluated on all folds.
+
+        The log is shared by all evaluations, which race against the best
+        loss in it (see ``load_best_cv_loss``).
+        """
+        self._append_to_log(self._get_cv_loss_log_filename(), [json.dumps([budget, loss])])
+
+    def load_best_cv_loss(self, budget: float) -> Optional[float]:
+        """Return the lowest loss recorded for ``budget``, or ``None``."""
+        log = self._read_log(self._get_cv_loss_log_filename())
+        if log is None:
+            return None
+        losses = [loss for loss_budget, loss in map(json.loads, log[0])
+                  if loss_budget == budget]
+        return min(losses) if losses else None
+
+    def _get_learning_curve_log_filename(self) -> str:
+        return os.path.join(self.internals_directory, 'learning_curves.log')
+
+    def append_to_learning_curve_log(
+        self, budget: float, curve: List[Tuple[float, float]],
+    ) -> None:
+        """Record the ``(n_iter, loss)`` learning curve of a configuration
+        which was fitted iteratively until the end.
+
+        The log is shared by all evaluations, whose early stopping policies
+        compare against the curves in it (see ``load_learning_curves``).
+        """
+        self._append_to_log(self._get_learning_curve_log_filename(),
+                            [json.dumps([budget, curve])])
+
+    def load_learning_curves(self, budget: float) -> List[List[Tuple[float, float]]]:
+        """Return the learning curves recorded for ``budget``."""
+        log = self._read_log(self._get_learning_curve_log_filename())
+        if log is None:
+            return []
+        return [[(n_iter, loss) for n_iter, loss in curve]
+                for curve_budget, curve in map(json.loads, log[0])
+                if curve_budget == budget]
+
+    def _get_memory_log_filename(self) -> str:
+        return os.path.join(self.internals_directory, 'memory_usage.log')
+
+    def append_to_memory_log(
+        self, components: Sequence[Optional[str]], data_mb: float, peak_mb: float,
+    ) -> None:
+        """Record the peak memory usage of a run of a configuration with the
+        estimator and feature preprocessor ``components`` on ``data_mb`` MB of
+        data.
+
+        The log is shared by all evaluations, whose memory usage is predicted
+        from the runs in it (see ``load_memory_observations``).
+        """
+        self._append_to_log(self._get_memory_log_filename(),
+                            [json.dumps([list(components), data_mb, peak_mb])])
+
+    def load_memory_observations(self) -> List[Tuple[List[Optional[str]], float, float]]:
+        """Return the ``(components, data_mb, peak_mb)`` of all recorded runs."""
+        log = self._read_log(self._get_memory_log_filename())
+        if log is None:
+            return []
+        return [(components, data_mb, peak_mb)
+                for components, data_mb, peak_mb in map(json.loads, log[0])]
+
     def get_model_filename(self, seed: int, idx: int, budget: float) -> str:
         return '%s.%s.%s.model' % (seed, idx, budget)
 
@@ -396,7 +723,10 @@ class Backend(object):
                     self.get_prediction_filename(subset, seed, idx, budget)
                 )
                 with open(file_path, 'wb') as fh:
-                    pickle.dump(preds.astype(np.float32), fh, -1)
+                    if self.prediction_storage_dtype is None:
+                        pickle.dump(preds.astype(np.float32), fh, -1)
+                    else:
+                        np.save(fh, preds.astype(self.prediction_storage_dtype))
         try:
             os.rename(tmpdir, self.get_numrun_directory(seed, idx, budget))
         except OSError:
@@ -406,6 +736,9 @@ class Backend(object):
                 os.rename(tmpdir, self.get_numrun_directory(seed, idx, budget))
                 shutil.rmtree(os.path.join(runs_directory, tmpdir + '.old'))
 
+        if ensemble_predictions is not None:
+            self._append_to_prediction_index(seed, idx, budget)
+
     def get_ensemble_dir(self) -> str:
         return os.path.join(self.internals_directory, 'ensembles')
 
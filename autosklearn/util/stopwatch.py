@@ -5,10 +5,12 @@
 @project: AutoML2015
 
 """
+import contextlib
 import sys
+import threading
 import time
 from collections import OrderedDict
-from typing import Tuple
+from typing import Dict, Iterator, Tuple
 
 
 class TimingTask(object):
@@ -150,3 +152,38 @@ class StopWatch:
                         wall_tac if self._tasks[tsk].wall_tac else False,
                         self.wall_elapsed(tsk))
         return ret_str
+
+
+class PhaseTimer(object):
+
+    """Accumulate the wall and CPU time spent in named phases.
+
+    Phases can be timed from several threads at once, e.g. when folds are
+    fitted in parallel. The CPU time is measured for the whole process and
+    therefore includes all threads running at the same time.
+    """
+
+    def __init__(self) -> None:
+        self._timings = OrderedDict()  # type: Dict[str, Dict[str, float]]
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        wall_tic = time.time()
+        cpu_tic = time.process_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.time() - wall_tic, time.process_time() - cpu_tic)
+
+    def add(self, name: str, wall_time: float, cpu_time: float) -> None:
+        with self._lock:
+            timing = self._timings.setdefault(
+                name, {'wall_time': 0.0, 'cpu_time': 0.0, 'calls': 0})
+            timing['wall_time'] += wall_time
+            timing['cpu_time'] += cpu_time
+            timing['calls'] += 1
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: dict(timing) for name, timing in self._timings.items()}
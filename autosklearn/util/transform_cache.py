@@ -0,0 +1,129 @@
+# -*- encoding: utf-8 -*-
+"""Disk-backed cache of fitted data and feature preprocessing steps.
+
+Many configurations only differ in the hyperparameters of the final estimator.
+The preprocessing steps of a pipeline are then fitted on the same data with the
+same hyperparameters over and over again. The cache stores the fitted
+preprocessing steps together with the transformed training data, keyed by a
+hash of everything the preprocessing depends on, so that later evaluations can
+skip fitting them.
+
+The cache is shared by all evaluations through the file system. When it grows
+beyond its size limit, the least recently used entries are deleted.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+import scipy.sparse
+
+from autosklearn.util.hash import hash_array_or_matrix
+
+
+__all__ = [
+    'TransformCache',
+    'update_hash',
+]
+
+
+def update_hash(hasher: Any, value: Any) -> None:
+    """Feed the content of an array, sparse matrix or picklable object to a
+    hashlib hasher."""
+    if scipy.sparse.issparse(value) or (
+        isinstance(value, np.ndarray) and not value.dtype.hasobject
+    ):
+        if scipy.sparse.issparse(value):
+            value = value.tocsr()
+        # hash_array_or_matrix neither covers the dtype nor the orientation
+        # of Fortran ordered arrays
+        hasher.update(('%s%s' % (value.dtype.str, str(value.shape))).encode())
+        hasher.update(hash_array_or_matrix(value).encode())
+    else:
+        hasher.update(pickle.dumps(value, -1))
+
+
+class TransformCache(object):
+    """Cache of fitted preprocessing steps and transformed training data.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to store the cache entries in, shared by all processes using
+        the cache.
+    max_size_mb : float
+        Maximal size of all entries together in MB.
+    """
+
+    SUFFIX = '.transform'
+
+    def __init__(self, directory: str, max_size_mb: float):
+        self.directory = directory
+        self.max_size_mb = max_size_mb
+
+    @staticmethod
+    def get_key(*values: Any) -> str:
+        hasher = hashlib.sha1()
+        for value in values:
+            update_hash(hasher, value)
+        return hasher.hexdigest()
+
+    def _get_filename(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the entry stored under ``key``, or ``None`` on a cache miss."""
+        filename = self._get_filename(key)
+        try:
+            with open(filename, 'rb') as fh:
+                value = pickle.load(fh)
+            # The modification time is used to find the least recently used entries
+            os.utime(filename)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # Missing, evicted in the meantime, or not completely written
+            return None
+        return value
+
+    def put(self, key: str, value: Any) -> bool:
+        """Store ``value`` under ``key``.
+
+        Returns whether the value was stored, which is not the case if it is
+        larger than the cache.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile('wb', dir=self.directory, delete=False) as fh:
+            pickle.dump(value, fh, -1)
+            tempname = fh.name
+        if os.path.getsize(tempname) > self.max_size_mb * 1024 * 1024:
+            os.remove(tempname)
+            return False
+        os.replace(tempname, self._get_filename(key))
+        self.evict()
+        return True
+
+    def evict(self) -> None:
+        """Delete the least recently used entries until the cache fits into
+        its size limit."""
+        entries = []  # type: List[Tuple[float, int, str]]
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size_mb * 1024 * 1024:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
@@ -0,0 +1,321 @@
+"""Benchmark the ensemble builder on a synthetic library of predictions.
+
+Writes the predictions of ``--n-models`` synthetic runs to a fresh backend with
+``Backend.save_numrun_to_dir`` and runs ``EnsembleBuilder.main`` on them. For
+every iteration, the wall time, the peak resident set size and the file I/O of
+the builder phases ``__init__`` (restoring the state of the previous
+iteration), ``score_ensemble_preds``, ``get_n_best_preds`` (or
+``update_candidate_preds`` in incremental mode), ``EnsembleSelection.fit`` and
+``main`` as a whole are reported.
+
+The runs are spread evenly across the iterations, i.e. with ``--iterations 4``
+a quarter of the runs becomes available before each call of ``main``, which
+mimics the ensemble builder running alongside the optimization.
+
+Example:
+
+    python3 benchmark_ensemble_builder.py --n-models 500 --n-samples 10000 \\
+        --n-classes 10 --memory-limit 1024 --max-models-on-disc 50 --output bench.json
+
+Peak RSS is measured per phase on Linux by resetting the high water mark of the
+process, elsewhere the peak of the whole process is reported. File I/O is read
+from ``/proc/self/io`` and only available on Linux; note that reading memory
+mapped predictions (``--storage-dtype``) does not show up in ``read_chars``.
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import autosklearn.ensemble_builder
+from autosklearn.constants import BINARY_CLASSIFICATION, MULTICLASS_CLASSIFICATION
+from autosklearn.data.xy_data_manager import XYDataManager
+from autosklearn.ensemble_builder import EnsembleBuilder
+from autosklearn.metrics import CLASSIFICATION_METRICS
+from autosklearn.util.backend import create
+
+
+PHASES = ('__init__', 'score_ensemble_preds', 'get_n_best_preds', 'update_candidate_preds',
+          'EnsembleSelection.fit', 'main')
+
+
+def _read_proc_file(path):
+    try:
+        with open(path) as fh:
+            return fh.read()
+    except OSError:
+        return None
+
+
+def _io_counters():
+    content = _read_proc_file('/proc/self/io')
+    if content is None:
+        return None
+    counters = dict(line.split(': ') for line in content.splitlines())
+    return {
+        'read_chars': int(counters['rchar']),
+        'write_chars': int(counters['wchar']),
+        'read_bytes': int(counters['read_bytes']),
+        'write_bytes': int(counters['write_bytes']),
+    }
+
+
+def _reset_peak_rss():
+    # Writing 5 to clear_refs resets the high water mark VmHWM (Linux >= 4.0)
+    try:
+        with open('/proc/self/clear_refs', 'w') as fh:
+            fh.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb(per_phase):
+    if per_phase:
+        content = _read_proc_file('/proc/self/status')
+        if content is not None:
+            for line in content.splitlines():
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    # Kilobytes on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 ** 2 if sys.platform == 'darwin' else maxrss / 1024
+
+
+class PhaseProfiler(object):
+    """Records wall time, peak RSS and file I/O of (possibly nested) phases."""
+
+    def __init__(self):
+        self.records = []
+        self._stack = []
+        self._per_phase_rss = _reset_peak_rss()
+
+    @contextlib.contextmanager
+    def phase(self, name, iteration):
+        io_start = _io_counters()
+        if self._per_phase_rss:
+            # Resetting the high water mark loses the peak of the enclosing
+            # phases so far, remember it for them
+            peak = _peak_rss_mb(True)
+            for frame in self._stack:
+                frame['peak_rss_mb'] = max(frame['peak_rss_mb'], peak)
+            _reset_peak_rss()
+        frame = {'peak_rss_mb': 0.0}
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - start
+            self._stack.pop()
+            peak = max(frame['peak_rss_mb'], _peak_rss_mb(self._per_phase_rss))
+            for outer in self._stack:
+                outer['peak_rss_mb'] = max(outer['peak_rss_mb'], peak)
+            record = {
+                'iteration': iteration,
+                'phase': name,
+                'wall_time_s': wall_time,
+                'peak_rss_mb': peak,
+            }
+            io_end = _io_counters()
+            if io_start is not None and io_end is not None:
+                for key in io_start:
+                    record[key] = io_end[key] - io_start[key]
+            self.records.append(record)
+
+    def wrap(self, name, function, iteration_getter):
+        def wrapper(*args, **kwargs):
+            with self.phase(name, iteration_getter()):
+                return function(*args, **kwargs)
+        return wrapper
+
+
+def generate_predictions(y_true, n_classes, quality, random_state):
+    """Class probabilities which predict ``quality`` of the samples correctly
+    (in expectation) with random confidence."""
+    n_samples = len(y_true)
+    y_pred = random_state.randint(n_classes, size=n_samples)
+    correct = random_state.rand(n_samples) < quality
+    y_pred[correct] = y_true[correct]
+    proba = random_state.dirichlet(np.ones(n_classes), size=n_samples)
+    proba[np.arange(n_samples), y_pred] += random_state.rand(n_samples) * n_classes
+    return proba / np.sum(proba, axis=1, keepdims=True)
+
+
+def create_backend(args, random_state):
+    backend = create(
+        temporary_directory=args.temporary_directory,
+        output_directory=None,
+        delete_tmp_folder_after_terminate=False,
+        delete_output_folder_after_terminate=False,
+    )
+    if args.storage_dtype is not None:
+        backend.prediction_storage_dtype = np.dtype(args.storage_dtype).type
+
+    task_type = BINARY_CLASSIFICATION if args.n_classes == 2 else MULTICLASS_CLASSIFICATION
+    y_ensemble = random_state.randint(args.n_classes, size=args.n_samples)
+    y_test = random_state.randint(args.n_classes, size=args.n_test_samples)
+    datamanager = XYDataManager(
+        X=np.zeros((args.n_samples, 1)), y=y_ensemble,
+        X_test=np.zeros((args.n_test_samples, 1)), y_test=y_test,
+        task=task_type, feat_type=['numerical'], dataset_name='benchmark',
+    )
+    backend.save_datamanager(datamanager)
+    backend.save_targets_ensemble(y_ensemble)
+    backend.save_start_time(str(args.seed))
+    return backend, task_type, y_ensemble, y_test
+
+
+def save_runs(backend, args, num_runs, y_ensemble, y_test, random_state):
+    for num_run in num_runs:
+        if num_run == 1:
+            # The dummy predicts the class prior and must have num_run 1
+            quality = 1 / args.n_classes
+        else:
+            quality = random_state.uniform(1 / args.n_classes, 1)
+        predictions = [
+            generate_predictions(y_true, args.n_classes, quality, random_state)
+            for y_true in (y_ensemble, y_test)
+        ]
+        backend.save_numrun_to_dir(
+            seed=args.seed, idx=num_run, budget=0.0, model=None, cv_model=None,
+            ensemble_predictions=predictions[0], valid_predictions=None,
+            test_predictions=predictions[1] if args.n_test_samples > 0 else None,
+        )
+
+
+def run_benchmark(args):
+    random_state = np.random.RandomState(args.seed)
+    profiler = PhaseProfiler()
+    backend, task_type, y_ensemble, y_test = create_backend(args, random_state)
+    iteration = 0
+
+    def get_iteration():
+        return iteration
+
+    def create_builder():
+        builder = EnsembleBuilder(
+            backend=backend,
+            dataset_name='benchmark',
+            task_type=task_type,
+            metric=CLASSIFICATION_METRICS[args.metric],
+            ensemble_size=args.ensemble_size,
+            ensemble_nbest=args.ensemble_nbest,
+            max_models_on_disc=args.max_models_on_disc,
+            seed=args.seed,
+            precision=args.precision,
+            memory_limit=args.memory_limit,
+            read_at_most=args.read_at_most,
+            random_state=args.seed,
+            incremental=args.incremental,
+            n_bags=args.n_bags,
+            n_jobs=args.n_jobs,
+        )
+        for name in PHASES[1:4]:
+            setattr(builder, name, profiler.wrap(name, getattr(builder, name), get_iteration))
+        return builder
+
+    selection_fit = autosklearn.ensemble_builder.EnsembleSelection.fit
+    autosklearn.ensemble_builder.EnsembleSelection.fit = profiler.wrap(
+        'EnsembleSelection.fit', selection_fit, get_iteration)
+    try:
+        builder = None
+        batches = np.array_split(np.arange(1, args.n_models + 1), args.iterations)
+        for iteration, num_runs in enumerate(batches):
+            save_runs(backend, args, num_runs, y_ensemble, y_test, random_state)
+            # Unless in incremental mode, a new builder is started for every
+            # iteration which restores its state from disc
+            if builder is None or not args.incremental:
+                with profiler.phase('__init__', iteration):
+                    builder = create_builder()
+            with profiler.phase('main', iteration):
+                builder.main(time_left=np.inf, iteration=iteration, return_predictions=False)
+    finally:
+        autosklearn.ensemble_builder.EnsembleSelection.fit = selection_fit
+        if args.keep_directory:
+            print('Kept backend in %s' % backend.temporary_directory)
+        else:
+            shutil.rmtree(backend.temporary_directory, ignore_errors=True)
+
+    return {
+        'arguments': vars(args),
+        'validation_performance': float(builder.validation_performance_),
+        'n_scored_predictions': len(builder.read_scores),
+        'records': profiler.records,
+    }
+
+
+def print_table(records):
+    columns = ['iteration', 'phase', 'wall_time_s', 'peak_rss_mb']
+    if records and 'read_chars' in records[0]:
+        columns += ['read_chars', 'write_chars', 'read_bytes', 'write_bytes']
+    records = sorted(records, key=lambda r: (r['iteration'], PHASES.index(r['phase'])))
+    rows = [columns]
+    for record in records:
+        rows.append([
+            '%.3f' % record[c] if isinstance(record[c], float) else str(record[c])
+            for c in columns
+        ])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    for row in rows:
+        print('  '.join(value.rjust(width) for value, width in zip(row, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--n-models', type=int, default=100)
+    parser.add_argument('--n-samples', type=int, default=1000,
+                        help='number of samples of the ensemble data set')
+    parser.add_argument('--n-test-samples', type=int, default=0,
+                        help='number of test samples, 0 to not store test predictions')
+    parser.add_argument('--n-classes', type=int, default=2)
+    parser.add_argument('--metric', type=str, default='accuracy',
+                        choices=sorted(CLASSIFICATION_METRICS))
+    parser.add_argument('--precision', type=int, default=32, choices=[16, 32, 64])
+    parser.add_argument('--storage-dtype', type=str, default=None,
+                        choices=['float16', 'float32', 'float64'],
+                        help='store predictions as memory mapped arrays of this dtype')
+    parser.add_argument('--ensemble-size', type=int, default=50)
+    parser.add_argument('--ensemble-nbest', type=float, default=50,
+                        help='integer values are interpreted as a number of models')
+    parser.add_argument('--max-models-on-disc', type=float, default=50)
+    parser.add_argument('--memory-limit', type=int, default=None,
+                        help='ensemble_memory_limit in MB')
+    parser.add_argument('--read-at-most', type=int, default=None,
+                        help='read at most this many prediction files per iteration')
+    parser.add_argument('--iterations', type=int, default=1)
+    parser.add_argument('--incremental', action='store_true')
+    parser.add_argument('--n-bags', type=int, default=None)
+    parser.add_argument('--n-jobs', type=int, default=1)
+    parser.add_argument('-s', '--seed', type=int, default=1)
+    parser.add_argument('--temporary-directory', type=str, default=None)
+    parser.add_argument('--keep-directory', action='store_true')
+    parser.add_argument('--output', type=str, default=None,
+                        help='write the results to this json file')
+    args = parser.parse_args(argv)
+
+    for name in ('ensemble_nbest', 'max_models_on_disc'):
+        value = getattr(args, name)
+        if float(value).is_integer() and value >= 1:
+            setattr(args, name, int(value))
+    if args.temporary_directory is None:
+        args.temporary_directory = os.path.join(
+            tempfile.mkdtemp(), 'benchmark_ensemble_builder')
+
+    results = run_benchmark(args)
+    print_table(results['records'])
+    if args.output is not None:
+        with open(args.output, 'w') as fh:
+            json.dump(results, fh, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -4,19 +4,28 @@ import pickle
 import sys
 import time
 import glob
+import multiprocessing
 import unittest
 import unittest.mock
 
+import dask
+import dask.distributed
+import joblib
 import numpy as np
 import pandas as pd
 import pytest
+import scipy.sparse
 import sklearn.datasets
+import sklearn.dummy
+import sklearn.linear_model
+import sklearn.preprocessing
 from smac.scenario.scenario import Scenario
 from smac.facade.roar_facade import ROAR
 
 from autosklearn.automl import AutoML
 import autosklearn.automl
 from autosklearn.data.xy_data_manager import XYDataManager
+from autosklearn.data.validation import InputValidator
 from autosklearn.metrics import accuracy, log_loss, balanced_accuracy
 import autosklearn.pipeline.util as putil
 from autosklearn.util.logging_ import setup_logger, get_logger
@@ -59,29 +68,34 @@ def test_fit(dask_client, backend):
     del automl
 
 
-def test_fit_roar(dask_client_single_worker, backend):
-    def get_roar_object_callback(
-            scenario_dict,
-            seed,
-            ta,
-            ta_kwargs,
-            dask_client,
-            n_jobs,
-            **kwargs
-    ):
-        """Random online adaptive racing.
-
-        http://ml.informatik.uni-freiburg.de/papers/11-LION5-SMAC.pdf"""
-        scenario = Scenario(scenario_dict)
-        return ROAR(
-            scenario=scenario,
-            rng=seed,
-            tae_runner=ta,
-            tae_runner_kwargs=ta_kwargs,
-            dask_client=dask_client,
-            n_jobs=n_jobs,
-        )
+def get_roar_object_callback(
+        scenario_dict,
+        seed,
+        ta,
+        ta_kwargs,
+        dask_client,
+        n_jobs,
+        **kwargs
+):
+    """Random online adaptive racing.
+
+    http://ml.informatik.uni-freiburg.de/papers/11-LION5-SMAC.pdf"""
+    scenario = Scenario(scenario_dict)
+    return ROAR(
+        scenario=scenario,
+        rng=seed,
+        tae_runner=ta,
+        tae_runner_kwargs=ta_kwargs,
+        dask_client=dask_client,
+        n_jobs=n_jobs,
+    )
 
+
+def count_child_processes():
+    return len(multiprocessing.active_children())
+
+
+def test_fit_roar(dask_client_single_worker, backend):
     X_train, Y_train, X_test, Y_test = putil.get_dataset('iris')
     automl = autosklearn.automl.AutoML(
         backend=backend,
@@ -105,6 +119,33 @@ def test_fit_roar(dask_client_single_worker, backend):
     del automl
 
 
+def test_fit_worker_pool_dask_processes(backend):
+    # The evaluation worker pools live in the dask worker processes and must
+    # be stopped there when fit returns. Dask worker processes are daemonic by
+    # default and cannot have children.
+    dask.config.set({'distributed.worker.daemon': False})
+    client = dask.distributed.Client(n_workers=1, threads_per_worker=1, processes=True)
+    try:
+        X_train, Y_train, X_test, Y_test = putil.get_dataset('iris')
+        automl = autosklearn.automl.AutoML(
+            backend=backend,
+            time_left_for_this_task=30,
+            per_run_time_limit=5,
+            initial_configurations_via_metalearning=0,
+            get_smac_object_callback=get_roar_object_callback,
+            metric=accuracy,
+            dask_client=client,
+            ensemble_size=0,
+            evaluation_worker_pool=True,
+        )
+        automl.fit(X_train, Y_train, task=MULTICLASS_CLASSIFICATION)
+        assert count_succeses(automl.cv_results_) > 0
+        assert list(client.run(count_child_processes).values()) == [0]
+        del automl
+    finally:
+        client.close()
+
+
 def test_refit_shuffle_on_fail(backend, dask_client):
 
     failing_model = unittest.mock.Mock()
@@ -601,3 +642,115 @@ def test_fail_if_dtype_changes_automl(backend, dask_client):
             X_train.to_numpy(), y_train,
             task=BINARY_CLASSIFICATION,
         )
+
+
+@pytest.mark.parametrize("sparse", (False, True))
+def test_share_input(sparse, tmp_path):
+    X, y = sklearn.datasets.load_iris(return_X_y=True)
+    if sparse:
+        X = scipy.sparse.csr_matrix(X)
+    X_shared = autosklearn.automl._share_input(X, str(tmp_path))
+    components = [X_shared.data, X_shared.indices, X_shared.indptr] if sparse else [X_shared]
+    for component in components:
+        base = component
+        while not isinstance(base, np.memmap):
+            assert base is not None
+            base = base.base
+    if sparse:
+        np.testing.assert_array_equal(X_shared.toarray(), X.toarray())
+    else:
+        np.testing.assert_array_equal(X_shared, X)
+
+    # Writes are not visible to other processes mapping the file
+    if sparse:
+        X_shared.data[:] = 0
+    else:
+        X_shared[:] = 0
+    X_reloaded = autosklearn.automl._share_input(X, str(tmp_path))
+    assert X_reloaded.sum() == X.sum()
+
+    model = sklearn.linear_model.LogisticRegression().fit(X, y)
+    X_shared = autosklearn.automl._share_input(X, str(tmp_path))
+    predictions = joblib.Parallel(n_jobs=2)(
+        joblib.delayed(autosklearn.automl._model_predict)(
+            model, X_shared, None, get_logger('test_share_input'), MULTICLASS_CLASSIFICATION,
+            False,
+        )
+        for _ in range(2)
+    )
+    for prediction in predictions:
+        np.testing.assert_array_almost_equal(prediction, model.predict_proba(X))
+
+
+def test_should_share_input():
+    X = np.zeros((1024, 256))
+    should_share_input = autosklearn.automl._should_share_input
+    with unittest.mock.patch('joblib.effective_n_jobs', return_value=2):
+        assert should_share_input(X, n_models=2, n_jobs=2)
+        assert should_share_input(scipy.sparse.csr_matrix(np.ones((1024, 128))), 2, 2)
+        # A single model or small inputs are not worth writing to a file
+        assert not should_share_input(X, n_models=1, n_jobs=2)
+        assert not should_share_input(X[:10], n_models=2, n_jobs=2)
+        assert not should_share_input(scipy.sparse.csr_matrix(X), 2, 2)
+    with unittest.mock.patch('joblib.effective_n_jobs', return_value=1):
+        assert not should_share_input(X, n_models=2, n_jobs=1)
+
+
+def test_group_by_transformer():
+    class PipelineStub(autosklearn.automl.BasePipeline):
+        def __init__(self, X):
+            self.steps = [('rescaling', sklearn.preprocessing.StandardScaler().fit(X)),
+                          ('classifier', None)]
+
+    X, y = sklearn.datasets.load_iris(return_X_y=True)
+    models = [PipelineStub(X), sklearn.dummy.DummyClassifier().fit(X, y), PipelineStub(X),
+              PipelineStub(X[:-10]), PipelineStub(X)]
+    assert autosklearn.automl._group_by_transformer(models) == [[0, 2, 4]]
+
+
+def test_predict_stream(automl_stub, tmp_path):
+    class PipelineStub(autosklearn.automl.BasePipeline):
+        def __init__(self, X, y, C):
+            self.steps = [('rescaling', sklearn.preprocessing.StandardScaler().fit(X)),
+                          ('classifier', sklearn.linear_model.LogisticRegression(C=C))]
+            self.steps[-1][1].fit(self.apply_transformer(X), y)
+
+    X, y = sklearn.datasets.load_iris(return_X_y=True)
+    automl_stub.InputValidator = InputValidator()
+    automl_stub.InputValidator.validate(X, y, is_classification=True)
+    automl_stub.models_ = {(1, i, 0.0): PipelineStub(X, y, C=0.1 * i) for i in range(1, 4)}
+    automl_stub.cv_models_ = None
+    automl_stub.ensemble_ = unittest.mock.Mock()
+    automl_stub.ensemble_.get_selected_model_identifiers.return_value = \
+        list(automl_stub.models_)
+    automl_stub.ensemble_.predict.side_effect = lambda predictions: np.mean(predictions, axis=0)
+    automl_stub._resampling_strategy = 'holdout'
+    automl_stub._task = MULTICLASS_CLASSIFICATION
+    automl_stub._logger = get_logger('test_predict_stream')
+    automl_stub._shared_predict_input = False
+    automl_stub._shared_predict_preprocessing = False
+
+    expected = automl_stub.predict(X)
+    path = str(tmp_path / 'X.npy')
+    np.save(path, X)
+    for X_stream in (X, np.load(path, mmap_mode='r'), path, iter([X[:100], X[100:]])):
+        chunks = list(automl_stub.predict_stream(X_stream, chunk_size=64))
+        np.testing.assert_array_almost_equal(np.concatenate(chunks), expected)
+    for chunk_size in (64, np.int64(64)):
+        chunks = automl_stub.predict_stream(X, chunk_size=chunk_size)
+        assert [len(chunk) for chunk in chunks] == [64, 64, 22]
+
+    for chunk_size in (0, 1.5, True):
+        with pytest.raises(ValueError, match='chunk_size'):
+            automl_stub.predict_stream(X, chunk_size=chunk_size)
+
+
+@pytest.mark.parametrize('X', [
+    np.arange(20).reshape((10, 2)),
+    pd.DataFrame({'a': np.arange(10), 'b': list('abcdeabcde')}),
+    scipy.sparse.csr_matrix(np.arange(20).reshape((10, 2))),
+])
+def test_iter_chunks(X):
+    chunks = list(autosklearn.automl._iter_chunks(X, chunk_size=4))
+    assert [chunk.shape[0] for chunk in chunks] == [4, 4, 2]
+    assert all(type(chunk) is type(X) for chunk in chunks)
@@ -19,6 +19,7 @@ import sklearn.datasets
 import autosklearn.pipeline.util as putil
 from autosklearn.ensemble_builder import MODEL_FN_RE
 import autosklearn.estimators  # noqa F401
+import autosklearn.inference
 from autosklearn.estimators import AutoSklearnEstimator
 from autosklearn.classification import AutoSklearnClassifier
 from autosklearn.regression import AutoSklearnRegressor
@@ -265,6 +266,9 @@ def test_cv_results(tmp_dir, output_dir):
     cv_result_items = [isinstance(val, npma.MaskedArray) for key, val in
                        cv_results.items() if key.startswith('param_')]
     assert all(cv_result_items), cv_results.items()
+    for phase in ('load_datamanager', 'fit_estimator', 'process_spawn'):
+        assert isinstance(cv_results['phase_wall_time_%s' % phase], np.ndarray)
+    assert '    fit_estimator: ' in cls.sprint_statistics()
 
 
 @unittest.mock.patch('autosklearn.estimators.AutoSklearnEstimator.build_automl')
@@ -376,6 +380,14 @@ def test_can_pickle_classifier(tmp_dir, output_dir, dask_client):
     assert restored_accuracy >= 0.75
     assert initial_accuracy == restored_accuracy
 
+    # Test the inference bundle
+    bundle_dir = os.path.join(output_dir, 'automl.bundle')
+    automl.export_inference_bundle(bundle_dir)
+    bundle = autosklearn.inference.load_inference_bundle(bundle_dir)
+    np.testing.assert_array_equal(bundle.predict(X_test), initial_predictions)
+    np.testing.assert_array_almost_equal(bundle.predict_proba(X_test),
+                                         automl.predict_proba(X_test))
+
 
 def test_multilabel(tmp_dir, output_dir, dask_client):
 
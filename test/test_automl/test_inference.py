@@ -0,0 +1,165 @@
+# -*- encoding: utf-8 -*-
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import sklearn.datasets
+import sklearn.ensemble
+import sklearn.linear_model
+import sklearn.preprocessing
+
+from autosklearn.constants import MULTICLASS_CLASSIFICATION, REGRESSION
+from autosklearn.data.validation import InputValidator
+from autosklearn.inference import (
+    FORMAT_VERSION,
+    Predictor,
+    export_inference_bundle,
+    load_inference_bundle,
+)
+from autosklearn.pipeline.base import BasePipeline
+
+
+class PipelineStub(BasePipeline):
+    _output_dtype = np.float64
+
+    def __init__(self, estimator, X, y):
+        self.steps = [('rescaling', sklearn.preprocessing.StandardScaler().fit(X)),
+                      ('estimator', estimator)]
+        estimator.fit(self.apply_transformer(X), y)
+        self._additional_run_info = {'learning_curve': list(range(1000))}
+
+
+def test_classification_bundle(tmp_path):
+    X, y = sklearn.datasets.load_iris(return_X_y=True)
+    y = np.array(['setosa', 'versicolor', 'virginica'])[y]
+    input_validator = InputValidator()
+    X, y = input_validator.validate(X, y, is_classification=True)
+    models_with_weights = [
+        (0.6, PipelineStub(sklearn.linear_model.LogisticRegression(C=1.0), X, y)),
+        (0.4, PipelineStub(sklearn.linear_model.LogisticRegression(C=0.1), X, y)),
+    ]
+    directory = str(tmp_path / 'bundle')
+    export_inference_bundle(directory, models_with_weights, input_validator,
+                            MULTICLASS_CLASSIFICATION)
+
+    with open(os.path.join(directory, 'manifest.json')) as fh:
+        manifest = json.load(fh)
+    assert manifest['format_version'] == FORMAT_VERSION
+    assert [model['weight'] for model in manifest['models']] == [0.6, 0.4]
+
+    bundle = load_inference_bundle(directory)
+    expected = sum(weight * model.predict_proba(X) for weight, model in models_with_weights)
+    np.testing.assert_array_almost_equal(bundle.predict_proba(X), expected)
+    np.testing.assert_array_equal(
+        bundle.predict(X),
+        input_validator.decode_target(np.argmax(expected, axis=1)),
+    )
+    assert bundle.predict(X)[0] == 'setosa'
+
+    # The arrays are memory mapped and the training state is stripped
+    coef = bundle.models[0].steps[-1][1].coef_
+    assert isinstance(coef, np.memmap)
+    assert bundle.models[0].get_additional_run_info() == {}
+    assert models_with_weights[0][1].get_additional_run_info() != {}
+
+    bundle = load_inference_bundle(directory, mmap_mode=None)
+    assert not isinstance(bundle.models[0].steps[-1][1].coef_, np.memmap)
+
+    with pytest.raises(ValueError, match='already exists'):
+        export_inference_bundle(directory, models_with_weights, input_validator,
+                                MULTICLASS_CLASSIFICATION)
+
+
+def test_regression_bundle(tmp_path):
+    X, y = sklearn.datasets.load_diabetes(return_X_y=True)
+    input_validator = InputValidator()
+    X, y = input_validator.validate(X, y, is_classification=False)
+    model = PipelineStub(sklearn.linear_model.Ridge(), X, y)
+    voting = sklearn.ensemble.VotingRegressor(estimators=None)
+    voting.estimators_ = [PipelineStub(sklearn.linear_model.Ridge(alpha=alpha), X, y)
+                          for alpha in (0.1, 10.0)]
+    directory = str(tmp_path / 'bundle')
+    export_inference_bundle(directory, [(0.5, model), (0.5, voting)], input_validator,
+                            REGRESSION)
+
+    bundle = load_inference_bundle(directory)
+    np.testing.assert_array_almost_equal(
+        bundle.predict(X), 0.5 * model.predict(X) + 0.5 * voting.predict(X))
+    assert all(estimator.get_additional_run_info() == {}
+               for estimator in bundle.models[1].estimators_)
+    with pytest.raises(ValueError, match='only available for classification'):
+        bundle.predict_proba(X)
+
+
+def test_unsupported_format_version(tmp_path):
+    X, y = sklearn.datasets.load_diabetes(return_X_y=True)
+    input_validator = InputValidator()
+    X, y = input_validator.validate(X, y, is_classification=False)
+    directory = str(tmp_path / 'bundle')
+    export_inference_bundle(directory, [(1.0, PipelineStub(sklearn.linear_model.Ridge(), X, y))],
+                            input_validator, REGRESSION)
+    manifest_file = os.path.join(directory, 'manifest.json')
+    with open(manifest_file) as fh:
+        manifest = json.load(fh)
+    manifest['format_version'] = FORMAT_VERSION + 1
+    with open(manifest_file, 'w') as fh:
+        json.dump(manifest, fh)
+    with pytest.raises(ValueError, match='format version'):
+        load_inference_bundle(directory)
+
+
+def test_predictor_dataframe(tmp_path):
+    X, y = sklearn.datasets.load_iris(return_X_y=True, as_frame=True)
+    X['color'] = pd.Series(np.array(['red', 'green', 'blue'])[np.arange(len(X)) % 3],
+                           dtype='category')
+    X['large'] = X['petal length (cm)'] > 4
+    X = X[['color', 'sepal length (cm)', 'large', 'petal width (cm)']]
+    y = pd.Series(np.array(['setosa', 'versicolor', 'virginica'])[y], dtype='category')
+    input_validator = InputValidator()
+    X_train, y_train = input_validator.validate(X, y, is_classification=True)
+    models_with_weights = [
+        (0.7, PipelineStub(sklearn.linear_model.LogisticRegression(C=1.0), X_train, y_train)),
+        (0.3, PipelineStub(sklearn.linear_model.LogisticRegression(C=0.1), X_train, y_train)),
+    ]
+    directory = str(tmp_path / 'bundle')
+    export_inference_bundle(directory, models_with_weights, input_validator,
+                            MULTICLASS_CLASSIFICATION)
+    bundle = load_inference_bundle(directory)
+    predictor = bundle.get_predictor()
+
+    np.testing.assert_array_equal(predictor._validate_features(X),
+                                  input_validator.validate_features(X))
+    np.testing.assert_array_almost_equal(predictor.predict_proba(X), bundle.predict_proba(X))
+    np.testing.assert_array_equal(predictor.predict(X), bundle.predict(X))
+    for i in range(3):
+        row = X.iloc[[i]]
+        np.testing.assert_array_equal(predictor.predict(row), bundle.predict(row))
+
+    # Unknown categories get the error message of the input validator
+    row = X.iloc[[0]].copy()
+    row['color'] = pd.Series(['purple'], index=row.index, dtype='category')
+    with pytest.raises(ValueError, match='new categories'):
+        predictor.predict(row)
+    # So does input of another type
+    with pytest.raises(ValueError, match='previously received features of type'):
+        predictor.predict(X.to_numpy())
+
+
+def test_predictor_array():
+    X, y = sklearn.datasets.load_diabetes(return_X_y=True)
+    input_validator = InputValidator()
+    X, y = input_validator.validate(X, y, is_classification=False)
+    models_with_weights = [(0.5, PipelineStub(sklearn.linear_model.Ridge(alpha=alpha), X, y))
+                           for alpha in (0.1, 10.0)]
+    predictor = Predictor(models_with_weights, input_validator, REGRESSION)
+    expected = sum(weight * model.predict(X) for weight, model in models_with_weights)
+    np.testing.assert_array_almost_equal(predictor.predict(X), expected)
+    np.testing.assert_array_almost_equal(predictor.predict(X[:1]), expected[:1])
+    # The input is not modified
+    X_before = X.copy()
+    predictor.predict(X)
+    np.testing.assert_array_equal(X, X_before)
+    with pytest.raises(ValueError, match='only available for classification'):
+        predictor.predict_proba(X)
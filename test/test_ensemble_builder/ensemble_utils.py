@@ -5,6 +5,7 @@ import unittest
 import numpy as np
 
 from autosklearn.metrics import make_scorer
+from autosklearn.util.backend import Backend
 from autosklearn.ensemble_builder import (
     EnsembleBuilder, AbstractEnsemble
 )
@@ -63,6 +64,18 @@ class BackendMock(object):
     def get_model_filename(self, seed: int, idx: int, budget: float) -> str:
         return '%s.%s.%s.model' % (seed, idx, budget)
 
+    def get_prediction_filename(self, subset, automl_seed, idx, budget):
+        return 'predictions_%s_%s_%s_%s.npy' % (subset, automl_seed, idx, budget)
+
+    _append_to_log = Backend._append_to_log
+    _read_log = Backend._read_log
+    _get_prediction_index_filename = Backend._get_prediction_index_filename
+    _get_score_cache_filename = Backend._get_score_cache_filename
+    append_to_score_cache = Backend.append_to_score_cache
+    load_score_cache = Backend.load_score_cache
+    _append_to_prediction_index = Backend._append_to_prediction_index
+    read_prediction_index = Backend.read_prediction_index
+
 
 def compare_read_preds(read_preds1, read_preds2):
     """
@@ -83,7 +96,7 @@ def compare_read_preds(read_preds1, read_preds2):
         for actual_k, actual_v in read_preds1[k].items():
 
             # If it is a numpy array, make sure it is the same
-            if type(actual_v) is np.ndarray:
+            if isinstance(actual_v, np.ndarray):
                 np.testing.assert_array_equal(actual_v, read_preds2[k][actual_k])
             else:
                 assert actual_v == read_preds2[k][actual_k]
@@ -10,9 +10,25 @@ import dask.distributed
 import numpy as np
 import pandas as pd
 from smac.runhistory.runhistory import RunValue, RunKey, RunHistory
-
-from autosklearn.constants import MULTILABEL_CLASSIFICATION, BINARY_CLASSIFICATION
-from autosklearn.metrics import roc_auc, accuracy, log_loss
+from smac.tae import StatusType
+
+from autosklearn.data.xy_data_manager import XYDataManager
+from autosklearn.constants import (
+    MULTILABEL_CLASSIFICATION,
+    BINARY_CLASSIFICATION,
+    MULTICLASS_CLASSIFICATION,
+    REGRESSION,
+)
+from autosklearn.metrics import (
+    calculate_score,
+    roc_auc,
+    accuracy,
+    balanced_accuracy,
+    f1_macro,
+    log_loss,
+    mean_squared_error,
+    r2,
+)
 from autosklearn.ensembles.ensemble_selection import EnsembleSelection
 from autosklearn.ensemble_builder import (
     EnsembleBuilder,
@@ -22,6 +38,7 @@ from autosklearn.ensemble_builder import (
     Y_TEST,
 )
 from autosklearn.ensembles.singlebest_ensemble import SingleBest
+from autosklearn.util.backend import create
 
 this_directory = os.path.dirname(__file__)
 sys.path.append(this_directory)
@@ -130,6 +147,201 @@ def testRead(ensemble_backend):
     assert ensbuilder.read_scores[filename]["ens_score"] == 1.0
 
 
+def test_read_prediction_index(ensemble_backend):
+    ensemble_backend._append_to_prediction_index(0, 1, 0.0)
+    ensemble_backend._append_to_prediction_index(0, 2, 0.0)
+
+    ensbuilder = EnsembleBuilder(
+        backend=ensemble_backend,
+        dataset_name="TEST",
+        task_type=BINARY_CLASSIFICATION,
+        metric=roc_auc,
+        seed=0,  # important to find the test files
+    )
+
+    # The runs directory is not scanned if there is a prediction index
+    with unittest.mock.patch('glob.glob', side_effect=AssertionError):
+        assert ensbuilder.score_ensemble_preds()
+    assert len(ensbuilder.read_scores) == 2, ensbuilder.read_scores.keys()
+
+    filename = os.path.join(
+        ensemble_backend.temporary_directory,
+        ".auto-sklearn/runs/0_2_0.0/predictions_ensemble_0_2_0.0.npy"
+    )
+    assert ensbuilder.read_scores[filename]["ens_score"] == 1.0
+    assert ensbuilder.read_scores[filename]["mtime_ens"] == os.path.getmtime(filename)
+
+    # A new ensemble builder continues reading the index where the last one stopped
+    ensemble_backend._append_to_prediction_index(0, 3, 100.0)
+    ensbuilder = EnsembleBuilder(
+        backend=ensemble_backend,
+        dataset_name="TEST",
+        task_type=BINARY_CLASSIFICATION,
+        metric=roc_auc,
+        seed=0,  # important to find the test files
+    )
+    assert len(ensbuilder.prediction_index) == 2
+    offset = ensbuilder.prediction_index_offset
+    assert offset > 0
+    with unittest.mock.patch.object(
+        ensemble_backend, 'read_prediction_index',
+        wraps=ensemble_backend.read_prediction_index,
+    ) as read_prediction_index:
+        assert ensbuilder.score_ensemble_preds()
+    read_prediction_index.assert_called_once_with(offset)
+    assert len(ensbuilder.prediction_index) == 3
+    assert len(ensbuilder.read_scores) == 3, ensbuilder.read_scores.keys()
+
+
+def test_score_cache(ensemble_backend):
+    ensbuilder = EnsembleBuilder(
+        backend=ensemble_backend,
+        dataset_name="TEST",
+        task_type=BINARY_CLASSIFICATION,
+        metric=roc_auc,
+        seed=0,  # important to find the test files
+    )
+    assert ensbuilder.score_ensemble_preds()
+    scores = {fn: v["ens_score"] for fn, v in ensbuilder.read_scores.items()}
+    assert len(ensbuilder.score_cache) == len(scores)
+
+    # A new ensemble builder does not score the unchanged files again
+    ensbuilder = EnsembleBuilder(
+        backend=ensemble_backend,
+        dataset_name="TEST",
+        task_type=BINARY_CLASSIFICATION,
+        metric=roc_auc,
+        seed=0,  # important to find the test files
+    )
+    assert len(ensbuilder.score_cache) == len(scores)
+    with unittest.mock.patch.object(
+        ensbuilder, '_read_np_fn', side_effect=AssertionError,
+    ):
+        assert ensbuilder.score_ensemble_preds()
+    assert {fn: v["ens_score"] for fn, v in ensbuilder.read_scores.items()} == scores
+    for value in ensbuilder.read_scores.values():
+        assert value["loaded"] == 2
+
+    # Scores are cached per metric
+    ensbuilder = EnsembleBuilder(
+        backend=ensemble_backend,
+        dataset_name="TEST",
+        task_type=BINARY_CLASSIFICATION,
+        metric=accuracy,
+        seed=0,  # important to find the test files
+    )
+    with unittest.mock.patch.object(
+        ensbuilder, '_read_np_fn', wraps=ensbuilder._read_np_fn,
+    ) as read_np_fn:
+        assert ensbuilder.score_ensemble_preds()
+    assert read_np_fn.call_count == len(scores)
+
+
+def test_prune_by_run_loss(ensemble_backend):
+    ensbuilder = EnsembleBuilder(
+        backend=ensemble_backend,
+        dataset_name="TEST",
+        task_type=BINARY_CLASSIFICATION,
+        metric=roc_auc,
+        seed=0,  # important to find the test files
+        ensemble_nbest=1,
+        run_losses={(0, 2, 0.0): 0.0, (0, 3, 100.0): 0.5},
+    )
+    filename_1, filename_2, filename_3 = [
+        os.path.join(
+            ensemble_backend.temporary_directory,
+            ".auto-sklearn/runs/%s/predictions_ensemble_%s.npy" % (run, run),
+        )
+        for run in ("0_1_0.0", "0_2_0.0", "0_3_100.0")
+    ]
+
+    # The third run cannot be among the best, the dummy is always read
+    with unittest.mock.patch.object(
+        ensbuilder, '_read_np_fn', wraps=ensbuilder._read_np_fn,
+    ) as read_np_fn:
+        assert ensbuilder.score_ensemble_preds()
+    assert [call[0][0] for call in read_np_fn.call_args_list] == [filename_1, filename_2]
+    assert ensbuilder.read_scores[filename_3]["ens_score"] == 0.5
+    assert ensbuilder.read_scores[filename_3]["mtime_ens"] == 0
+    assert ensbuilder.get_n_best_preds() == [filename_2]
+
+    # Predictions of runs without a known loss are read
+    del ensbuilder.run_losses[(0, 3, 100.0)]
+    with unittest.mock.patch.object(
+        ensbuilder, '_read_np_fn', wraps=ensbuilder._read_np_fn,
+    ) as read_np_fn:
+        assert ensbuilder.score_ensemble_preds()
+    assert [call[0][0] for call in read_np_fn.call_args_list] == [filename_3]
+    assert ensbuilder.read_scores[filename_3]["mtime_ens"] != 0
+
+
+@pytest.mark.parametrize("precision", (16, 32, 64))
+def test_read_np_fn_memory_mapped(ensemble_backend, precision):
+    ensbuilder = EnsembleBuilder(
+        backend=ensemble_backend,
+        dataset_name="TEST",
+        task_type=BINARY_CLASSIFICATION,
+        metric=roc_auc,
+        seed=0,  # important to find the test files
+        precision=precision,
+    )
+    filename = os.path.join(
+        ensemble_backend.temporary_directory,
+        ".auto-sklearn/runs/0_2_0.0/predictions_ensemble_0_2_0.0.npy"
+    )
+    # Pickled predictions as stored by default
+    with open(filename, 'rb') as fh:
+        original = np.load(fh)
+    with open(filename, 'wb') as fh:
+        pickle.dump(original.astype(np.float32), fh, -1)
+    expected = ensbuilder._read_np_fn(filename)
+    assert expected.dtype == np.dtype('float%d' % precision)
+    assert expected.flags.writeable
+
+    # Raw predictions in the requested precision are not copied into memory
+    for dtype in (np.float16, np.float32):
+        np.save(filename, expected.astype(dtype))
+        predictions = ensbuilder._read_np_fn(filename)
+        assert predictions.dtype == np.dtype('float%d' % precision)
+        np.testing.assert_array_almost_equal(predictions, expected, decimal=3)
+        # Memory mapped predictions are copy-on-write
+        predictions[:] = -1
+        np.testing.assert_array_almost_equal(np.load(filename), expected, decimal=3)
+
+
+@pytest.mark.parametrize("metric", (accuracy, f1_macro))
+def test_score_memory_mapped_multilabel(tmpdir, metric):
+    backend = create(os.path.join(str(tmpdir), 'tmp'), None)
+    backend.prediction_storage_dtype = np.float32
+    rs = np.random.RandomState(1)
+    y_true = rs.randint(0, 2, size=(20, 3))
+    backend.save_targets_ensemble(y_true)
+    backend.save_datamanager(XYDataManager(
+        y_true, y_true, None, None, task=MULTILABEL_CLASSIFICATION, feat_type=None,
+        dataset_name="TEST",
+    ))
+    predictions = rs.rand(20, 3)
+    backend.save_numrun_to_dir(
+        seed=0, idx=1, budget=0.0, model=None, cv_model=None,
+        ensemble_predictions=predictions, valid_predictions=None, test_predictions=None,
+    )
+
+    ensbuilder = EnsembleBuilder(
+        backend=backend,
+        dataset_name="TEST",
+        task_type=MULTILABEL_CLASSIFICATION,
+        metric=metric,
+        seed=0,
+        precision=32,
+    )
+    ensbuilder.score_ensemble_preds()
+    scores = [entry["ens_score"] for entry in ensbuilder.read_scores.values()]
+    expected = calculate_score(solution=y_true, prediction=predictions.astype(np.float32),
+                               task_type=MULTILABEL_CLASSIFICATION, metric=metric,
+                               all_scoring_functions=False)
+    assert scores == [pytest.approx(expected)]
+
+
 @pytest.mark.parametrize(
     "ensemble_nbest,max_models_on_disc,exp",
     (
@@ -490,6 +702,86 @@ def test_main(ensemble_backend):
     ), os.listdir(ensemble_backend.internals_directory)
 
 
+def test_main_incremental(ensemble_backend):
+
+    ensbuilder = EnsembleBuilder(
+        backend=ensemble_backend,
+        dataset_name="TEST",
+        task_type=MULTILABEL_CLASSIFICATION,  # Multilabel Classification
+        metric=roc_auc,
+        seed=0,  # important to find the test files
+        ensemble_nbest=1,
+        max_models_on_disc=None,
+        incremental=True,
+        )
+    ensbuilder.SAVE2DISC = False
+
+    run_history, _, _, _, _ = ensbuilder.main(
+        time_left=np.inf, iteration=1, return_predictions=False,
+    )
+    assert len(run_history) == 1
+
+    filename_2 = os.path.join(
+        ensemble_backend.temporary_directory,
+        ".auto-sklearn/runs/0_2_0.0/predictions_ensemble_0_2_0.0.npy"
+    )
+    filename_3 = os.path.join(
+        ensemble_backend.temporary_directory,
+        ".auto-sklearn/runs/0_3_100.0/predictions_ensemble_0_3_100.0.npy"
+    )
+    assert ensbuilder.candidate_keys == [filename_3]
+    assert ensbuilder.ensemble.identifiers_ == [(0, 3, 100.0)]
+    # Only the candidates are kept in memory
+    assert [
+        k for k, v in ensbuilder.read_preds.items() if v[Y_ENSEMBLE] is not None
+    ] == [filename_3]
+    # The state lives in the builder and is not stored on disc
+    assert not os.path.exists(
+        os.path.join(ensemble_backend.internals_directory, 'ensemble_read_preds.pkl')
+    )
+    assert not os.path.exists(
+        os.path.join(ensemble_backend.internals_directory, 'ensemble_read_scores.pkl')
+    )
+
+    # Without new predictions nothing is read and no new ensemble is built
+    with unittest.mock.patch.object(ensbuilder, '_read_np_fn', side_effect=AssertionError):
+        run_history, _, _, _, _ = ensbuilder.main(
+            time_left=np.inf, iteration=2, return_predictions=False,
+        )
+    assert len(run_history) == 1
+
+    # Only a changed prediction is read and ranked against the candidates
+    mtime = os.path.getmtime(filename_2)
+    os.utime(filename_2, (mtime + 10, mtime + 10))
+    with unittest.mock.patch.object(
+        ensbuilder, '_read_np_fn', wraps=ensbuilder._read_np_fn,
+    ) as read_np_fn:
+        ensbuilder.main(time_left=np.inf, iteration=3, return_predictions=False)
+    assert read_np_fn.call_count == 1
+    assert ensbuilder.candidate_keys == [filename_3]
+    assert ensbuilder.read_preds[filename_2][Y_ENSEMBLE] is None
+    assert ensbuilder.read_scores[filename_2]["loaded"] == 2
+
+
+def test_fit_ensemble_bagging(ensemble_backend):
+    ensbuilder = EnsembleBuilder(
+        backend=ensemble_backend,
+        dataset_name="TEST",
+        task_type=MULTILABEL_CLASSIFICATION,  # Multilabel Classification
+        metric=roc_auc,
+        seed=0,  # important to find the test files
+        ensemble_nbest=2,
+        n_bags=4,
+        n_jobs=2,
+        )
+    ensbuilder.score_ensemble_preds()
+    ensemble = ensbuilder.fit_ensemble(selected_keys=ensbuilder.get_n_best_preds())
+    assert ensemble.bagging
+    assert ensemble.n_bags == 4
+    assert ensemble.n_jobs == 2
+    assert np.sum(ensemble.weights_) == pytest.approx(1)
+
+
 def test_run_end_at(ensemble_backend):
     with unittest.mock.patch('pynisher.enforce_limits') as pynisher_mock:
         ensbuilder = EnsembleBuilder(
@@ -695,6 +987,220 @@ def testPredict():
         ensemble.predict(per_model_pred)
 
 
+@pytest.mark.parametrize(
+    "task_type,metric",
+    (
+        (BINARY_CLASSIFICATION, accuracy),
+        (BINARY_CLASSIFICATION, roc_auc),
+        (MULTICLASS_CLASSIFICATION, accuracy),
+        (MULTICLASS_CLASSIFICATION, balanced_accuracy),
+        (MULTICLASS_CLASSIFICATION, log_loss),
+        (REGRESSION, mean_squared_error),
+        (REGRESSION, r2),
+    )
+)
+def test_fast_batched_scoring(task_type, metric):
+    # The vectorized scoring of all candidates must result in the same
+    # ensemble as scoring every candidate on its own with sklearn
+    rs = np.random.RandomState(1)
+    n_models, n_samples = 20, 100
+    if task_type == REGRESSION:
+        labels = rs.rand(n_samples).astype(np.float32)
+        predictions = [
+            (labels + rs.normal(scale=0.5, size=n_samples)).reshape((-1, 1)).astype(np.float32)
+            for _ in range(n_models)
+        ]
+    else:
+        n_classes = 2 if task_type == BINARY_CLASSIFICATION else 4
+        labels = rs.randint(n_classes, size=n_samples).astype(np.float32)
+        predictions = []
+        for _ in range(n_models):
+            pred = rs.rand(n_samples, n_classes).astype(np.float32)
+            predictions.append(pred / pred.sum(axis=1, keepdims=True))
+
+    ensembles = []
+    for batch in (True, False):
+        ensemble = EnsembleSelection(
+            ensemble_size=10,
+            task_type=task_type,
+            random_state=np.random.RandomState(0),
+            metric=metric,
+        )
+        if batch:
+            ensemble.fit(predictions, labels, identifiers=list(range(n_models)))
+        else:
+            with unittest.mock.patch(
+                'autosklearn.metrics.find_score_kernel',
+                return_value=None,
+            ):
+                ensemble.fit(predictions, labels, identifiers=list(range(n_models)))
+        ensembles.append(ensemble)
+
+    np.testing.assert_array_equal(ensembles[0].indices_, ensembles[1].indices_)
+    np.testing.assert_allclose(ensembles[0].trajectory_, ensembles[1].trajectory_)
+
+
+@pytest.mark.parametrize("metric", [accuracy, log_loss])
+def test_fast_running_sum_is_bit_identical(metric):
+    # Reference implementation which re-sums all selected predictions in
+    # every round, as ensemble selection used to do
+    def resumming_trajectory(predictions, labels, ensemble_size, random_state):
+        ensemble, trajectory, order = [], [], []
+        weighted_ensemble_prediction = np.zeros(predictions[0].shape, dtype=np.float64)
+        for i in range(ensemble_size):
+            scores = np.zeros(len(predictions), dtype=np.float64)
+            s = len(ensemble)
+            weighted_ensemble_prediction.fill(0.0)
+            if s > 0:
+                for pred in ensemble:
+                    np.add(weighted_ensemble_prediction, pred, out=weighted_ensemble_prediction)
+                np.multiply(weighted_ensemble_prediction, 1/s, out=weighted_ensemble_prediction)
+                np.multiply(weighted_ensemble_prediction, (s / float(s + 1)),
+                            out=weighted_ensemble_prediction)
+            for j, pred in enumerate(predictions):
+                fant_ensemble_prediction = weighted_ensemble_prediction + \
+                    (1. / float(s + 1)) * pred
+                scores[j] = metric._optimum - calculate_score(
+                    labels, fant_ensemble_prediction, MULTICLASS_CLASSIFICATION, metric)
+            all_best = np.argwhere(scores == np.nanmin(scores)).flatten()
+            best = random_state.choice(all_best)
+            ensemble.append(predictions[best])
+            trajectory.append(scores[best])
+            order.append(best)
+        return order, trajectory
+
+    rs = np.random.RandomState(1)
+    n_models, n_samples, n_classes = 15, 200, 3
+    labels = rs.randint(n_classes, size=n_samples).astype(np.float32)
+    predictions = []
+    for _ in range(n_models):
+        pred = rs.rand(n_samples, n_classes).astype(np.float32)
+        predictions.append(pred / pred.sum(axis=1, keepdims=True))
+
+    expected_order, expected_trajectory = resumming_trajectory(
+        predictions, labels, 25, np.random.RandomState(0))
+
+    ensemble = EnsembleSelection(
+        ensemble_size=25,
+        task_type=MULTICLASS_CLASSIFICATION,
+        random_state=np.random.RandomState(0),
+        metric=metric,
+    )
+    with unittest.mock.patch(
+        'autosklearn.ensembles.ensemble_selection.get_score_kernel',
+        return_value=None,
+    ):
+        ensemble.fit(predictions, labels, identifiers=list(range(n_models)))
+    np.testing.assert_array_equal(ensemble.indices_, expected_order)
+    np.testing.assert_array_equal(ensemble.trajectory_, expected_trajectory)
+
+
+def test_fast_warm_start():
+    rs = np.random.RandomState(1)
+    n_models, n_samples, n_classes = 10, 100, 3
+    labels = rs.randint(n_classes, size=n_samples).astype(np.float32)
+    predictions = []
+    for _ in range(n_models):
+        pred = rs.rand(n_samples, n_classes).astype(np.float32)
+        predictions.append(pred / pred.sum(axis=1, keepdims=True))
+    identifiers = [(0, i, 0.0) for i in range(n_models)]
+
+    ensemble = EnsembleSelection(
+        ensemble_size=10,
+        task_type=MULTICLASS_CLASSIFICATION,
+        random_state=np.random.RandomState(0),
+        metric=accuracy,
+        warm_start=True,
+    )
+    # Without a previous fit, there is nothing to start from
+    ensemble.fit(predictions[:5], labels, identifiers[:5])
+    reference = EnsembleSelection(
+        ensemble_size=10,
+        task_type=MULTICLASS_CLASSIFICATION,
+        random_state=np.random.RandomState(0),
+        metric=accuracy,
+    )
+    reference.fit(predictions[:5], labels, identifiers[:5])
+    np.testing.assert_array_equal(ensemble.indices_, reference.indices_)
+
+    # Storing the ensemble must not remove the metric needed by the next fit
+    pickle.dumps(ensemble)
+    assert ensemble.metric is accuracy
+
+    # The previous members are found by their identifier and each round can
+    # only keep or improve the ensemble
+    previous_weights = dict(zip(ensemble.identifiers_, ensemble.weights_))
+    previous_score = ensemble.train_score_
+    ensemble.fit(predictions[::-1], labels, identifiers[::-1])
+    assert len(ensemble.indices_) == 10
+    assert np.all(np.diff(ensemble.trajectory_) <= 0)
+    assert ensemble.train_score_ <= previous_score
+    assert np.sum(ensemble.weights_) == pytest.approx(1)
+
+    # Starting from the same models and the converged ensemble changes nothing
+    ensemble.fit(predictions[::-1], labels, identifiers[::-1])
+    weights = dict(zip(ensemble.identifiers_, ensemble.weights_))
+    ensemble.fit(predictions[::-1], labels, identifiers[::-1])
+    assert dict(zip(ensemble.identifiers_, ensemble.weights_)) == weights
+    assert previous_weights.keys() <= weights.keys()
+
+    ensemble.mode = 'slow'
+    with pytest.raises(ValueError, match='Warm starting is only supported'):
+        ensemble.fit(predictions, labels, identifiers)
+
+
+@pytest.mark.parametrize("metric", [accuracy, log_loss])
+def test_bagging(metric):
+    rs = np.random.RandomState(1)
+    n_models, n_samples, n_classes = 12, 100, 3
+    labels = rs.randint(n_classes, size=n_samples).astype(np.float32)
+    predictions = []
+    for _ in range(n_models):
+        pred = rs.rand(n_samples, n_classes).astype(np.float32)
+        predictions.append(pred / pred.sum(axis=1, keepdims=True))
+
+    ensembles = []
+    for n_jobs, kernel in ((1, True), (2, True), (2, False)):
+        ensemble = EnsembleSelection(
+            ensemble_size=10,
+            task_type=MULTICLASS_CLASSIFICATION,
+            random_state=np.random.RandomState(0),
+            metric=metric,
+            bagging=True,
+            n_bags=8,
+            n_jobs=n_jobs,
+        )
+        if kernel:
+            ensemble.fit(predictions, labels, identifiers=list(range(n_models)))
+        else:
+            with unittest.mock.patch(
+                'autosklearn.ensembles.ensemble_selection.get_score_kernel',
+                return_value=None,
+            ):
+                ensemble.fit(predictions, labels, identifiers=list(range(n_models)))
+        ensembles.append(ensemble)
+
+    # Neither the threads nor the scoring method change the result
+    for ensemble in ensembles[1:]:
+        np.testing.assert_array_equal(ensemble.indices_, ensembles[0].indices_)
+        np.testing.assert_allclose(ensemble.weights_, ensembles[0].weights_)
+
+    ensemble = ensembles[0]
+    assert len(ensemble.indices_) == 8 * 10
+    assert len(ensemble.weights_) == n_models
+    assert np.sum(ensemble.weights_) == pytest.approx(1)
+    # The score refers to the averaged ensemble of all bags
+    assert len(ensemble.trajectory_) == 1
+    assert ensemble.train_score_ == pytest.approx(
+        metric._optimum
+        - calculate_score(labels, ensemble.predict(predictions), MULTICLASS_CLASSIFICATION, metric)
+    )
+
+    ensemble.mode = 'slow'
+    with pytest.raises(ValueError, match='Bagging is only supported in fast mode'):
+        ensemble.fit(predictions, labels, identifiers=list(range(n_models)))
+
+
 @pytest.mark.parametrize("metric", [log_loss, accuracy])
 @unittest.mock.patch('os.path.exists')
 def test_get_identifiers_from_run_history(exists, metric, ensemble_run_history, ensemble_backend):
@@ -790,3 +1296,107 @@ def test_ensemble_builder_nbest_remembered(fit_ensemble, ensemble_backend, dask_
     dask.distributed.wait([future])  # wait for the ensemble process to finish
     assert not os.path.exists(file_path)
     assert future.result() == ([], 2, None, None, None)
+
+
+def test_ensemble_builder_incremental(ensemble_backend):
+    manager = EnsembleBuilderManager(
+        start_time=time.time(),
+        time_left_for_ensembles=1000,
+        backend=ensemble_backend,
+        dataset_name='Test',
+        task=MULTILABEL_CLASSIFICATION,
+        metric=roc_auc,
+        ensemble_size=50,
+        ensemble_nbest=10,
+        max_models_on_disc=None,
+        seed=0,
+        precision=32,
+        max_iterations=None,
+        read_at_most=np.inf,
+        ensemble_memory_limit=None,
+        random_state=0,
+        logger_name='Ensemblebuilder',
+        incremental=True,
+    )
+    # The ensemble is built right away in this process
+    manager.build_ensemble(dask_client=None)
+    assert len(manager.futures) == 0
+    assert manager.iteration == 1
+    assert len(manager.history) == 1
+    assert manager.history[0]['ensemble_optimization_score'] == 1.0
+    ensemble_builder = manager.ensemble_builder
+
+    # The same builder is used for all iterations
+    manager.build_ensemble(dask_client=None)
+    assert manager.ensemble_builder is ensemble_builder
+    assert manager.iteration == 2
+    assert len(manager.history) == 1
+
+
+def test_limit_candidate_memory(ensemble_backend):
+    ensbuilder = EnsembleBuilder(
+        backend=ensemble_backend,
+        dataset_name="TEST",
+        task_type=MULTILABEL_CLASSIFICATION,
+        metric=roc_auc,
+        seed=0,  # important to find the test files
+        ensemble_nbest=10,
+        max_models_on_disc=None,
+        incremental=True,
+    )
+    ensbuilder.SAVE2DISC = False
+    ensbuilder.main(time_left=np.inf, iteration=1, return_predictions=False)
+    assert len(ensbuilder.candidate_keys) == 2
+    assert ensbuilder.ensemble_nbest == 10
+
+    # The predictions of the best candidate fit into the limit, the second do not
+    best, worst = ensbuilder.candidate_keys
+    memory_mb = sum(pred.nbytes for pred in ensbuilder.read_preds[best].values()) / 1024 / 1024
+    ensbuilder.memory_limit = memory_mb * 1.5
+    assert ensbuilder.limit_candidate_memory([best, worst]) == [best]
+    assert ensbuilder.candidate_keys == [best]
+    assert ensbuilder.ensemble_nbest == 1
+    assert all(pred is None for pred in ensbuilder.read_preds[worst].values())
+    assert ensbuilder.read_scores[worst]['loaded'] == 2
+
+    # The best candidate is always kept
+    ensbuilder.memory_limit = 0
+    assert ensbuilder.limit_candidate_memory([best]) == [best]
+
+
+@pytest.mark.parametrize("prune_by_run_loss", (True, False))
+def test_ensemble_builder_manager_records_run_losses(ensemble_backend, prune_by_run_loss):
+    manager = EnsembleBuilderManager(
+        start_time=time.time(),
+        time_left_for_ensembles=1000,
+        backend=ensemble_backend,
+        dataset_name='Test',
+        task=BINARY_CLASSIFICATION,
+        metric=roc_auc,
+        ensemble_size=50,
+        ensemble_nbest=10,
+        max_models_on_disc=None,
+        seed=0,
+        precision=32,
+        max_iterations=None,
+        read_at_most=np.inf,
+        ensemble_memory_limit=None,
+        random_state=0,
+        logger_name='Ensemblebuilder',
+        prune_by_run_loss=prune_by_run_loss,
+    )
+    run_info = unittest.mock.Mock(budget=100)
+    with unittest.mock.patch.object(manager, 'build_ensemble') as build_ensemble:
+        for num_run, status in ((2, StatusType.SUCCESS), (3, StatusType.CRASHED)):
+            result = RunValue(
+                cost=0.25,
+                time=1.0,
+                status=status,
+                starttime=time.time(),
+                endtime=time.time(),
+                additional_info={'num_run': num_run},
+            )
+            manager(unittest.mock.Mock(), run_info, result, 100)
+    assert build_ensemble.call_count == 2
+    # The losses of other resampling strategies than holdout are not recorded
+    assert manager.run_losses == ({(0, 2, 100.0): 0.25} if prune_by_run_loss else {})
@@ -37,6 +37,7 @@ class AbstractEvaluatorTest(unittest.TestCase):
         backend_mock.get_prediction_output_path.side_effect = dummy_pred_files
         D = get_multiclass_classification_datamanager()
         backend_mock.load_datamanager.return_value = D
+        backend_mock.get_transform_cache.return_value = None
         self.backend_mock = backend_mock
 
         self.working_directory = os.path.join(this_directory, '.tmp_%s' % self.id())
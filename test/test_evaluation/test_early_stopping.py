@@ -0,0 +1,53 @@
+import unittest
+
+from autosklearn.evaluation.early_stopping import (
+    AbstractEarlyStopping,
+    CurveExtrapolation,
+    MedianStopping,
+    get_early_stopping,
+)
+
+
+class EarlyStoppingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.finished_curves = [
+            [(2, 0.5), (4, 0.4), (8, 0.3), (16, 0.2)],
+            [(2, 0.6), (4, 0.5), (8, 0.4), (16, 0.3)],
+            [(2, 0.7), (4, 0.6), (8, 0.5)],
+        ]
+
+    def test_median_stopping(self):
+        policy = MedianStopping(min_steps=2, min_curves=3)
+        # Running averages after two steps are 0.45, 0.55 and 0.65
+        self.assertFalse(policy.should_stop([(2, 0.6), (4, 0.5)], 16, self.finished_curves))
+        self.assertTrue(policy.should_stop([(2, 0.6), (4, 0.56)], 16, self.finished_curves))
+        # Not enough steps
+        self.assertFalse(policy.should_stop([(2, 0.9)], 16, self.finished_curves))
+        # Not enough finished curves with as many steps
+        self.assertFalse(policy.should_stop(
+            [(2, 0.9), (4, 0.9), (8, 0.9), (16, 0.9)], 16, self.finished_curves))
+        self.assertFalse(policy.should_stop([(2, 0.9), (4, 0.9)], 16, []))
+
+    def test_curve_extrapolation(self):
+        policy = CurveExtrapolation(min_steps=3)
+        # loss = 0.1 + 0.8 / n_iter, extrapolated to 0.15 after 16 iterations
+        curve = [(2, 0.5), (4, 0.3), (8, 0.2)]
+        self.assertFalse(policy.should_stop(curve, 16, self.finished_curves))
+        self.assertTrue(policy.should_stop(curve, 16, [[(16, 0.12)]]))
+        # 0.1125 after 64 iterations
+        self.assertFalse(policy.should_stop(curve, 64, [[(16, 0.12)]]))
+        self.assertTrue(CurveExtrapolation(margin=0.1).should_stop(curve, 16, [[(16, 0.01)]]))
+        self.assertFalse(CurveExtrapolation(margin=0.1).should_stop(curve, 16, [[(16, 0.1)]]))
+        # Nothing to compare to
+        self.assertFalse(policy.should_stop(curve, 16, []))
+
+    def test_get_early_stopping(self):
+        self.assertIsNone(get_early_stopping(None))
+        self.assertIsInstance(get_early_stopping('median'), MedianStopping)
+        self.assertIsInstance(get_early_stopping('extrapolation'), CurveExtrapolation)
+        policy = MedianStopping(min_curves=1)
+        self.assertIs(get_early_stopping(policy), policy)
+        self.assertIsInstance(policy, AbstractEarlyStopping)
+        self.assertRaisesRegex(ValueError, 'Unknown early stopping policy',
+                               get_early_stopping, 'mean')
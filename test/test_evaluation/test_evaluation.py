@@ -32,6 +32,9 @@ class BackendMock(object):
     def load_datamanager(self):
         return get_multiclass_classification_datamanager()
 
+    def load_resampling_splits(self):
+        return None
+
 
 class EvaluationTest(unittest.TestCase):
     def setUp(self):
@@ -317,6 +320,101 @@ class EvaluationTest(unittest.TestCase):
         self.assertIn('configuration_origin', info[1].additional_info)
         self.assertEqual(info[1].additional_info['message'], "{'subsample': 30}")
 
+    @unittest.mock.patch('autosklearn.evaluation.train_evaluator.eval_holdout')
+    def test_eval_with_limits_holdout_phase_timings(self, eval_holdout_mock):
+        config = unittest.mock.Mock()
+        config.config_id = 198
+
+        def side_effect(*args, **kwargs):
+            start = time.time()
+            time.sleep(0.1)
+            kwargs['queue'].put({
+                'status': StatusType.SUCCESS,
+                'loss': 0.5,
+                'additional_run_info': {
+                    'phase_timings': {'fit_estimator': {'wall_time': 0.1, 'cpu_time': 0.0,
+                                                        'calls': 1}},
+                    'phase_timestamps': {'start': start, 'result': time.time()},
+                },
+            })
+        eval_holdout_mock.side_effect = side_effect
+        ta = ExecuteTaFuncWithQueue(backend=BackendMock(), autosklearn_seed=1,
+                                    resampling_strategy='holdout',
+                                    logger=self.logger,
+                                    stats=self.stats,
+                                    memory_limit=3072,
+                                    metric=accuracy,
+                                    cost_for_crash=get_cost_of_crash(accuracy),
+                                    abort_on_first_run_crash=False,
+                                    )
+        info = ta.run_wrapper(RunInfo(config=config, cutoff=30, instance=None,
+                                      instance_specific=None, seed=1, capped=False))
+        self.assertEqual(info[1].status, StatusType.SUCCESS)
+        self.assertNotIn('phase_timestamps', info[1].additional_info)
+        phase_timings = info[1].additional_info['phase_timings']
+        self.assertEqual(set(phase_timings), {'fit_estimator', 'process_spawn', 'queue_handoff'})
+        for phase in ('process_spawn', 'queue_handoff'):
+            self.assertGreaterEqual(phase_timings[phase]['wall_time'], 0)
+            self.assertLess(phase_timings[phase]['wall_time'], info[1].time)
+            self.assertNotIn('cpu_time', phase_timings[phase])
+
+    @unittest.mock.patch('autosklearn.evaluation.train_evaluator.eval_holdout')
+    def test_eval_with_limits_holdout_memory_aware_dispatch(self, eval_holdout_mock):
+        config = unittest.mock.Mock()
+        config.config_id = 198
+        config.get_dictionary.return_value = {
+            'classifier:__choice__': 'random_forest',
+            'feature_preprocessor:__choice__': 'polynomial',
+        }
+
+        def side_effect(*args, **kwargs):
+            kwargs['queue'].put({'status': StatusType.SUCCESS,
+                                 'loss': 0.5,
+                                 'additional_run_info': {'peak_memory_mb': 250.0}})
+        eval_holdout_mock.side_effect = side_effect
+        backend_mock = unittest.mock.Mock()
+        backend_mock.load_datamanager.return_value = self.datamanager
+        backend_mock.load_resampling_splits.return_value = None
+        backend_mock.load_memory_observations.return_value = []
+
+        def get_ta(memory_limit):
+            return ExecuteTaFuncWithQueue(backend=backend_mock, autosklearn_seed=1,
+                                          resampling_strategy='holdout',
+                                          logger=self.logger,
+                                          stats=self.stats,
+                                          memory_limit=memory_limit,
+                                          metric=accuracy,
+                                          cost_for_crash=get_cost_of_crash(accuracy),
+                                          abort_on_first_run_crash=False,
+                                          memory_aware_dispatch=True,
+                                          )
+        run_info = RunInfo(config=config, cutoff=30, instance=None,
+                           instance_specific=None, seed=1, capped=False)
+
+        # The components were not observed yet, so the configuration is
+        # evaluated regardless of the prior
+        ta = get_ta(3072)
+        self.assertIsNone(ta._predict_memory_usage(config, 0.0))
+        info = ta.run_wrapper(run_info)
+        self.assertEqual(info[1].status, StatusType.SUCCESS)
+        backend_mock.append_to_memory_log.assert_called_once_with(
+            ('random_forest', 'polynomial'), unittest.mock.ANY, 250.0)
+
+        # Only observed peaks exceeding the memory limit by more than the
+        # margin skip the configuration
+        data_mb = ta.memory_estimator.data_mb
+        for peak_mb, status in ((4000.0, StatusType.SUCCESS), (5000.0, StatusType.MEMOUT)):
+            backend_mock.load_memory_observations.return_value = [
+                (['random_forest', 'polynomial'], data_mb, peak_mb),
+                (['random_forest', 'polynomial'], data_mb, peak_mb),
+            ]
+            info = ta.run_wrapper(run_info)
+            self.assertEqual(info[1].status, status)
+        self.assertEqual(info[1].cost, 1.0)
+        self.assertEqual(info[1].time, 0.0)
+        self.assertAlmostEqual(info[1].additional_info['predicted_memory_mb'], 5000.0)
+        self.assertEqual(backend_mock.append_to_memory_log.call_count, 2)
+
     @unittest.mock.patch('autosklearn.evaluation.train_evaluator.eval_holdout')
     def test_exception_in_target_function(self, eval_holdout_mock):
         config = unittest.mock.Mock()
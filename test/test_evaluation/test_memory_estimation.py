@@ -0,0 +1,111 @@
+import unittest
+import unittest.mock
+
+import numpy as np
+import scipy.sparse
+
+import autosklearn.evaluation.memory_estimation
+from autosklearn.evaluation.memory_estimation import (
+    MemoryEstimator,
+    get_components,
+    get_peak_memory_mb,
+    reset_peak_memory,
+)
+
+
+class MemoryEstimationTest(unittest.TestCase):
+
+    def test_get_components(self):
+        config = unittest.mock.Mock()
+        config.get_dictionary.return_value = {
+            'classifier:__choice__': 'random_forest',
+            'feature_preprocessor:__choice__': 'pca',
+            'feature_preprocessor:pca:keep_variance': 0.9,
+        }
+        self.assertEqual(get_components(config), ('random_forest', 'pca'))
+        config.get_dictionary.return_value = {'regressor:__choice__': 'sgd'}
+        self.assertEqual(get_components(config), ('sgd', None))
+
+    def test_from_datamanager(self):
+        datamanager = unittest.mock.Mock()
+        datamanager.data = {'X_train': np.zeros((1024, 128), dtype=np.float64)}
+        datamanager.feat_type = ['numerical'] * 128
+        self.assertEqual(MemoryEstimator.from_datamanager(datamanager).data_mb, 1.0)
+
+        # Categorical features are one-hot encoded
+        X_train = np.zeros((1024, 128), dtype=np.float64)
+        X_train[:, 0] = np.arange(1024) % 8
+        datamanager.data = {'X_train': X_train}
+        datamanager.feat_type = ['categorical'] + ['numerical'] * 127
+        self.assertGreater(MemoryEstimator.from_datamanager(datamanager).data_mb, 1.0)
+
+        datamanager.data = {'X_train': scipy.sparse.csr_matrix((1024, 128))}
+        self.assertLess(MemoryEstimator.from_datamanager(datamanager).data_mb, 0.01)
+
+    def test_get_data_mb(self):
+        estimator = MemoryEstimator(data_mb=10.0)
+        self.assertEqual(estimator.get_data_mb(100, None), 10.0)
+        self.assertEqual(estimator.get_data_mb(25, 'subsample'), 2.5)
+        self.assertEqual(estimator.get_data_mb(25, 'iterations'), 10.0)
+
+    def test_predict(self):
+        estimator = MemoryEstimator(data_mb=10.0, overhead_mb=200.0, min_observations=2)
+        components = ('random_forest', 'polynomial')
+
+        # Prior of 10 for the random forest times 8 for the polynomial features
+        self.assertEqual(estimator.predict(components, 10.0, []), 1000.0)
+        self.assertEqual(estimator.predict(('sgd', None), 10.0, []), 240.0)
+
+        # Too few observations of the same components to replace the prior
+        observations = [(['random_forest', 'polynomial'], 10.0, 200.0 + 10 * 30.0)]
+        self.assertEqual(estimator.predict(components, 10.0, observations), 1000.0)
+
+        observations.append((['random_forest', 'polynomial'], 5.0, 200.0 + 5 * 40.0))
+        self.assertEqual(estimator.predict(components, 10.0, observations), 550.0)
+        self.assertEqual(estimator.predict(('sgd', None), 10.0, observations), 240.0)
+
+        # The overhead is bounded by the smallest peak observed
+        observations.append((['sgd', None], 1.0, 150.0))
+        self.assertEqual(estimator.predict(('sgd', None), 10.0, observations), 190.0)
+
+        # The observed factor is at least one
+        observations = [(['sgd', None], 10.0, 100.0), (['sgd', None], 10.0, 100.0)]
+        self.assertEqual(estimator.predict(('sgd', None), 10.0, observations), 110.0)
+
+    def test_is_observed(self):
+        estimator = MemoryEstimator(data_mb=10.0, min_observations=2)
+        components = ('random_forest', None)
+        observations = [(['random_forest', None], 10.0, 300.0), (['sgd', None], 10.0, 250.0)]
+        self.assertFalse(estimator.is_observed(components, []))
+        self.assertFalse(estimator.is_observed(components, observations))
+        observations.append((['random_forest', None], 5.0, 250.0))
+        self.assertTrue(estimator.is_observed(components, observations))
+        self.assertFalse(estimator.is_observed(('sgd', None), observations))
+
+    def test_exceeds(self):
+        estimator = MemoryEstimator(data_mb=10.0, margin=1.5)
+        self.assertFalse(estimator.exceeds(1500.0, 1000.0))
+        self.assertTrue(estimator.exceeds(1501.0, 1000.0))
+
+    @unittest.mock.patch.object(autosklearn.evaluation.memory_estimation, '_runs_in_process', 0)
+    @unittest.mock.patch.object(autosklearn.evaluation.memory_estimation, '_peak_memory_reset',
+                                False)
+    def test_peak_memory(self):
+        reset_peak_memory()
+        data = np.ones(20 * 1024 * 1024 // 8)
+        data_peak_mb = get_peak_memory_mb()
+        del data
+        if autosklearn.evaluation.memory_estimation._peak_memory_reset:
+            # The peak of the previous run is forgotten
+            reset_peak_memory()
+            self.assertLess(get_peak_memory_mb(), data_peak_mb - 10)
+
+        # Without the reset, the peak of the first run in a process is still
+        # known, the peaks of later runs include the earlier ones
+        autosklearn.evaluation.memory_estimation._runs_in_process = 0
+        with unittest.mock.patch('autosklearn.evaluation.memory_estimation.open',
+                                 side_effect=OSError, create=True):
+            reset_peak_memory()
+            self.assertIsNotNone(get_peak_memory_mb())
+            reset_peak_memory()
+            self.assertIsNone(get_peak_memory_mb())
@@ -49,6 +49,7 @@ class TestEvaluator_Test(BaseEvaluatorTest, unittest.TestCase):
                 if len(y.shape) == 2 and y.shape[1] == 1:
                     D_.data['Y_train'] = y.flatten()
                 backend_mock.load_datamanager.return_value = D_
+                backend_mock.get_transform_cache.return_value = None
                 metric_lookup = {MULTILABEL_CLASSIFICATION: f1_macro,
                                  BINARY_CLASSIFICATION: accuracy,
                                  MULTICLASS_CLASSIFICATION: accuracy,
@@ -79,6 +80,7 @@ class FunctionsTest(unittest.TestCase):
                                     '.test_cv_functions')
         self.backend = unittest.mock.Mock(spec=Backend)
         self.backend.load_datamanager.return_value = self.data
+        self.backend.get_transform_cache.return_value = None
         self.dataset_name = json.dumps({'task_id': 'test'})
 
     def tearDown(self):
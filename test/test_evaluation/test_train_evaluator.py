@@ -5,6 +5,8 @@ import multiprocessing
 import os
 import shutil
 import sys
+import threading
+import time
 import unittest
 import unittest.mock
 
@@ -20,7 +22,8 @@ from smac.tae import StatusType, TAEAbortException
 from autosklearn.data.abstract_data_manager import AbstractDataManager
 from autosklearn.evaluation.util import read_queue
 from autosklearn.evaluation.train_evaluator import TrainEvaluator, \
-    eval_holdout, eval_iterative_holdout, eval_cv, eval_partial_cv, subsample_indices
+    compute_splits, eval_holdout, eval_iterative_holdout, eval_cv, eval_partial_cv, \
+    subsample_indices
 from autosklearn.util import backend
 from autosklearn.util.pipeline import get_configuration_space
 from autosklearn.constants import BINARY_CLASSIFICATION, \
@@ -41,6 +44,9 @@ class BackendMock(object):
     def load_datamanager(self):
         return get_multiclass_classification_datamanager()
 
+    def load_resampling_splits(self):
+        return None
+
 
 class Dummy(object):
     def __init__(self):
@@ -68,6 +74,8 @@ class TestTrainEvaluator(BaseEvaluatorTest, unittest.TestCase):
         backend_mock.get_model_path.side_effect = dummy_model_files
         backend_mock.get_cv_model_path.side_effect = dummy_cv_model_files
         backend_mock.get_prediction_output_path.side_effect = dummy_pred_files
+        backend_mock.get_transform_cache.return_value = None
+        backend_mock.load_resampling_splits.return_value = None
         self.backend_mock = backend_mock
 
         self.tmp_dir = os.path.join(self.ev_path, 'tmp_dir')
@@ -128,6 +136,100 @@ class TestTrainEvaluator(BaseEvaluatorTest, unittest.TestCase):
                          D.data['Y_test'].shape[0])
         self.assertEqual(evaluator.model.fit.call_count, 1)
 
+    @unittest.mock.patch('autosklearn.pipeline.classification.SimpleClassificationPipeline')
+    def test_holdout_phase_timings(self, pipeline_mock):
+        D = get_binary_classification_datamanager()
+
+        def fit(X, y):
+            # The evaluator passes its timer to the pipeline
+            with pipeline_mock.phase_timer.time('fit_estimator'):
+                time.sleep(0.05)
+
+        pipeline_mock.fit.side_effect = fit
+        pipeline_mock.predict_proba.side_effect = \
+            lambda X, batch_size=None: np.tile([0.6, 0.4], (len(X), 1))
+        pipeline_mock.side_effect = lambda **kwargs: pipeline_mock
+        pipeline_mock.get_additional_run_info.return_value = None
+        pipeline_mock.get_max_iter.return_value = 1
+        pipeline_mock.get_current_iter.return_value = 1
+
+        configuration = unittest.mock.Mock(spec=Configuration)
+        backend_api = backend.create(self.tmp_dir, self.output_dir)
+        backend_api.load_datamanager = lambda: D
+        evaluator = TrainEvaluator(backend_api, multiprocessing.Queue(),
+                                   configuration=configuration,
+                                   resampling_strategy='holdout',
+                                   all_scoring_functions=False,
+                                   output_y_hat_optimization=True,
+                                   metric=accuracy)
+        evaluator.file_output = unittest.mock.Mock(spec=evaluator.file_output)
+        evaluator.file_output.return_value = (None, {})
+        evaluator.fit_predict_and_loss()
+
+        additional_run_info = read_queue(evaluator.queue)[0]['additional_run_info']
+        phase_timings = additional_run_info['phase_timings']
+        self.assertEqual(set(phase_timings), {
+            'load_datamanager', 'fit_estimator', 'predict_train', 'predict_optimization',
+            'predict_valid', 'predict_test', 'file_output',
+        })
+        self.assertGreaterEqual(phase_timings['fit_estimator']['wall_time'], 0.05)
+        for timing in phase_timings.values():
+            self.assertEqual(timing['calls'], 1)
+            self.assertGreaterEqual(timing['cpu_time'], 0)
+        timestamps = additional_run_info['phase_timestamps']
+        self.assertEqual(timestamps['start'], evaluator.starttime)
+        self.assertGreaterEqual(timestamps['result'] - timestamps['start'], 0.05)
+
+    @unittest.mock.patch('autosklearn.pipeline.classification.SimpleClassificationPipeline')
+    def test_holdout_only_used_predictions(self, pipeline_mock):
+        D = get_binary_classification_datamanager()
+        # Without targets, the test predictions are only used to store them
+        del D.data['Y_test']
+
+        predicted_sizes = []
+
+        def predict_proba(X, batch_size=None):
+            predicted_sizes.append(len(X))
+            return np.tile([0.6, 0.4], (len(X), 1))
+
+        pipeline_mock.predict_proba.side_effect = predict_proba
+        pipeline_mock.side_effect = lambda **kwargs: pipeline_mock
+        pipeline_mock.get_additional_run_info.return_value = None
+        pipeline_mock.get_max_iter.return_value = 1
+        pipeline_mock.get_current_iter.return_value = 1
+
+        configuration = unittest.mock.Mock(spec=Configuration)
+        backend_api = backend.create(self.tmp_dir, self.output_dir)
+        backend_api.load_datamanager = lambda: D
+
+        for disable_file_output, expected_sizes, train_loss in (
+            ([], [45, 24, 25, 6], True),
+            (['y_valid', 'y_test'], [45, 24, 25], True),
+            (True, [45, 24, 25], True),
+            (['train_loss'], [24, 25, 6], False),
+        ):
+            predicted_sizes.clear()
+            evaluator = TrainEvaluator(backend_api, multiprocessing.Queue(),
+                                       configuration=configuration,
+                                       resampling_strategy='holdout',
+                                       resampling_strategy_args={'train_size': 0.66},
+                                       all_scoring_functions=False,
+                                       output_y_hat_optimization=True,
+                                       metric=accuracy,
+                                       disable_file_output=disable_file_output,
+                                       )
+            evaluator.file_output = unittest.mock.Mock(spec=evaluator.file_output)
+            evaluator.file_output.return_value = (None, {})
+            evaluator.fit_predict_and_loss()
+
+            rval = read_queue(evaluator.queue)
+            self.assertEqual(rval[0]['status'], StatusType.SUCCESS)
+            self.assertEqual(rval[0]['loss'], 0.45833333333333337)
+            self.assertEqual(predicted_sizes, expected_sizes)
+            self.assertEqual('train_loss' in rval[0]['additional_run_info'], train_loss)
+            # The validation predictions are always used for the validation loss
+            self.assertIn('validation_loss', rval[0]['additional_run_info'])
+
     @unittest.mock.patch('autosklearn.pipeline.classification.SimpleClassificationPipeline')
     def test_iterative_holdout(self, pipeline_mock):
         # Regular fitting
@@ -223,6 +325,64 @@ class TestTrainEvaluator(BaseEvaluatorTest, unittest.TestCase):
         self.assertEqual(evaluator.file_output.call_count, 9)
         self.assertEqual(evaluator.model.fit.call_count, 0)
 
+    def _get_early_stopping_evaluator(self, pipeline_mock, backend_api, loss):
+        D = get_binary_classification_datamanager()
+        pipeline_mock.estimator_supports_iterative_fit.return_value = True
+        pipeline_mock.configuration_fully_fitted.return_value = False
+        pipeline_mock.fit_transformer.return_value = 'Xt_fixture', {}
+        pipeline_mock.predict_proba.side_effect = \
+            lambda X, batch_size=None: np.tile([0.6, 0.4], (len(X), 1))
+        pipeline_mock.get_additional_run_info.return_value = None
+        pipeline_mock.side_effect = lambda **kwargs: pipeline_mock
+        pipeline_mock.get_max_iter.return_value = 512
+        pipeline_mock.get_current_iter.side_effect = (2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+        configuration = unittest.mock.Mock(spec=Configuration)
+        backend_api.load_datamanager = lambda: D
+        evaluator = TrainEvaluator(backend_api, multiprocessing.Queue(),
+                                   configuration=configuration,
+                                   resampling_strategy='holdout',
+                                   resampling_strategy_args={'early_stopping': 'median'},
+                                   all_scoring_functions=False,
+                                   output_y_hat_optimization=True,
+                                   metric=accuracy,
+                                   budget=0.0)
+        evaluator.file_output = unittest.mock.Mock(spec=evaluator.file_output)
+        evaluator.file_output.return_value = (None, {})
+        evaluator._loss = unittest.mock.Mock(return_value=loss)
+        return evaluator
+
+    @unittest.mock.patch('autosklearn.pipeline.classification.SimpleClassificationPipeline')
+    def test_iterative_holdout_early_stopping(self, pipeline_mock):
+        backend_api = backend.create(self.tmp_dir, self.output_dir)
+        for _ in range(5):
+            backend_api.append_to_learning_curve_log(
+                0.0, [(2, 0.3), (4, 0.2), (8, 0.2), (16, 0.1)])
+
+        # Worse than the median of the finished curves after three steps
+        evaluator = self._get_early_stopping_evaluator(pipeline_mock, backend_api, 0.5)
+        evaluator.fit_predict_and_loss(iterative=True)
+        rval = read_queue(evaluator.queue)
+        self.assertEqual(len(rval), 3)
+        self.assertEqual(pipeline_mock.iterative_fit.call_count, 3)
+        self.assertEqual(rval[-1]['status'], StatusType.DONOTADVANCE)
+        self.assertEqual(rval[-1]['loss'], 0.5)
+        self.assertEqual(rval[-1]['additional_run_info']['early_stopping_iter'], 8)
+        # Stopped learning curves are not recorded
+        self.assertEqual(len(backend_api.load_learning_curves(0.0)), 5)
+
+        # Better than the median, fitted until the end
+        pipeline_mock.reset_mock()
+        evaluator = self._get_early_stopping_evaluator(pipeline_mock, backend_api, 0.05)
+        evaluator.fit_predict_and_loss(iterative=True)
+        rval = read_queue(evaluator.queue)
+        self.assertEqual(len(rval), 9)
+        self.assertEqual(rval[-1]['status'], StatusType.SUCCESS)
+        curves = backend_api.load_learning_curves(0.0)
+        self.assertEqual(len(curves), 6)
+        self.assertEqual(curves[-1][:3], [(2, 0.05), (4, 0.05), (8, 0.05)])
+        self.assertEqual(curves[-1][-1], (512, 0.05))
+
     @unittest.mock.patch('autosklearn.pipeline.classification.SimpleClassificationPipeline')
     def test_iterative_holdout_interuption(self, pipeline_mock):
         # Regular fitting
@@ -404,6 +564,149 @@ class TestTrainEvaluator(BaseEvaluatorTest, unittest.TestCase):
         # the if block in which model assignment is done is accessed
         self.assertTrue(evaluator._added_empty_model)
 
+    @unittest.mock.patch('autosklearn.pipeline.classification.SimpleClassificationPipeline')
+    def test_cv_fold_n_jobs(self, pipeline_mock):
+        D = get_binary_classification_datamanager()
+
+        fit_threads = set()
+        barrier = threading.Barrier(3, timeout=10)
+
+        def fit(X, y):
+            fit_threads.add(threading.get_ident())
+            # Only passes if three folds are fitted at the same time
+            barrier.wait()
+            return pipeline_mock
+
+        pipeline_mock.predict_proba.side_effect = \
+            lambda X, batch_size=None: np.tile([0.6, 0.4], (len(X), 1))
+        pipeline_mock.side_effect = lambda **kwargs: pipeline_mock
+        pipeline_mock.fit.side_effect = fit
+        pipeline_mock.get_additional_run_info.return_value = None
+
+        configuration = unittest.mock.Mock(spec=Configuration)
+        backend_api = backend.create(self.tmp_dir, self.output_dir)
+        backend_api.load_datamanager = lambda: D
+        queue_ = multiprocessing.Queue()
+
+        evaluator = TrainEvaluator(backend_api, queue_,
+                                   configuration=configuration,
+                                   resampling_strategy='cv',
+                                   resampling_strategy_args={'folds': 6, 'fold_n_jobs': 3},
+                                   all_scoring_functions=False,
+                                   output_y_hat_optimization=True,
+                                   metric=accuracy)
+        evaluator.file_output = unittest.mock.Mock(spec=evaluator.file_output)
+        evaluator.file_output.return_value = (None, {})
+
+        evaluator.fit_predict_and_loss()
+
+        rval = read_queue(evaluator.queue)
+        self.assertEqual(len(rval), 1)
+        self.assertEqual(rval[0]['status'], StatusType.SUCCESS)
+        self.assertEqual(pipeline_mock.fit.call_count, 6)
+        self.assertEqual(len(fit_threads), 3)
+        self.assertNotIn(threading.get_ident(), fit_threads)
+        self.assertTrue(all(model is not None for model in evaluator.models))
+        # The folds are put together in their original order
+        opt_indices = np.concatenate([indices[1] for indices in evaluator.indices])
+        self.assertEqual(evaluator.file_output.call_args[0][0].shape[0], len(opt_indices))
+        np.testing.assert_array_equal(evaluator.Y_optimization, D.data['Y_train'][opt_indices])
+
+    def _get_racing_evaluator(self, pipeline_mock, backend_api):
+        D = get_binary_classification_datamanager()
+        pipeline_mock.predict_proba.side_effect = \
+            lambda X, batch_size=None: np.tile([0.6, 0.4], (len(X), 1))
+        pipeline_mock.side_effect = lambda **kwargs: pipeline_mock
+        pipeline_mock.get_additional_run_info.return_value = None
+
+        configuration = unittest.mock.Mock(spec=Configuration)
+        backend_api.load_datamanager = lambda: D
+        evaluator = TrainEvaluator(backend_api, multiprocessing.Queue(),
+                                   configuration=configuration,
+                                   resampling_strategy='cv',
+                                   resampling_strategy_args={'folds': 5,
+                                                             'racing_confidence': 0.9},
+                                   all_scoring_functions=False,
+                                   output_y_hat_optimization=True,
+                                   metric=accuracy)
+        evaluator.file_output = unittest.mock.Mock(spec=evaluator.file_output)
+        evaluator.file_output.return_value = (None, {})
+        return evaluator
+
+    @unittest.mock.patch('autosklearn.pipeline.classification.SimpleClassificationPipeline')
+    def test_cv_racing(self, pipeline_mock):
+        backend_api = backend.create(self.tmp_dir, self.output_dir)
+
+        # Without a completely evaluated configuration, all folds are evaluated
+        evaluator = self._get_racing_evaluator(pipeline_mock, backend_api)
+        evaluator.fit_predict_and_loss()
+        rval = read_queue(evaluator.queue)
+        self.assertEqual(rval[0]['status'], StatusType.SUCCESS)
+        self.assertAlmostEqual(rval[0]['loss'], 0.463768115942029)
+        self.assertEqual(pipeline_mock.fit.call_count, 5)
+        self.assertAlmostEqual(backend_api.load_best_cv_loss(None), 0.463768115942029)
+
+        # The fold losses so far are not clearly worse than the best loss
+        self.assertFalse(evaluator._race_is_lost([0.5, 0.3], 0.35))
+        self.assertTrue(evaluator._race_is_lost([0.5, 0.45], 0.35))
+        self.assertTrue(evaluator._race_is_lost([{'accuracy': 0.5}, {'accuracy': 0.45}], 0.35))
+        # Too few or all folds evaluated
+        evaluator.racing_min_folds = 3
+        self.assertFalse(evaluator._race_is_lost([0.5, 0.45], 0.35))
+        self.assertFalse(evaluator._race_is_lost([0.5] * 5, 0.35))
+
+        # Clearly worse than the best configuration
+        backend_api.append_to_cv_loss_log(None, 0.1)
+        pipeline_mock.reset_mock()
+        evaluator = self._get_racing_evaluator(pipeline_mock, backend_api)
+        evaluator.fit_predict_and_loss()
+        rval = read_queue(evaluator.queue)
+        self.assertEqual(len(rval), 1)
+        self.assertEqual(rval[0]['status'], StatusType.DONOTADVANCE)
+        self.assertEqual(rval[0]['additional_run_info']['racing_folds'], 2)
+        self.assertEqual(rval[0]['additional_run_info']['racing_best_loss'], 0.1)
+        self.assertGreater(rval[0]['loss'], 0.4)
+        self.assertEqual(pipeline_mock.fit.call_count, 2)
+        self.assertEqual(evaluator.file_output.call_count, 0)
+        # Aborted evaluations are not recorded
+        self.assertEqual(backend_api.load_best_cv_loss(None), 0.1)
+
+    @unittest.mock.patch('autosklearn.pipeline.classification.SimpleClassificationPipeline')
+    def test_cv_stored_splits(self, pipeline_mock):
+        D = get_binary_classification_datamanager()
+        pipeline_mock.predict_proba.side_effect = \
+            lambda X, batch_size=None: np.tile([0.6, 0.4], (len(X), 1))
+        pipeline_mock.side_effect = lambda **kwargs: pipeline_mock
+        pipeline_mock.get_additional_run_info.return_value = None
+
+        configuration = unittest.mock.Mock(spec=Configuration)
+        backend_api = backend.create(self.tmp_dir, self.output_dir)
+        backend_api.load_datamanager = lambda: D
+        splits = compute_splits(D, 'cv', {'folds': 4})
+        self.assertEqual(len(splits), 4)
+        backend_api.save_resampling_splits(splits)
+
+        with unittest.mock.patch.object(TrainEvaluator, 'get_splitter') as get_splitter:
+            evaluator = TrainEvaluator(backend_api, multiprocessing.Queue(),
+                                       configuration=configuration,
+                                       resampling_strategy='cv',
+                                       resampling_strategy_args={'folds': 4},
+                                       all_scoring_functions=False,
+                                       output_y_hat_optimization=True,
+                                       metric=accuracy)
+            evaluator.file_output = unittest.mock.Mock(spec=evaluator.file_output)
+            evaluator.file_output.return_value = (None, {})
+            evaluator.fit_predict_and_loss()
+            self.assertEqual(get_splitter.call_count, 0)
+
+        rval = read_queue(evaluator.queue)
+        self.assertEqual(rval[0]['status'], StatusType.SUCCESS)
+        self.assertEqual(evaluator.num_cv_folds, 4)
+        self.assertEqual(pipeline_mock.fit.call_count, 4)
+        for (train, test), indices in zip(splits, evaluator.indices):
+            np.testing.assert_array_equal(indices[0], train)
+            np.testing.assert_array_equal(indices[1], test)
+
     @unittest.mock.patch('autosklearn.pipeline.classification.SimpleClassificationPipeline')
     def test_partial_cv(self, pipeline_mock):
         D = get_binary_classification_datamanager()
@@ -631,6 +934,7 @@ class TestTrainEvaluator(BaseEvaluatorTest, unittest.TestCase):
         queue_ = multiprocessing.Queue()
         D = get_binary_classification_datamanager()
         backend_mock.load_datamanager.return_value = D
+        backend_mock.load_resampling_splits.return_value = None
         evaluator = TrainEvaluator(backend_mock, queue_,
                                    configuration=configuration,
                                    resampling_strategy='cv',
@@ -745,6 +1049,7 @@ class TestTrainEvaluator(BaseEvaluatorTest, unittest.TestCase):
     ):
         D = get_binary_classification_datamanager()
         backend_mock.load_datamanager.return_value = D
+        backend_mock.load_resampling_splits.return_value = None
         mock.side_effect = lambda **kwargs: mock
         _partial_fit_and_predict_mock.return_value = (
             np.array([[0.1, 0.9]] * 46),
@@ -847,6 +1152,7 @@ class TestTrainEvaluator(BaseEvaluatorTest, unittest.TestCase):
 
         D = get_binary_classification_datamanager()
         backend_mock.load_datamanager.return_value = D
+        backend_mock.load_resampling_splits.return_value = None
         mock.side_effect = lambda **kwargs: mock
 
         configuration = unittest.mock.Mock(spec=Configuration)
@@ -883,6 +1189,7 @@ class TestTrainEvaluator(BaseEvaluatorTest, unittest.TestCase):
 
         D = get_binary_classification_datamanager()
         backend_mock.load_datamanager.return_value = D
+        backend_mock.load_resampling_splits.return_value = None
         mock.side_effect = lambda **kwargs: mock
 
         configuration = unittest.mock.Mock(spec=Configuration)
@@ -929,6 +1236,7 @@ class TestTrainEvaluator(BaseEvaluatorTest, unittest.TestCase):
 
         D = get_binary_classification_datamanager()
         backend_mock.load_datamanager.return_value = D
+        backend_mock.load_resampling_splits.return_value = None
         mock.side_effect = lambda **kwargs: mock
 
         configuration = unittest.mock.Mock(spec=Configuration)
@@ -967,6 +1275,7 @@ class TestTrainEvaluator(BaseEvaluatorTest, unittest.TestCase):
 
         D = get_binary_classification_datamanager()
         backend_mock.load_datamanager.return_value = D
+        backend_mock.load_resampling_splits.return_value = None
         mock.side_effect = lambda **kwargs: mock
 
         configuration = unittest.mock.Mock(spec=Configuration)
@@ -2242,6 +2551,8 @@ class FunctionsTest(unittest.TestCase):
         self.backend.get_cv_model_path.side_effect = dummy_cv_model_files
         self.backend.get_prediction_output_path.side_effect = dummy_pred_files
         self.backend.load_datamanager.return_value = self.data
+        self.backend.get_transform_cache.return_value = None
+        self.backend.load_resampling_splits.return_value = None
         self.backend.output_directory = 'duapdbaetpdbe'
         self.dataset_name = json.dumps({'task_id': 'test'})
 
@@ -0,0 +1,227 @@
+import functools
+import logging
+import multiprocessing
+import os
+import time
+import unittest
+import unittest.mock
+
+import dask
+import dask.distributed
+import numpy as np
+import pynisher
+from smac.runhistory.runhistory import RunInfo
+from smac.stats.stats import Stats
+from smac.tae import StatusType
+
+from autosklearn.evaluation import (
+    ExecuteTaFuncWithQueue,
+    fit_predict_try_except_decorator,
+    get_cost_of_crash,
+)
+from autosklearn.evaluation.util import read_queue
+from autosklearn.evaluation.worker_pool import LocalQueue, WorkerPool
+from autosklearn.metrics import accuracy
+
+import sys
+this_directory = os.path.dirname(__file__)
+sys.path.append(this_directory)
+from evaluation_util import get_multiclass_classification_datamanager  # noqa E402
+
+
+# The target functions must be importable by the worker processes
+def report_pid(queue, **kwargs):
+    print('stdout of the evaluation')
+    queue.put({'status': StatusType.SUCCESS, 'loss': 0.5,
+               'additional_run_info': {'pid': os.getpid()},
+               'final_queue_element': True})
+
+
+def report_and_sleep(queue, **kwargs):
+    queue.put({'status': StatusType.SUCCESS, 'loss': 0.7,
+               'additional_run_info': {'pid': os.getpid()}})
+    time.sleep(10)
+
+
+def fill_memory(queue, **kwargs):
+    a = np.random.random_sample((10000, 10000)).astype(np.float64)
+    queue.put({'status': StatusType.SUCCESS, 'loss': np.sum(a),
+               'additional_run_info': {}})
+
+
+def report_datamanager(queue, backend, **kwargs):
+    cached = backend._datamanager is not None
+    datamanager = backend.load_datamanager()
+    queue.put({'status': StatusType.SUCCESS, 'loss': 0.5,
+               'additional_run_info': {'cached': cached, 'name': datamanager.name,
+                                       'pid': os.getpid()}})
+
+
+def count_child_processes():
+    return len(multiprocessing.active_children())
+
+
+class ConfigMock(object):
+    # Configurations are sent to the workers and must be picklable
+    def __init__(self, config_id):
+        self.config_id = config_id
+        self.origin = 'test'
+
+
+class BackendMock(object):
+    def __init__(self):
+        self.temporary_directory = 'tmp'
+        self._datamanager = None
+
+    def load_datamanager(self):
+        self._datamanager = get_multiclass_classification_datamanager()
+        return self._datamanager
+
+
+class WorkerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = WorkerPool(memory_limit=3072)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def _run(self, function, wall_time_in_s=30, **kwargs):
+        result_queue = LocalQueue()
+        result = self.pool.run(function, kwargs, wall_time_in_s, result_queue)
+        return result, result_queue
+
+    def test_workers_are_reused(self):
+        pids = []
+        for _ in range(3):
+            result, result_queue = self._run(report_pid)
+            self.assertEqual(result.exit_status, 0)
+            self.assertEqual(result.stdout, 'stdout of the evaluation\n')
+            self.assertIsInstance(result.wall_clock_time, float)
+            info = read_queue(result_queue)
+            self.assertEqual(info[-1]['loss'], 0.5)
+            pids.append(info[-1]['additional_run_info']['pid'])
+        self.assertEqual(len(set(pids)), 1)
+        self.assertNotEqual(pids[0], os.getpid())
+
+    def test_timeout(self):
+        result, result_queue = self._run(report_and_sleep, wall_time_in_s=1)
+        self.assertEqual(result.exit_status, pynisher.TimeoutException)
+        self.assertLess(result.wall_clock_time, 5)
+        # Results reported before the timeout are kept
+        info = read_queue(result_queue)
+        self.assertEqual(info[-1]['loss'], 0.7)
+        killed_pid = info[-1]['additional_run_info']['pid']
+
+        # The worker which timed out is replaced
+        result, result_queue = self._run(report_pid)
+        self.assertEqual(result.exit_status, 0)
+        pid = read_queue(result_queue)[-1]['additional_run_info']['pid']
+        self.assertNotEqual(pid, killed_pid)
+
+    def test_memory_limit(self):
+        self.pool = WorkerPool(memory_limit=100)
+        result, result_queue = self._run(fill_memory)
+        self.assertEqual(result.exit_status, pynisher.MemorylimitException)
+        self.assertTrue(result_queue.empty())
+        # The worker shuts down after running out of memory
+        self.assertEqual(len(self.pool._idle), 0)
+
+        result, result_queue = self._run(report_pid)
+        self.assertEqual(result.exit_status, 0)
+
+    def test_datamanager_stays_resident(self):
+        infos = []
+        for _ in range(2):
+            result, result_queue = self._run(report_datamanager, backend=BackendMock())
+            self.assertEqual(result.exit_status, 0)
+            infos.append(read_queue(result_queue)[-1]['additional_run_info'])
+        self.assertEqual(infos[0]['pid'], infos[1]['pid'])
+        self.assertFalse(infos[0]['cached'])
+        self.assertTrue(infos[1]['cached'])
+        self.assertEqual(infos[1]['name'], infos[0]['name'])
+
+
+class ExecuteTaFuncWithWorkerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        scenario_mock = unittest.mock.Mock()
+        scenario_mock.wallclock_limit = 60
+        scenario_mock.algo_runs_timelimit = 1000
+        scenario_mock.ta_run_limit = 100
+        self.stats = Stats(scenario_mock)
+        self.stats.start_timing()
+
+    def _get_ta(self, function):
+        ta = ExecuteTaFuncWithQueue(backend=BackendMock(), autosklearn_seed=1,
+                                    resampling_strategy='holdout',
+                                    logger=logging.getLogger(),
+                                    stats=self.stats,
+                                    memory_limit=3072,
+                                    metric=accuracy,
+                                    cost_for_crash=get_cost_of_crash(accuracy),
+                                    abort_on_first_run_crash=False,
+                                    use_worker_pool=True,
+                                    )
+        ta.ta = functools.partial(fit_predict_try_except_decorator, ta=function,
+                                  cost_for_crash=get_cost_of_crash(accuracy))
+        self.addCleanup(ta.shutdown_worker_pool)
+        return ta
+
+    def _run_info(self, config_id, cutoff=30):
+        return RunInfo(config=ConfigMock(config_id), cutoff=cutoff, instance=None,
+                       instance_specific=None, seed=1, capped=False)
+
+    def test_unused_without_flag(self):
+        ta = ExecuteTaFuncWithQueue(backend=BackendMock(), autosklearn_seed=1,
+                                    resampling_strategy='holdout',
+                                    logger=logging.getLogger(),
+                                    stats=self.stats,
+                                    memory_limit=3072,
+                                    metric=accuracy,
+                                    cost_for_crash=get_cost_of_crash(accuracy),
+                                    abort_on_first_run_crash=False,
+                                    )
+        self.assertIsNone(ta.worker_pool_id)
+
+    def test_eval_in_worker_pool(self):
+        ta = self._get_ta(report_pid)
+        pids = []
+        for config_id in (1, 2):
+            info = ta.run_wrapper(self._run_info(config_id))
+            self.assertEqual(info[1].status, StatusType.SUCCESS)
+            self.assertEqual(info[1].cost, 0.5)
+            self.assertEqual(info[1].additional_info['configuration_origin'], 'test')
+            pids.append(info[1].additional_info['pid'])
+        self.assertEqual(pids[0], pids[1])
+
+    def test_timeout_in_worker_pool(self):
+        ta = self._get_ta(report_and_sleep)
+        info = ta.run_wrapper(self._run_info(1, cutoff=1))
+        # Results in the queue are used even if the run timed out
+        self.assertEqual(info[1].status, StatusType.SUCCESS)
+        self.assertEqual(info[1].cost, 0.7)
+        self.assertEqual(info[1].additional_info['info'], 'Run stopped because of timeout.')
+
+    def test_memout_in_worker_pool(self):
+        ta = self._get_ta(fill_memory)
+        ta.memory_limit = 100
+        info = ta.run_wrapper(self._run_info(1))
+        self.assertEqual(info[1].status, StatusType.MEMOUT)
+        self.assertEqual(info[1].cost, 1.0)
+        self.assertEqual(info[1].additional_info['error'], 'Memout (used more than 100 MB).')
+
+    def test_shutdown_in_dask_workers(self):
+        # Dask worker processes are daemonic by default and cannot have children
+        dask.config.set({'distributed.worker.daemon': False})
+        client = dask.distributed.Client(n_workers=1, threads_per_worker=1, processes=True)
+        self.addCleanup(client.close)
+        ta = self._get_ta(report_pid)
+
+        info = client.submit(ta.run_wrapper, self._run_info(1)).result(timeout=60)
+        self.assertEqual(info[1].status, StatusType.SUCCESS, info[1].additional_info)
+        # The worker pool lives in the dask worker process
+        self.assertEqual(list(client.run(count_child_processes).values()), [1])
+
+        ta.shutdown_worker_pool(client)
+        self.assertEqual(list(client.run(count_child_processes).values()), [0])
@@ -1,9 +1,16 @@
 import unittest
+import unittest.mock
 
 import numpy as np
 import sklearn.metrics
 
 import autosklearn.metrics
+from autosklearn.constants import (
+    BINARY_CLASSIFICATION,
+    MULTICLASS_CLASSIFICATION,
+    MULTILABEL_CLASSIFICATION,
+    REGRESSION,
+)
 
 from smac.utils.constants import MAXINT
 
@@ -443,3 +450,113 @@ class TestMetric(unittest.TestCase):
             previous_score = current_score
             current_score = scorer(y_true, y_pred)
             self.assertLess(current_score, previous_score)
+
+
+class TestScoreKernels(unittest.TestCase):
+
+    def _assert_kernel_matches_scorer(self, scorer, task_type, y_true, y_preds):
+        kernel = autosklearn.metrics.get_score_kernel(scorer, task_type)
+        self.assertIsNotNone(kernel, msg=scorer.name)
+        encoded_labels = kernel.encode_labels(y_true)
+        self.assertIsNotNone(encoded_labels, msg=scorer.name)
+
+        stacked = np.array(y_preds)
+        if stacked.ndim == 3 and task_type == REGRESSION:
+            stacked = stacked.reshape((len(y_preds), -1))
+        self.assertTrue(kernel.supports(encoded_labels, stacked))
+        batch_scores = kernel(encoded_labels, stacked)
+
+        for y_pred, batch_score in zip(y_preds, batch_scores):
+            expected = scorer(y_true, y_pred)
+            self.assertAlmostEqual(scorer._sign * batch_score, expected, msg=scorer.name)
+            self.assertAlmostEqual(
+                scorer._sign * kernel.score(encoded_labels, y_pred), expected,
+                msg=scorer.name,
+            )
+
+    def test_classification_kernels(self):
+        rs = np.random.RandomState(1)
+        for task_type, n_classes in ((BINARY_CLASSIFICATION, 2),
+                                     (MULTICLASS_CLASSIFICATION, 4)):
+            y_true = rs.randint(n_classes, size=50)
+            y_preds = rs.rand(5, 50, n_classes)
+            y_preds /= y_preds.sum(axis=2, keepdims=True)
+            y_preds[0] = np.eye(n_classes)[y_true]
+            for scorer in (autosklearn.metrics.accuracy,
+                           autosklearn.metrics.balanced_accuracy,
+                           autosklearn.metrics.log_loss):
+                self._assert_kernel_matches_scorer(scorer, task_type, y_true, y_preds)
+
+        # Labels which do not cover all columns of the predictions
+        y_true = np.array([0, 2, 2, 0, 2])
+        y_preds = rs.rand(3, 5, 3)
+        self._assert_kernel_matches_scorer(
+            autosklearn.metrics.log_loss, MULTICLASS_CLASSIFICATION, y_true, y_preds)
+
+    def test_roc_auc_kernel(self):
+        rs = np.random.RandomState(1)
+        y_true = rs.randint(2, size=50)
+        y_preds = rs.rand(5, 50, 2)
+        # Ties must be handled like sklearn does
+        y_preds[1] = np.round(y_preds[1], 1)
+        y_preds[2] = 0.5
+        self._assert_kernel_matches_scorer(
+            autosklearn.metrics.roc_auc, BINARY_CLASSIFICATION, y_true, y_preds)
+
+        y_true = rs.randint(2, size=(50, 3))
+        y_preds = rs.rand(5, 50, 3)
+        self._assert_kernel_matches_scorer(
+            autosklearn.metrics.roc_auc, MULTILABEL_CLASSIFICATION, y_true, y_preds)
+
+    def test_regression_kernels(self):
+        rs = np.random.RandomState(1)
+        y_true = rs.rand(50)
+        y_preds = y_true + rs.normal(scale=0.3, size=(5, 50))
+        y_preds[0] = y_true
+        for scorer in (autosklearn.metrics.mean_squared_error,
+                       autosklearn.metrics.root_mean_squared_error,
+                       autosklearn.metrics.mean_absolute_error,
+                       autosklearn.metrics.r2):
+            self._assert_kernel_matches_scorer(scorer, REGRESSION, y_true, y_preds)
+            self._assert_kernel_matches_scorer(
+                scorer, REGRESSION, y_true.reshape((-1, 1)), y_preds.reshape((5, -1, 1)))
+
+    def test_no_kernel(self):
+        # User-defined metrics and metrics with non-default arguments
+        scorer = autosklearn.metrics.make_scorer('accuracy', sklearn.metrics.accuracy_score,
+                                                 normalize=False)
+        self.assertIsNone(autosklearn.metrics.get_score_kernel(
+            scorer, MULTICLASS_CLASSIFICATION))
+        self.assertIsNone(autosklearn.metrics.get_score_kernel(
+            autosklearn.metrics.f1_macro, MULTICLASS_CLASSIFICATION))
+        self.assertIsNone(autosklearn.metrics.get_score_kernel(
+            autosklearn.metrics.accuracy, MULTILABEL_CLASSIFICATION))
+
+        # Labels and predictions the kernel does not handle
+        kernel = autosklearn.metrics.get_score_kernel(
+            autosklearn.metrics.roc_auc, BINARY_CLASSIFICATION)
+        self.assertIsNone(kernel.encode_labels(np.zeros(10)))
+        kernel = autosklearn.metrics.get_score_kernel(
+            autosklearn.metrics.accuracy, MULTICLASS_CLASSIFICATION)
+        encoded_labels = kernel.encode_labels(np.array([0, 1, 2, 1]))
+        self.assertIsNone(kernel.score(encoded_labels, np.zeros((3, 3))))
+        self.assertIsNone(kernel.score(encoded_labels, np.full((4, 3), np.nan)))
+
+    def test_calculate_score_uses_kernel(self):
+        y_true = np.array([0, 1, 2, 1])
+        y_pred = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0],
+                           [0.0, 1.0, 0.0], [0.0, 1.0, 0.0]])
+        kernel = autosklearn.metrics.get_score_kernel(
+            autosklearn.metrics.accuracy, MULTICLASS_CLASSIFICATION)
+        with unittest.mock.patch.object(kernel, '_score') as kernel_score:
+            kernel_score.return_value = np.array([0.75])
+            score = autosklearn.metrics.calculate_score(
+                y_true, y_pred, MULTICLASS_CLASSIFICATION, autosklearn.metrics.accuracy)
+        self.assertEqual(score, 0.75)
+        self.assertEqual(kernel_score.call_count, 1)
+
+        # Invalid predictions are still rejected by sklearn
+        with self.assertRaises(ValueError):
+            autosklearn.metrics.calculate_score(
+                y_true, np.full((4, 3), np.nan), MULTICLASS_CLASSIFICATION,
+                autosklearn.metrics.log_loss)
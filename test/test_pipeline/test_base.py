@@ -2,6 +2,10 @@ import unittest
 import unittest.mock
 
 import ConfigSpace.configuration_space
+import numpy as np
+import sklearn.datasets
+import sklearn.linear_model
+import sklearn.preprocessing
 
 import autosklearn.pipeline.base
 import autosklearn.pipeline.components.base
@@ -152,3 +156,27 @@ class BaseTest(unittest.TestCase):
             # object is a magic mock, calling the method doesn't set a new parameter
             with self.assertRaisesRegex(ValueError, "Cannot properly set the pair"):
                 base.set_hyperparameters(cs.sample_configuration(), init_params={'M:key': 'value'})
+
+    def test_shared_transformer(self):
+        X, y = sklearn.datasets.load_iris(return_X_y=True)
+
+        def get_pipeline(C, X, y):
+            base = BasePipelineMock()
+            base.steps = [('rescaling', sklearn.preprocessing.StandardScaler().fit(X)),
+                          ('classifier', sklearn.linear_model.LogisticRegression(C=C))]
+            base.steps[-1][1].fit(base.apply_transformer(X), y)
+            return base
+
+        base = get_pipeline(1.0, X, y)
+        other = get_pipeline(0.1, X, y)
+        self.assertEqual(base.get_transformer_key(), other.get_transformer_key())
+        self.assertNotEqual(base.get_transformer_key(),
+                            get_pipeline(1.0, X[:-10], y[:-10]).get_transformer_key())
+
+        Xt = base.apply_transformer(X)
+        for pipeline in (base, other):
+            predictor = pipeline.without_transformer()
+            np.testing.assert_array_almost_equal(predictor.predict_proba(Xt),
+                                                 pipeline.predict_proba(X))
+            # The pipeline itself still transforms the data
+            self.assertIsInstance(pipeline.steps[0][1], sklearn.preprocessing.StandardScaler)
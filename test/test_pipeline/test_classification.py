@@ -19,7 +19,7 @@ import sklearn.svm
 from sklearn.utils.validation import check_is_fitted
 
 from ConfigSpace.exceptions import ForbiddenValueError
-from ConfigSpace.configuration_space import ConfigurationSpace
+from ConfigSpace.configuration_space import Configuration, ConfigurationSpace
 from ConfigSpace.hyperparameters import CategoricalHyperparameter
 
 from autosklearn.pipeline.classification import SimpleClassificationPipeline
@@ -29,6 +29,7 @@ from autosklearn.pipeline.components.base import AutoSklearnComponent, AutoSklea
 import autosklearn.pipeline.components.classification as classification_components
 import autosklearn.pipeline.components.feature_preprocessing as preprocessing_components
 from autosklearn.pipeline.util import get_dataset
+from autosklearn.util.transform_cache import TransformCache
 from autosklearn.pipeline.constants import \
     DENSE, SPARSE, UNSIGNED_DATA, PREDICTIONS, SIGNED_DATA, INPUT
 
@@ -177,6 +178,45 @@ class SimpleClassificationPipelineTest(unittest.TestCase):
             self.assertEqual(classifier.steps[-1][-1].choice.estimator.n_estimators,
                              i)
 
+    def test_fit_transformer_reuses_cached_transformers(self):
+        X_train, Y_train, X_test, Y_test = get_dataset(dataset='iris')
+        include = {'classifier': ['decision_tree'],
+                   'feature_preprocessor': ['select_percentile_classification']}
+        cs = SimpleClassificationPipeline(include=include).get_hyperparameter_search_space()
+        config = cs.get_default_configuration()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = TransformCache(tmp_dir, max_size_mb=10)
+            classifier = SimpleClassificationPipeline(config=config, include=include)
+            classifier.transform_cache = cache
+            Xt, _ = classifier.fit_transformer(X_train, Y_train)
+            self.assertEqual(len(os.listdir(tmp_dir)), 1)
+
+            # The hyperparameters of the classifier are not part of the key
+            config_dict = config.get_dictionary()
+            config_dict['classifier:decision_tree:max_depth_factor'] = 1.0
+            config_dict = Configuration(cs, config_dict)
+            cached_classifier = SimpleClassificationPipeline(config=config_dict,
+                                                             include=include)
+            cached_classifier.transform_cache = cache
+            with unittest.mock.patch.object(cached_classifier, '_fit') as fit_mock:
+                cached_Xt, fit_params = cached_classifier.fit_transformer(X_train, Y_train)
+                self.assertEqual(fit_mock.call_count, 0)
+            np.testing.assert_array_almost_equal(Xt, cached_Xt)
+            self.assertEqual(fit_params, {})
+            cached_classifier.fit_estimator(cached_Xt, Y_train)
+            np.testing.assert_array_almost_equal(classifier.steps[-2][1].transform(X_test),
+                                                 cached_classifier.steps[-2][1].transform(X_test))
+
+            # Other training data is a cache miss
+            other_classifier = SimpleClassificationPipeline(config=config, include=include)
+            other_classifier.transform_cache = cache
+            other_classifier.fit_transformer(X_train[:-10], Y_train[:-10])
+            self.assertEqual(len(os.listdir(tmp_dir)), 2)
+
+            # The cache is not pickled together with the pipeline
+            self.assertNotIn('transform_cache', classifier.__getstate__())
+            self.assertIs(classifier.transform_cache, cache)
+
     def test_repr(self):
         representation = repr(SimpleClassificationPipeline())
         cls = eval(representation)
@@ -0,0 +1,45 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+
+def _load_benchmark_module():
+    script_filename = os.path.abspath(os.path.join(
+        __file__, '..', '..', '..', 'scripts', 'benchmark_ensemble_builder.py'))
+    spec = importlib.util.spec_from_file_location('benchmark_ensemble_builder', script_filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize('incremental', (False, True))
+def test_benchmark_ensemble_builder(tmpdir, incremental):
+    benchmark = _load_benchmark_module()
+    output = os.path.join(tmpdir, 'benchmark.json')
+    argv = [
+        '--n-models', '10', '--n-samples', '50', '--n-test-samples', '20',
+        '--n-classes', '3', '--iterations', '2', '--ensemble-size', '5',
+        '--max-models-on-disc', '4', '--temporary-directory', os.path.join(tmpdir, 'backend'),
+        '--output', output,
+    ]
+    if incremental:
+        argv.append('--incremental')
+    results = benchmark.main(argv)
+
+    with open(output) as fh:
+        assert json.load(fh) == results
+    assert not os.path.exists(os.path.join(tmpdir, 'backend'))
+    assert results['n_scored_predictions'] == 10
+
+    phases = {(record['iteration'], record['phase']) for record in results['records']}
+    candidate_phase = 'update_candidate_preds' if incremental else 'get_n_best_preds'
+    for iteration in (0, 1):
+        for phase in ('score_ensemble_preds', candidate_phase, 'EnsembleSelection.fit', 'main'):
+            assert (iteration, phase) in phases
+    # The builder is only created once in incremental mode
+    assert ((1, '__init__') in phases) == (not incremental)
+    for record in results['records']:
+        assert record['wall_time_s'] >= 0
+        assert record['peak_rss_mb'] > 0
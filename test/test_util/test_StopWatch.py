@@ -5,11 +5,12 @@
 @projekt: AutoML2015
 
 """
+import threading
 import time
 import unittest
 import unittest.mock
 
-from autosklearn.util.stopwatch import StopWatch
+from autosklearn.util.stopwatch import PhaseTimer, StopWatch
 
 
 class Test(unittest.TestCase):
@@ -35,6 +36,35 @@ class Test(unittest.TestCase):
         self.assertLess(wall_overhead, 1)
         self.assertLess(watch.cpu_sum(), 2 * watch.wall_sum())
 
+    def test_phase_timer(self):
+        timer = PhaseTimer()
+        with timer.time('fit'):
+            time.sleep(0.05)
+        with self.assertRaises(ValueError):
+            with timer.time('predict'):
+                raise ValueError()
+
+        def predict():
+            for _ in range(10):
+                with timer.time('predict'):
+                    pass
+        threads = [threading.Thread(target=predict) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        timings = timer.as_dict()
+        self.assertEqual(list(timings), ['fit', 'predict'])
+        self.assertGreaterEqual(timings['fit']['wall_time'], 0.05)
+        self.assertGreaterEqual(timings['fit']['cpu_time'], 0)
+        self.assertEqual(timings['fit']['calls'], 1)
+        # Failing phases are timed as well
+        self.assertEqual(timings['predict']['calls'], 41)
+        # A copy is returned
+        timings['fit']['calls'] = 5
+        self.assertEqual(timer.as_dict()['fit']['calls'], 1)
+
 
 if __name__ == '__main__':
     # import sys;sys.argv = ['', 'Test.testName']
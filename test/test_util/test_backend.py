@@ -1,9 +1,19 @@
 # -*- encoding: utf-8 -*-
 import builtins
+import os
+import pickle
+import shutil
+import tempfile
 import unittest
 import unittest.mock
 
-from autosklearn.util.backend import Backend
+import numpy as np
+
+import scipy.sparse
+
+from autosklearn.constants import BINARY_CLASSIFICATION
+from autosklearn.data.xy_data_manager import XYDataManager
+from autosklearn.util.backend import Backend, create
 
 
 class BackendModelsTest(unittest.TestCase):
@@ -69,3 +79,210 @@ class BackendModelsTest(unittest.TestCase):
         pickleLoadMock.side_effect = lambda fh: expected_model if fh == file_handler else None
 
         return expected_model
+
+
+class BackendRunsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.backend = create(os.path.join(self.tmp_dir, 'tmp'), None)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _save_run(self, idx, ensemble_predictions=np.zeros((3, 2))):
+        self.backend.save_numrun_to_dir(
+            seed=1, idx=idx, budget=0.0, model=None, cv_model=None,
+            ensemble_predictions=ensemble_predictions, valid_predictions=None,
+            test_predictions=None,
+        )
+        return os.path.join(
+            self.backend.get_numrun_directory(1, idx, 0.0),
+            self.backend.get_prediction_filename('ensemble', 1, idx, 0.0),
+        )
+
+    def test_read_prediction_index(self):
+        self.assertIsNone(self.backend.read_prediction_index())
+
+        path_2 = self._save_run(2)
+        path_3 = self._save_run(3)
+        # Runs without ensemble predictions are not indexed
+        self._save_run(4, ensemble_predictions=None)
+        entries, offset = self.backend.read_prediction_index()
+        self.assertEqual(
+            entries,
+            [(path_2, 1, 2, 0.0, os.path.getmtime(path_2), os.path.getsize(path_2)),
+             (path_3, 1, 3, 0.0, os.path.getmtime(path_3), os.path.getsize(path_3))],
+        )
+
+        # Only new entries are read, including the ones of re-stored runs
+        self.assertEqual(self.backend.read_prediction_index(offset), ([], offset))
+        path_2 = self._save_run(2)
+        entries, new_offset = self.backend.read_prediction_index(offset)
+        self.assertEqual(
+            entries,
+            [(path_2, 1, 2, 0.0, os.path.getmtime(path_2), os.path.getsize(path_2))],
+        )
+        self.assertGreater(new_offset, offset)
+
+        # An entry which is still being written is read later on
+        with open(self.backend._get_prediction_index_filename(), 'a') as fh:
+            fh.write('1 5 0.0')
+        self.assertEqual(self.backend.read_prediction_index(new_offset), ([], new_offset))
+
+    def test_score_cache(self):
+        self.assertEqual(self.backend.load_score_cache(), {})
+
+        key_1 = ('accuracy', 1, 2, 0.0, 128, 1600000000.123456)
+        key_2 = ('accuracy', 1, 3, 50.0, 256, 1600000001.5)
+        self.backend.append_to_score_cache([(key_1, (0.5, 0.01))])
+        self.backend.append_to_score_cache([(key_2, (0.75, 0.02))])
+        self.assertEqual(
+            self.backend.load_score_cache(),
+            {key_1: (0.5, 0.01), key_2: (0.75, 0.02)},
+        )
+
+        # An entry which is still being written is ignored
+        with open(self.backend._get_score_cache_filename(), 'a') as fh:
+            fh.write('[["accuracy", 1, 4')
+        self.assertEqual(len(self.backend.load_score_cache()), 2)
+
+    def test_cv_loss_log(self):
+        self.assertIsNone(self.backend.load_best_cv_loss(0.0))
+        self.backend.append_to_cv_loss_log(0.0, 0.4)
+        self.backend.append_to_cv_loss_log(0.0, 0.3)
+        self.backend.append_to_cv_loss_log(0.0, 0.5)
+        self.backend.append_to_cv_loss_log(50.0, 0.1)
+        self.assertEqual(self.backend.load_best_cv_loss(0.0), 0.3)
+        self.assertEqual(self.backend.load_best_cv_loss(50.0), 0.1)
+        self.assertIsNone(self.backend.load_best_cv_loss(100.0))
+
+    def test_learning_curve_log(self):
+        self.assertEqual(self.backend.load_learning_curves(0.0), [])
+        self.backend.append_to_learning_curve_log(0.0, [(2, 0.5), (4, 0.4)])
+        self.backend.append_to_learning_curve_log(50.0, [(2, 0.3)])
+        self.backend.append_to_learning_curve_log(0.0, [(2, 0.6)])
+        self.assertEqual(self.backend.load_learning_curves(0.0),
+                         [[(2, 0.5), (4, 0.4)], [(2, 0.6)]])
+        self.assertEqual(self.backend.load_learning_curves(50.0), [[(2, 0.3)]])
+
+    def test_memory_log(self):
+        self.assertEqual(self.backend.load_memory_observations(), [])
+        self.backend.append_to_memory_log(('random_forest', 'no_preprocessing'), 1.5, 300.0)
+        self.backend.append_to_memory_log(('sgd', None), 0.75, 220.0)
+        self.assertEqual(self.backend.load_memory_observations(),
+                         [(['random_forest', 'no_preprocessing'], 1.5, 300.0),
+                          (['sgd', None], 0.75, 220.0)])
+
+    def test_resampling_splits(self):
+        self.assertIsNone(self.backend.load_resampling_splits())
+        splits = [
+            (np.array([0, 1, 2, 3]), np.array([4, 5])),
+            (np.array([2, 3, 4, 5]), np.array([0, 1])),
+            (np.array([0, 1, 4, 5]), np.array([2, 3])),
+        ]
+        self.backend.save_resampling_splits(splits)
+        loaded = self.backend.load_resampling_splits()
+        self.assertEqual(len(loaded), 3)
+        for (train, test), (loaded_train, loaded_test) in zip(splits, loaded):
+            np.testing.assert_array_equal(loaded_train, train)
+            np.testing.assert_array_equal(loaded_test, test)
+            self.assertEqual(loaded_train.dtype, np.int32)
+            self.assertIsInstance(loaded_train, np.memmap)
+
+        # The splits of the first call are kept
+        self.backend.save_resampling_splits(splits[:1])
+        self.assertEqual(len(self.backend.load_resampling_splits()), 3)
+
+    def test_save_numrun_to_dir_prediction_storage(self):
+        predictions = np.random.RandomState(1).rand(3, 2)
+
+        # Pickled float32 arrays by default
+        path = self._save_run(2, ensemble_predictions=predictions)
+        with open(path, 'rb') as fh:
+            loaded = pickle.load(fh)
+        self.assertEqual(loaded.dtype, np.float32)
+        np.testing.assert_array_equal(loaded, predictions.astype(np.float32))
+
+        # Raw arrays which can be memory mapped
+        for dtype in (np.float16, np.float32):
+            self.backend.prediction_storage_dtype = dtype
+            path = self._save_run(3, ensemble_predictions=predictions)
+            loaded = np.load(path, mmap_mode='r')
+            self.assertIsInstance(loaded, np.memmap)
+            self.assertEqual(loaded.dtype, dtype)
+            np.testing.assert_array_equal(loaded, predictions.astype(dtype))
+
+
+class BackendDatamanagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.backend = create(os.path.join(self.tmp_dir, 'tmp'), None)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _assert_data_equal(self, loaded, expected):
+        self.assertEqual(sorted(loaded.data), sorted(expected.data))
+        for key, value in expected.data.items():
+            if scipy.sparse.issparse(value):
+                self.assertTrue(scipy.sparse.isspmatrix_csr(loaded.data[key]))
+                np.testing.assert_array_equal(loaded.data[key].toarray(), value.toarray())
+            else:
+                np.testing.assert_array_equal(loaded.data[key], value)
+
+    def test_save_load_datamanager_memory_mapped(self):
+        random_state = np.random.RandomState(1)
+        X = random_state.rand(20, 3)
+        X[X < 0.5] = 0
+        y = random_state.randint(2, size=20)
+        for name, X_train, X_test in (
+            ('dense', X, X[:5]),
+            ('sparse', scipy.sparse.csr_matrix(X), scipy.sparse.csc_matrix(X[:5])),
+        ):
+            backend = create(os.path.join(self.tmp_dir, name), None)
+            backend.memory_mapped_datamanager = True
+            datamanager = XYDataManager(
+                X_train, y, X_test=X_test, y_test=y[:5], task=BINARY_CLASSIFICATION,
+                feat_type=['numerical'] * 3, dataset_name='test',
+            )
+            # Arrays which cannot be memory mapped are pickled
+            datamanager.data['objects'] = np.array(['a', None], dtype=object)
+            backend.save_datamanager(datamanager)
+
+            # The datamanager which was passed in is not modified
+            self.assertIs(datamanager.data['X_train'], X_train)
+            with open(backend._get_datamanager_pickle_filename(), 'rb') as fh:
+                pickled = pickle.load(fh)
+            self.assertEqual(pickled.info, datamanager.info)
+            self.assertIsInstance(pickled.data['objects'], np.ndarray)
+
+            loaded = backend.load_datamanager()
+            self._assert_data_equal(loaded, datamanager)
+            self.assertEqual(loaded.info, datamanager.info)
+            self.assertEqual(loaded.feat_type, datamanager.feat_type)
+            mapped = loaded.data['X_train']
+            if scipy.sparse.issparse(mapped):
+                # The components of the csr matrix are views of the mappings
+                mapped = mapped.data
+                self.assertFalse(mapped.flags.owndata)
+            else:
+                self.assertIsInstance(mapped, np.memmap)
+            self.assertIsInstance(loaded.data['Y_train'], np.memmap)
+
+            # Modifications are private to the process
+            mapped[0] = 10
+            self._assert_data_equal(backend.load_datamanager(), datamanager)
+
+    def test_save_load_datamanager_pickled(self):
+        X = np.random.RandomState(1).rand(10, 2)
+        datamanager = XYDataManager(
+            X, np.arange(10) % 2, X_test=None, y_test=None, task=BINARY_CLASSIFICATION,
+            feat_type=None, dataset_name='test',
+        )
+        self.backend.save_datamanager(datamanager)
+        self.assertFalse(os.path.exists(self.backend._get_datamanager_array_directory()))
+        loaded = self.backend.load_datamanager()
+        self._assert_data_equal(loaded, datamanager)
+        self.assertNotIsInstance(loaded.data['X_train'], np.memmap)
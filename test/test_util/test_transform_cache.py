@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import scipy.sparse
+
+from autosklearn.util.transform_cache import TransformCache
+
+
+class TransformCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.directory = os.path.join(self.tmp_dir, 'transform_cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _set_last_use(self, cache, key, timestamp):
+        os.utime(cache._get_filename(key), (timestamp, timestamp))
+
+    def test_get_key(self):
+        X = np.arange(12, dtype=float).reshape((4, 3))
+        key = TransformCache.get_key('a', X, {'b': 1})
+        self.assertEqual(key, TransformCache.get_key('a', X.copy(), {'b': 1}))
+        self.assertNotEqual(key, TransformCache.get_key('a', X, {'b': 2}))
+        self.assertNotEqual(key, TransformCache.get_key('a', X + 1, {'b': 1}))
+        self.assertNotEqual(key, TransformCache.get_key('a', X.astype(np.float32), {'b': 1}))
+        self.assertNotEqual(TransformCache.get_key(X),
+                            TransformCache.get_key(np.asfortranarray(X.T)))
+        self.assertEqual(TransformCache.get_key(scipy.sparse.csr_matrix(X)),
+                         TransformCache.get_key(scipy.sparse.csc_matrix(X)))
+
+    def test_put_and_get(self):
+        cache = TransformCache(self.directory, max_size_mb=1)
+        self.assertIsNone(cache.get('key'))
+        value = (['fitted steps'], np.ones((10, 2)))
+        self.assertTrue(cache.put('key', value))
+        cached = cache.get('key')
+        self.assertEqual(cached[0], value[0])
+        np.testing.assert_array_equal(cached[1], value[1])
+
+    def test_value_larger_than_cache(self):
+        cache = TransformCache(self.directory, max_size_mb=0.01)
+        self.assertFalse(cache.put('key', np.ones(10000)))
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_evict_least_recently_used(self):
+        # Each entry takes a bit more than 40kB
+        cache = TransformCache(self.directory, max_size_mb=0.1)
+        for i, key in enumerate(['a', 'b']):
+            self.assertTrue(cache.put(key, np.ones(5000) * i))
+            self._set_last_use(cache, key, 1000 + i)
+        # Reading an entry marks it as used
+        self.assertIsNotNone(cache.get('a'))
+
+        self.assertTrue(cache.put('c', np.ones(5000)))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertEqual(len(os.listdir(self.directory)), 2)